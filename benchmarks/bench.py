@@ -0,0 +1,359 @@
+"""Headless benchmark suite for Sociala Berättelser.
+
+Generates synthetic story libraries and times storage, every exporter in
+both packages, the undo/redo stack, the TTS helpers (against stub
+``piper``/``espeak-ng``/``paplay`` executables) and list construction.
+
+    python benchmarks/bench.py                      # all groups, default sizes
+    python benchmarks/bench.py --sizes 100 1000 -o results.json
+    python benchmarks/bench.py --compare old.json   # print ratios vs a baseline
+
+Each group runs in its own subprocess because both ``socialaberattelser``
+(top level) and ``src/socialaberattelser`` share an import name. Groups
+that need GTK are reported as skipped when PyGObject or a display is
+missing; ``gtk4-broadwayd`` is started automatically when available so
+the list benchmark runs without a real display.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+ROOTS = {"top": REPO, "src": os.path.join(REPO, "src")}
+
+GROUPS = {
+    "storage": "src",
+    "model": "src",
+    "export_src": "src",
+    "export_top": "top",
+    "undo": "top",
+    "phonetics": "src",
+    "listview": "src",
+}
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+STEPS_PER_STORY = 10
+
+WORDS = ("jag går till skolan tandläkaren läkaren väntar sitter äter frukost "
+         "kompis lärare affären mat öppnar munnen hej hemma ljud lugn andas "
+         "glad ledsen rädd stolt").split()
+EMOJI = ["🦷", "🏫", "🛒", "👋", "💙", "⭐", "🏠", "📝"]
+
+STUBS = {
+    "piper": """#!/bin/sh
+out=""
+while [ $# -gt 0 ]; do
+  case "$1" in --output_file) out="$2"; shift;; --output-raw) out=-;; esac
+  shift
+done
+cat > /dev/null
+[ "$out" = "-" ] && printf '\\000\\000\\000\\000'
+[ -n "$out" ] && [ "$out" != "-" ] && printf 'RIFF$\\000\\000\\000WAVEfmt ' > "$out"
+exit 0
+""",
+    "espeak-ng": """#!/bin/sh
+for a in "$@"; do [ "$a" = "--ipa" ] && { echo "hˈɛj"; exit 0; }; done
+exit 0
+""",
+    "paplay": "#!/bin/sh\nexit 0\n",
+    "canberra-gtk-play": "#!/bin/sh\nexit 0\n",
+}
+
+
+def make_library(total_steps, seed=0, dict_steps=False):
+    """Return a deterministic list of stories with ``total_steps`` steps in all."""
+    rng = random.Random(seed)
+    stories = []
+    for i in range(max(1, total_steps // STEPS_PER_STORY)):
+        steps = []
+        for _ in range(STEPS_PER_STORY):
+            text = " ".join(rng.choices(WORDS, k=8)).capitalize() + "."
+            steps.append({"text": text, "emoji": rng.choice(EMOJI)} if dict_steps else text)
+        stories.append({"title": f"Berättelse {i}", "steps": steps})
+    return stories
+
+
+def timeit(fn, min_runs=3, min_time=0.2, max_runs=50):
+    """Run ``fn`` repeatedly and return timing stats in seconds."""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - start < min_time):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return {"runs": len(times), "min": min(times), "median": statistics.median(times),
+            "mean": statistics.fmean(times)}
+
+
+# ── Worker side: runs inside the subprocess for one group ───────────
+
+def bench_storage(size, tmp):
+    from socialaberattelser import main
+    from socialaberattelser.model import load_library
+    stories = load_library(make_library(size))
+    results = {"save_stories": timeit(lambda: main._save_stories(stories))}
+    results["load_stories"] = timeit(main._load_stories)
+    store = main._new_store()
+    store.save_cache()
+    results["load_store_warm"] = timeit(main._new_store)
+    return results
+
+
+def bench_model(size, tmp):
+    import gc
+    import tracemalloc
+    from socialaberattelser.model import dump_library, load_library
+    raw = json.dumps(make_library(size, dict_steps=True))
+
+    def traced_size(fn):
+        gc.collect()
+        tracemalloc.start()
+        obj = fn()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del obj
+        return {"bytes": used}
+
+    stories = load_library(json.loads(raw))
+    return {"parse_dicts": timeit(lambda: json.loads(raw)),
+            "load_library": timeit(lambda: load_library(json.loads(raw))),
+            "dump_library": timeit(lambda: dump_library(stories)),
+            "memory_dicts": traced_size(lambda: json.loads(raw)),
+            "memory_model": traced_size(lambda: load_library(json.loads(raw)))}
+
+
+def bench_export_src(size, tmp):
+    from socialaberattelser import export
+    data = [{"date": "2026-01-01", "details": s["title"], "result": f"{len(s['steps'])} steps"}
+            for s in make_library(size)]
+    return {name: timeit(lambda fn=fn, name=name: fn(data, os.path.join(tmp, name)))
+            for name, fn in [("export_csv", export.export_csv), ("export_json", export.export_json),
+                             ("export_pdf", export.export_pdf)]}
+
+
+def bench_export_top(size, tmp):
+    from socialaberattelser import export
+    items = [{"title": s["title"], "steps": len(s["steps"])} for s in make_library(size, dict_steps=True)]
+    results = {"data_to_csv": timeit(lambda: export.data_to_csv(items)),
+               "data_to_json": timeit(lambda: export.data_to_json(items))}
+    pdf = os.path.join(tmp, "out.pdf")
+    if export.export_data_pdf(items[:1], "probe", pdf):
+        results["export_data_pdf"] = timeit(lambda: export.export_data_pdf(items, "Bench", pdf))
+    return results
+
+
+def bench_undo(size, tmp):
+    from socialaberattelser.undo_redo import UndoRedoManager
+    noop = lambda: None
+
+    def push():
+        m = UndoRedoManager()
+        for i in range(size):
+            m.push(noop, noop, "edit")
+
+    def cycle():
+        m = UndoRedoManager(max_size=size)
+        for i in range(size):
+            m.push(noop, noop, "edit")
+        while m.undo():
+            pass
+        while m.redo():
+            pass
+
+    return {"push": timeit(push), "push_undo_redo": timeit(cycle)}
+
+
+def bench_phonetics(size, tmp):
+    from socialaberattelser import audio, espeak, phonetics
+    texts = [s for story in make_library(min(size, 200)) for s in story["steps"]][:20]
+    words = " ".join(texts).split()[:20]
+
+    def run(fn):
+        for t in texts:
+            fn(t)
+
+    def speak_espeak():
+        run(lambda t: audio.engine().play(phonetics.synthesize(t, engine="espeak")))
+
+    def get_phonetics():
+        [phonetics.get_phonetics(w) for w in words]
+
+    # The runner sets SOCIALABERATTELSER_ESPEAK=subprocess, so these time the
+    # stub executable like older revisions did; the library is timed apart.
+    results = {
+        "speak_piper": timeit(lambda: run(lambda t: audio.engine().play(
+            phonetics.synthesize(t, engine="piper"))), max_runs=5),
+        "speak_espeak": timeit(speak_espeak, max_runs=5),
+        "get_phonetics": timeit(get_phonetics, max_runs=5),
+    }
+    mode = os.environ.pop("SOCIALABERATTELSER_ESPEAK", None)
+    try:
+        if espeak.load() is not None:
+            results["speak_espeak_lib"] = timeit(speak_espeak, max_runs=5)
+            results["get_phonetics_lib"] = timeit(get_phonetics, max_runs=5)
+    finally:
+        if mode is not None:
+            os.environ["SOCIALABERATTELSER_ESPEAK"] = mode
+    return results
+
+
+def bench_listview(size, tmp):
+    import gi
+    gi.require_version("Gtk", "4.0")
+    gi.require_version("Adw", "1")
+    from gi.repository import Adw
+    Adw.init()
+    from socialaberattelser import main
+    from socialaberattelser.model import load_library
+    main._save_stories(load_library(make_library(size)))
+    win = main.StoryWindow()
+    return {"window_build": timeit(main.StoryWindow, max_runs=5),
+            "refresh_list": timeit(win._refresh_list, max_runs=10)}
+
+
+def run_worker(group, size):
+    tmp = tempfile.mkdtemp(prefix="sb-bench-")
+    try:
+        os.environ["XDG_CONFIG_HOME"] = os.path.join(tmp, "config")
+        os.environ["HOME"] = tmp
+        fn = globals()[f"bench_{group}"]
+        try:
+            results = fn(size, tmp)
+        except ImportError as e:
+            return {"skipped": f"missing dependency: {e}"}
+        return {"results": results}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ── Driver side ─────────────────────────────────────────────────────
+
+def _stub_dir():
+    d = tempfile.mkdtemp(prefix="sb-bench-bin-")
+    for name, body in STUBS.items():
+        path = os.path.join(d, name)
+        with open(path, "w") as f:
+            f.write(body)
+        os.chmod(path, 0o755)
+    return d
+
+
+def _headless_display(env):
+    """Start a broadway server if possible; returns the process or None."""
+    broadwayd = shutil.which("gtk4-broadwayd")
+    if broadwayd:
+        display = ":94"
+        proc = subprocess.Popen([broadwayd, display], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL)
+        time.sleep(0.5)
+        env.update(GDK_BACKEND="broadway", BROADWAY_DISPLAY=display)
+        return proc
+    return None
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "-C", REPO, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(groups, sizes):
+    stubs = _stub_dir()
+    env = dict(os.environ)
+    env["PATH"] = stubs + os.pathsep + env.get("PATH", "")
+    env["SOCIALABERATTELSER_AUDIO"] = "null"
+    env["SOCIALABERATTELSER_ESPEAK"] = "subprocess"
+    display = None
+    if "listview" in groups:
+        display = _headless_display(env)
+    out = []
+    try:
+        for group in groups:
+            root = ROOTS[GROUPS[group]]
+            for size in sizes:
+                cmd = [sys.executable, os.path.abspath(__file__), "--worker", group, "--sizes", str(size)]
+                proc = subprocess.run(cmd, cwd=root, env=dict(env, PYTHONPATH=root),
+                                      capture_output=True, text=True)
+                if proc.returncode != 0:
+                    entry = {"error": proc.stderr.strip().splitlines()[-1:] or ["exit %d" % proc.returncode]}
+                else:
+                    entry = json.loads(proc.stdout.strip().splitlines()[-1])
+                entry.update(group=group, size=size)
+                out.append(entry)
+                _print_entry(entry)
+    finally:
+        if display:
+            display.terminate()
+        shutil.rmtree(stubs, ignore_errors=True)
+    return out
+
+
+def _print_entry(entry):
+    head = f"{entry['group']:<11} {entry['size']:>7}"
+    if "results" not in entry:
+        print(f"{head}  {entry.get('skipped') or entry.get('error')}")
+        return
+    for name, r in entry["results"].items():
+        if "bytes" in r:
+            print(f"{head}  {name:<16} {r['bytes'] / 1e6:10.3f} MB")
+        else:
+            print(f"{head}  {name:<16} median {r['median'] * 1000:10.3f} ms  ({r['runs']} runs)")
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    def value(r):
+        return r.get("median", r.get("bytes"))
+
+    old = {(e["group"], e["size"], name): value(r)
+           for e in baseline["results"] for name, r in e.get("results", {}).items()}
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('revision')}):")
+    for e in current:
+        for name, r in e.get("results", {}).items():
+            before = old.get((e["group"], e["size"], name))
+            if before:
+                print(f"{e['group']:<11} {e['size']:>7}  {name:<16} x{value(r) / before:6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("groups", nargs="*", metavar="GROUP",
+                        help="benchmark groups to run: %s (default: all)" % ", ".join(GROUPS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES,
+                        help="library sizes in total steps")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="previous results JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    unknown = set(args.groups) - set(GROUPS)
+    if unknown:
+        parser.error("unknown group(s): %s" % ", ".join(sorted(unknown)))
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.sizes[0])))
+        return
+
+    results = run(args.groups or list(GROUPS), args.sizes)
+    meta = {"revision": _git_revision(), "python": platform.python_version(),
+            "platform": platform.platform(), "date": datetime.now().isoformat(timespec="seconds")}
+    with open(args.output, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
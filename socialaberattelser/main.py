@@ -27,45 +27,59 @@ for d in [Path(__file__).parent.parent / "po", Path("/usr/share/locale")]:
 gettext.textdomain("socialaberattelser")
 _ = gettext.gettext
 
+
+def N_(msgid):
+    """Mark a string for translation; it is translated when displayed."""
+    return msgid
+
+
 APP_ID = "se.danielnylander.socialaberattelser"
 
 TEMPLATES = [
     {
-        "title": _("Going to the Dentist"),
+        "title": N_("Going to the Dentist"),
         "steps": [
-            {"text": _("Today I am going to the dentist."), "emoji": "🦷"},
-            {"text": _("In the waiting room, I sit and wait for my turn."), "emoji": "🪑"},
-            {"text": _("The dentist will look at my teeth."), "emoji": "👨‍⚕️"},
-            {"text": _("I open my mouth wide."), "emoji": "😮"},
-            {"text": _("It might feel strange but it doesn't hurt."), "emoji": "💪"},
-            {"text": _("When it's done, I can be proud of myself!"), "emoji": "⭐"},
+            {"text": N_("Today I am going to the dentist."), "emoji": "🦷"},
+            {"text": N_("In the waiting room, I sit and wait for my turn."), "emoji": "🪑"},
+            {"text": N_("The dentist will look at my teeth."), "emoji": "👨‍⚕️"},
+            {"text": N_("I open my mouth wide."), "emoji": "😮"},
+            {"text": N_("It might feel strange but it doesn't hurt."), "emoji": "💪"},
+            {"text": N_("When it's done, I can be proud of myself!"), "emoji": "⭐"},
         ]
     },
     {
-        "title": _("First Day of School"),
+        "title": N_("First Day of School"),
         "steps": [
-            {"text": _("Today is my first day at a new school."), "emoji": "🏫"},
-            {"text": _("I will meet my new teacher."), "emoji": "👩‍🏫"},
-            {"text": _("There will be other children in my class."), "emoji": "👫"},
-            {"text": _("I can say hello and tell them my name."), "emoji": "👋"},
-            {"text": _("If I feel nervous, I can take a deep breath."), "emoji": "🫁"},
-            {"text": _("It's okay to feel a little scared. It will get better!"), "emoji": "💙"},
+            {"text": N_("Today is my first day at a new school."), "emoji": "🏫"},
+            {"text": N_("I will meet my new teacher."), "emoji": "👩‍🏫"},
+            {"text": N_("There will be other children in my class."), "emoji": "👫"},
+            {"text": N_("I can say hello and tell them my name."), "emoji": "👋"},
+            {"text": N_("If I feel nervous, I can take a deep breath."), "emoji": "🫁"},
+            {"text": N_("It's okay to feel a little scared. It will get better!"), "emoji": "💙"},
         ]
     },
     {
-        "title": _("Visiting the Supermarket"),
+        "title": N_("Visiting the Supermarket"),
         "steps": [
-            {"text": _("We are going to the supermarket to buy food."), "emoji": "🛒"},
-            {"text": _("There might be many people and loud sounds."), "emoji": "🔊"},
-            {"text": _("I can stay close to my parent."), "emoji": "👨‍👧"},
-            {"text": _("I can help by holding the shopping list."), "emoji": "📝"},
-            {"text": _("If it gets too noisy, I can cover my ears or use headphones."), "emoji": "🎧"},
-            {"text": _("After shopping, we go home. Good job!"), "emoji": "🏠"},
+            {"text": N_("We are going to the supermarket to buy food."), "emoji": "🛒"},
+            {"text": N_("There might be many people and loud sounds."), "emoji": "🔊"},
+            {"text": N_("I can stay close to my parent."), "emoji": "👨‍👧"},
+            {"text": N_("I can help by holding the shopping list."), "emoji": "📝"},
+            {"text": N_("If it gets too noisy, I can cover my ears or use headphones."), "emoji": "🎧"},
+            {"text": N_("After shopping, we go home. Good job!"), "emoji": "🏠"},
         ]
     },
 ]
 
 
+def _is_template(story):
+    return any(story is tpl for tpl in TEMPLATES)
+
+
+def _tr_story(story, text):
+    return _(text) if _is_template(story) else text
+
+
 def _config_dir():
     p = Path(GLib.get_user_config_dir()) / "socialaberattelser"
     p.mkdir(parents=True, exist_ok=True)
@@ -89,7 +103,9 @@ class MainWindow(Adw.ApplicationWindow):
     def __init__(self, app):
         super().__init__(application=app, title=_("Social Stories"))
         self.set_default_size(600, 700)
-        self.stories = _load_stories()
+        self.app = app
+        app.connect_stories(self._on_story_added)
+        self.connect("destroy", lambda *_: app.disconnect_stories(self._on_story_added))
         self.current_story = None
         self.current_step = 0
 
@@ -151,10 +167,9 @@ class MainWindow(Adw.ApplicationWindow):
         return False
 
     def _on_export(self, *_args):
-        all_stories = TEMPLATES + self.stories
         items = []
-        for s in all_stories:
-            items.append({"title": s["title"], "steps": len(s["steps"])})
+        for s in self.app.library():
+            items.append({"title": _tr_story(s, s["title"]), "steps": len(s["steps"])})
         show_export_dialog(self, items, _("Social Stories"), lambda m: self.status.set_label(m))
 
     def _build_list_page(self):
@@ -173,28 +188,12 @@ class MainWindow(Adw.ApplicationWindow):
         box.append(subtitle)
 
         scroll = Gtk.ScrolledWindow(vexpand=True)
-        listbox = Gtk.ListBox()
-        listbox.add_css_class("boxed-list")
-
-        # Built-in templates
-        for tpl in TEMPLATES:
-            row = Adw.ActionRow()
-            row.set_title(tpl["title"])
-            row.set_subtitle(_("%d steps") % len(tpl["steps"]))
-            row.set_activatable(True)
-            row.connect("activated", lambda r, t=tpl: self._view_story(t))
-            listbox.append(row)
-
-        # User stories
-        for story in self.stories:
-            row = Adw.ActionRow()
-            row.set_title(story["title"])
-            row.set_subtitle(_("%d steps") % len(story.get("steps", [])))
-            row.set_activatable(True)
-            row.connect("activated", lambda r, s=story: self._view_story(s))
-            listbox.append(row)
-
-        scroll.set_child(listbox)
+        self.listbox = Gtk.ListBox()
+        self.listbox.add_css_class("boxed-list")
+        for story in self.app.library():
+            self._on_story_added(story)
+
+        scroll.set_child(self.listbox)
         box.append(scroll)
 
         add_btn = Gtk.Button(label=_("Create New Story"))
@@ -206,6 +205,14 @@ class MainWindow(Adw.ApplicationWindow):
 
         return box
 
+    def _on_story_added(self, story):
+        row = Adw.ActionRow()
+        row.set_title(_tr_story(story, story["title"]))
+        row.set_subtitle(_("%d steps") % len(story.get("steps", [])))
+        row.set_activatable(True)
+        row.connect("activated", lambda r, s=story: self._view_story(s))
+        self.listbox.append(row)
+
     def _build_viewer_page(self):
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=16)
         box.set_margin_top(20)
@@ -257,7 +264,7 @@ class MainWindow(Adw.ApplicationWindow):
     def _view_story(self, story):
         self.current_story = story
         self.current_step = 0
-        self.story_title.set_label(story["title"])
+        self.story_title.set_label(_tr_story(story, story["title"]))
         self._show_step()
         self.stack.set_visible_child_name("viewer")
 
@@ -267,7 +274,7 @@ class MainWindow(Adw.ApplicationWindow):
         steps = self.current_story["steps"]
         step = steps[self.current_step]
         self.step_emoji.set_label(step.get("emoji", "📖"))
-        self.step_text.set_label(step["text"])
+        self.step_text.set_label(_tr_story(self.current_story, step["text"]))
         self.step_counter.set_label(f"{self.current_step + 1} / {len(steps)}")
         self.prev_btn.set_sensitive(self.current_step > 0)
         self.next_btn.set_sensitive(self.current_step < len(steps) - 1)
@@ -292,8 +299,7 @@ class MainWindow(Adw.ApplicationWindow):
             story = {"title": entry.get_text().strip(), "steps": [
                 {"text": _("Step 1 — edit this text"), "emoji": "📝"}
             ]}
-            self.stories.append(story)
-            _save_stories(self.stories)
+            self.app.add_story(story)
             self.status.set_label(_("Story created: %s") % story["title"])
 
 
@@ -301,6 +307,32 @@ class App(Adw.Application):
     def __init__(self):
         super().__init__(application_id=APP_ID)
         self.connect("activate", self._on_activate)
+        self._stories = None
+        self._story_listeners = []
+
+    @property
+    def stories(self):
+        """User stories, loaded once and shared by all windows."""
+        if self._stories is None:
+            self._stories = _load_stories()
+        return self._stories
+
+    def library(self):
+        """Built-in templates followed by the user's stories, as listed."""
+        return TEMPLATES + self.stories
+
+    def add_story(self, story):
+        self.stories.append(story)
+        _save_stories(self.stories)
+        for cb in list(self._story_listeners):
+            cb(story)
+
+    def connect_stories(self, callback):
+        """Call ``callback(story)`` whenever a story is added."""
+        self._story_listeners.append(callback)
+
+    def disconnect_stories(self, callback):
+        self._story_listeners.remove(callback)
 
     def _on_activate(self, *_args):
         win = self.props.active_window or MainWindow(self)
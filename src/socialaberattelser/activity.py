@@ -0,0 +1,205 @@
+"""Reading activity: an append-only event log with rollups.
+
+Opening a story, viewing a step, hearing a step read aloud and reaching
+the last step are appended as one short JSON line each to the current
+log segment:
+
+    segment-<seq>.log       [time, kind code, profile, story key, step]
+    rollups.json            per-day and per-story counts per profile,
+                            and the log position they include
+
+A new segment is started when the current one reaches ``segment_size``
+bytes, and the oldest segments beyond ``keep`` are deleted once their
+events are in the rollups. Queries and the exporters only read the
+rollups, so a report over months of reading never scans the log.
+Rollups are saved coalesced; on open, events appended after the last
+save are replayed from the log.
+"""
+import json
+import os
+import re
+import time
+
+from socialaberattelser.persist import CoalescedSaver, atomic_write
+
+EVENTS = ("open", "step", "speak", "complete")
+_CODES = {"open": "o", "step": "s", "speak": "t", "complete": "c"}
+_KINDS = {code: EVENTS.index(kind) for kind, code in _CODES.items()}
+
+SEGMENT_SIZE = 1 << 20
+KEEP_SEGMENTS = 8
+ROLLUPS = "rollups.json"
+
+_SEGMENT = re.compile(r"segment-(\d+)\.log$")
+
+
+def day(t):
+    return time.strftime("%Y-%m-%d", time.localtime(t))
+
+
+def _counts(counts):
+    return {kind: n for kind, n in zip(EVENTS, counts) if n}
+
+
+class ActivityLog:
+    """Event log and rollups in ``directory``."""
+
+    def __init__(self, directory, segment_size=SEGMENT_SIZE, keep=KEEP_SEGMENTS,
+                 schedule=None, delay_ms=5000):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.keep = keep
+        self._saver = CoalescedSaver(self.save, schedule, delay_ms)
+        self._dirty = False
+        self._file = None
+        # profile -> day -> story key -> counts per EVENTS
+        self._days = {}
+        # profile -> story key -> {"counts": [...], "first": t, "last": t}
+        self._stories = {}
+        self._position = [0, 0]
+        self._load()
+
+    # ── Files ────────────────────────────────────────────────
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f"segment-{seq:06d}.log")
+
+    def segments(self):
+        """Sequence numbers of the segments on disk, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT.match, names) if m)
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.directory, ROLLUPS), encoding="utf-8") as f:
+                data = json.load(f)
+            self._days = data["days"]
+            self._stories = data["stories"]
+            self._position = data["position"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        self._replay()
+
+    def _replay(self):
+        """Fold events logged after the saved rollups into them."""
+        seq, offset = self._position
+        for n in self.segments():
+            if n < seq:
+                continue
+            with open(self._segment_path(n), "rb") as f:
+                f.seek(offset if n == seq else 0)
+                data = f.read()
+            # A torn last line from a crash is left for the next append to skip.
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                try:
+                    t, code, profile, key, step = json.loads(line)
+                    self._add(t, _KINDS[code], profile, key)
+                except (ValueError, KeyError):
+                    continue
+            self._position = [n, (offset if n == seq else 0) + end]
+            self._dirty = True
+
+    def _open_segment(self):
+        seq, offset = self._position
+        if not seq or offset >= self.segment_size:
+            seq += 1
+            offset = 0
+            self._position = [seq, offset]
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self._segment_path(seq), "ab")
+        size = self._file.tell()
+        if size > offset:
+            # Drop a partial line left by a crash.
+            self._file.truncate(offset)
+        else:
+            self._position[1] = size
+
+    # ── Recording ────────────────────────────────────────────
+
+    def record(self, kind, story, step=None, profile="default", now=None):
+        """Append an event for ``story`` (a story key) and count it."""
+        t = int(time.time() if now is None else now)
+        line = json.dumps([t, _CODES[kind], profile, story, step],
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        if self._file is None or self._position[1] >= self.segment_size:
+            self.close_segment()
+            self._open_segment()
+        self._file.write(line)
+        self._file.flush()
+        self._position[1] += len(line)
+        self._add(t, EVENTS.index(kind), profile, story)
+        self._dirty = True
+        self._saver.request()
+
+    def _add(self, t, index, profile, key):
+        counts = self._days.setdefault(profile, {}).setdefault(day(t), {}).setdefault(
+            key, [0] * len(EVENTS))
+        counts[index] += 1
+        stats = self._stories.setdefault(profile, {}).get(key)
+        if stats is None:
+            stats = self._stories[profile][key] = {"counts": [0] * len(EVENTS),
+                                                   "first": t, "last": t}
+        stats["counts"][index] += 1
+        stats["first"] = min(stats["first"], t)
+        stats["last"] = max(stats["last"], t)
+
+    def close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def save(self):
+        """Write the rollups and drop segments they make redundant."""
+        if not self._dirty:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(os.path.join(self.directory, ROLLUPS)) as f:
+            json.dump({"days": self._days, "stories": self._stories,
+                       "position": self._position}, f, ensure_ascii=False,
+                      separators=(",", ":"))
+        self._dirty = False
+        for seq in self.segments()[:-self.keep or None]:
+            if seq < self._position[0]:
+                os.remove(self._segment_path(seq))
+
+    def close(self):
+        self.save()
+        self.close_segment()
+
+    # ── Queries ──────────────────────────────────────────────
+
+    def profiles(self):
+        return sorted(self._stories)
+
+    def story(self, key, profile="default"):
+        """Totals for one story: counts per event kind, first and last time."""
+        stats = self._stories.get(profile, {}).get(key)
+        if stats is None:
+            return None
+        return dict(_counts(stats["counts"]), first=stats["first"], last=stats["last"])
+
+    def daily(self, profile="default", since=None, until=None):
+        """Counts per day ("YYYY-MM-DD", both ends inclusive) over all stories."""
+        out = {}
+        for d, stories in sorted(self._days.get(profile, {}).items()):
+            if (since and d < since) or (until and d > until):
+                continue
+            total = [0] * len(EVENTS)
+            for counts in stories.values():
+                total = [a + b for a, b in zip(total, counts)]
+            out[d] = _counts(total)
+        return out
+
+    def report(self, profile="default", since=None, until=None):
+        """``(day, story key, counts)`` for every story read, by day."""
+        out = []
+        for d, stories in sorted(self._days.get(profile, {}).items()):
+            if (since and d < since) or (until and d > until):
+                continue
+            for key, counts in sorted(stories.items()):
+                out.append((d, key, _counts(counts)))
+        return out
@@ -0,0 +1,291 @@
+"""In-process audio playback.
+
+One engine per process plays everything: synthesized speech handed over
+as PCM and the short sound effects, which are decoded once and kept in
+memory. The GStreamer backend keeps a single ``appsrc`` pipeline in the
+PLAYING state and appends each clip's samples to it, so queued clips
+play back to back without gaps and nothing is forked or written to disk.
+Completion is reported by the pipeline itself: a marker event follows
+each clip down the pipeline and the sink posts it on the bus once the
+clip has been played.
+
+Set ``SOCIALABERATTELSER_AUDIO=null`` to use the null backend, which
+accepts clips without an audio device (for tests and headless runs); it
+is also used when GStreamer is not available.
+"""
+import abc
+import io
+import os
+import threading
+import time
+import wave
+
+from socialaberattelser import tracing
+from socialaberattelser.executor import PREFETCH, executor
+
+try:
+    from gi.repository import GLib
+except ImportError:  # phonetics is usable without PyGObject
+    GLib = None
+
+SOUNDS_DIR = "/usr/share/sounds/freedesktop/stereo"
+SOUNDS = ("complete", "bell", "message")
+
+_FORMATS = {1: "U8", 2: "S16LE", 4: "S32LE"}
+_ERRORS = (ImportError, ValueError) + ((GLib.Error,) if GLib is not None else ())
+_MARKER = "socialaberattelser-clip-done"
+
+
+class Clip:
+    """Interleaved PCM samples with their format."""
+
+    __slots__ = ("pcm", "rate", "channels", "width")
+
+    def __init__(self, pcm, rate=22050, channels=1, width=2):
+        self.pcm = pcm
+        self.rate = rate
+        self.channels = channels
+        self.width = width
+
+    def __len__(self):
+        return len(self.pcm)
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (self.rate * self.channels * self.width)
+
+    @classmethod
+    def from_wav(cls, data):
+        with wave.open(io.BytesIO(bytes(data)), "rb") as w:
+            return cls(w.readframes(w.getnframes()), w.getframerate(),
+                       w.getnchannels(), w.getsampwidth())
+
+    def to_wav(self):
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(self.channels)
+            w.setsampwidth(self.width)
+            w.setframerate(self.rate)
+            w.writeframes(self.pcm)
+        return buf.getvalue()
+
+
+def _idle(callback, *args):
+    """Run ``callback`` once on the main loop, or at once without one."""
+    if GLib is None:
+        callback(*args)
+        return
+
+    def fire():
+        callback(*args)
+        return False
+
+    GLib.idle_add(fire)
+
+
+class AudioEngine(abc.ABC):
+    """Playback queue shared by the backends.
+
+    ``play()`` appends a clip to the queue and returns at once;
+    ``on_done`` runs on the main loop when the clip has finished playing.
+    Each clip is followed by a numbered marker, and the backend calls
+    ``_done(marker)`` when playback has reached it. The time from
+    ``play()`` to ``on_done`` is traced as ``tts.playback``.
+    """
+
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._markers = 0
+        self._pending = {}      # marker -> (start, on_done)
+
+    def play(self, clip, on_done=None):
+        self._markers += 1
+        self._pending[self._markers] = (time.perf_counter(), on_done)
+        if clip is not None and len(clip):
+            self._push(clip)
+        self._mark(self._markers)
+
+    def _done(self, marker):
+        entry = self._pending.pop(marker, None)
+        if entry is None:       # dropped by stop()
+            return
+        start, on_done = entry
+        if tracing.ENABLED:
+            tracing.record("tts.playback", start, time.perf_counter())
+        if on_done:
+            on_done()
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def stop(self):
+        """Drop everything queued or playing; pending ``on_done`` callbacks are cancelled."""
+        self._pending.clear()
+        self._flush()
+
+    def preload(self, names=SOUNDS, wait=False):
+        """Decode sound effects into memory, in the background unless ``wait``."""
+        def load():
+            for name in names:
+                self._sample(name)
+        if wait:
+            load()
+        else:
+            executor().submit(load, lane=PREFETCH, name="audio.preload")
+
+    def _sample(self, name):
+        with self._lock:
+            clip = self._samples.get(name)
+        if clip is None:
+            path = os.path.join(SOUNDS_DIR, f"{name}.oga")
+            clip = Clip(b"")
+            if os.path.isfile(path):
+                try:
+                    clip = decode_file(path)
+                except _ERRORS:
+                    pass
+            with self._lock:
+                self._samples[name] = clip
+        return clip
+
+    def play_sample(self, name, on_done=None):
+        self.play(self._sample(name), on_done)
+
+    @abc.abstractmethod
+    def _push(self, clip):
+        """Append ``clip`` to the playback queue."""
+
+    @abc.abstractmethod
+    def _mark(self, marker):
+        """Call ``_done(marker)`` on the main loop once everything pushed so far has played."""
+
+    @abc.abstractmethod
+    def _flush(self):
+        """Drop everything queued or playing."""
+
+
+class NullEngine(AudioEngine):
+    """Backend without an audio device; keeps the clips it was given.
+
+    Clips count as played as soon as the main loop is idle.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.played = []
+
+    def _push(self, clip):
+        self.played.append(clip)
+
+    def _mark(self, marker):
+        _idle(self._done, marker)
+
+    def _flush(self):
+        pass
+
+
+class GstEngine(AudioEngine):
+    """GStreamer backend: appsrc ! audioconvert ! audioresample ! autoaudiosink."""
+
+    def __init__(self):
+        super().__init__()
+        Gst = _gst()
+        self._Gst = Gst
+        self._pipeline = Gst.parse_launch(
+            "appsrc name=src format=time is-live=false "
+            "! audioconvert ! audioresample ! autoaudiosink")
+        self._src = self._pipeline.get_by_name("src")
+        self._caps = None
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::application", self._on_message)
+        self._pipeline.set_state(Gst.State.PLAYING)
+
+    def _push(self, clip):
+        Gst = self._Gst
+        fmt = (clip.rate, clip.channels, clip.width)
+        if fmt != self._caps:
+            # appsrc sends a caps event before the next buffer; the
+            # converter renegotiates without restarting the sink.
+            self._src.set_caps(Gst.Caps.from_string(
+                f"audio/x-raw,format={_FORMATS[clip.width]},layout=interleaved,"
+                f"rate={clip.rate},channels={clip.channels}"))
+            self._caps = fmt
+        self._src.emit("push-buffer", Gst.Buffer.new_wrapped(bytes(clip.pcm)))
+
+    def _mark(self, marker):
+        # appsrc queues serialized events in order with the buffers; the
+        # sink posts the message it carries when the event reaches it.
+        Gst = self._Gst
+        message = Gst.Message.new_application(
+            self._src, Gst.Structure.new_from_string(f"{_MARKER}, marker=(int){marker}"))
+        self._src.send_event(Gst.Event.new_sink_message(_MARKER, message))
+
+    def _on_message(self, _bus, message):
+        structure = message.get_structure()
+        if structure is not None and structure.get_name() == _MARKER:
+            self._done(structure.get_value("marker"))
+
+    def _flush(self):
+        Gst = self._Gst
+        self._pipeline.send_event(Gst.Event.new_flush_start())
+        self._pipeline.send_event(Gst.Event.new_flush_stop(True))
+
+    def close(self):
+        self._pipeline.get_bus().remove_signal_watch()
+        self._pipeline.set_state(self._Gst.State.NULL)
+
+
+def _gst():
+    import gi
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+    if not Gst.is_initialized():
+        Gst.init(None)
+    return Gst
+
+
+def decode_file(path, rate=48000, channels=2):
+    """Decode any audio file GStreamer can read into a ``Clip``."""
+    Gst = _gst()
+    pipeline = Gst.parse_launch(
+        "filesrc name=src ! decodebin ! audioconvert ! audioresample "
+        f"! audio/x-raw,format=S16LE,layout=interleaved,rate={rate},channels={channels} "
+        "! appsink name=sink sync=false")
+    pipeline.get_by_name("src").set_property("location", path)
+    sink = pipeline.get_by_name("sink")
+    pipeline.set_state(Gst.State.PLAYING)
+    chunks = []
+    try:
+        while True:
+            sample = sink.emit("pull-sample")
+            if sample is None:
+                break
+            buf = sample.get_buffer()
+            chunks.append(buf.extract_dup(0, buf.get_size()))
+        msg = pipeline.get_bus().pop_filtered(Gst.MessageType.ERROR)
+        if msg is not None:
+            raise ValueError(msg.parse_error()[0].message)
+    finally:
+        pipeline.set_state(Gst.State.NULL)
+    return Clip(b"".join(chunks), rate, channels, 2)
+
+
+_engine = None
+
+
+def engine():
+    """Return the process-wide engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        backend = os.environ.get("SOCIALABERATTELSER_AUDIO", "gst")
+        if backend != "null":
+            try:
+                _engine = GstEngine()
+            except _ERRORS as e:
+                print(f"Audio: GStreamer unavailable ({e}), using null backend")
+        if _engine is None:
+            _engine = NullEngine()
+    return _engine
@@ -0,0 +1,238 @@
+"""Auto-play for the reader: advance on a timer or when speech has finished.
+
+While a step is shown, the next ``PREFETCH_STEPS`` steps are prepared so that
+advancing only swaps in ready data: their text is laid out once at the
+label's width, step images are decoded to textures, and when speech is
+enabled the audio is synthesized by the shared executor: the step
+being waited for in the interactive lane, the ones after it in the
+prefetch lane. Every scheduled
+callback carries the generation it was started in; pausing bumps the
+generation so late timers and finished players are ignored.
+"""
+import os
+
+from gi.repository import Gdk, GLib, Pango
+
+from socialaberattelser import audio, i18n, phonetics, templates
+from socialaberattelser.executor import INTERACTIVE, PREFETCH, executor
+from socialaberattelser.tracing import span
+
+PREFETCH_STEPS = 2
+# The prefetch window plus the step before it, for stepping back.
+MAX_TEXTURES = PREFETCH_STEPS + 2
+SPEECH_GAP_MS = 800
+
+
+def step_image(story, idx):
+    """Return the image file of step ``idx``, if it has one on disk."""
+    step = story.step_json(idx)
+    image = step.get("image") if isinstance(step, dict) else None
+    return image if image and os.path.isfile(image) else None
+
+
+class AutoPlayer:
+    """Step scheduler and prefetcher for one ``StoryWindow``."""
+
+    def __init__(self, window, config=None):
+        self.window = window
+        self.config = config
+        self.playing = False
+        self._generation = 0
+        self._timer = None
+        self._speaking = False
+        self._textures = {}
+        self._audio = {}
+        self._pending = {}
+        self._waiting = None
+        self._listeners = []
+
+    def connect(self, callback):
+        """Call ``callback(playing)`` when playback starts or stops."""
+        self._listeners.append(callback)
+
+    def _setting(self, key, default):
+        return self.config.get(key) if self.config is not None else default
+
+    @property
+    def interval(self):
+        return max(1, self._setting("settings.autoplay_interval", 6))
+
+    @property
+    def speak(self):
+        return self._setting("settings.autoplay_speak", True) and (
+            phonetics.has_piper() or phonetics.has_espeak())
+
+    # ── Playback ─────────────────────────────────────────────
+
+    def toggle(self):
+        if self.playing:
+            self.pause()
+        else:
+            self.start()
+
+    def start(self):
+        if self.playing or self.window.current_story is None:
+            return
+        self.playing = True
+        self._notify()
+        self._play_current()
+
+    def pause(self):
+        """Stop advancing; safe to call at any time, including when idle."""
+        self._generation += 1
+        self._waiting = None
+        if self._timer is not None:
+            GLib.source_remove(self._timer)
+            self._timer = None
+        if self._speaking:
+            audio.engine().stop()
+            self._speaking = False
+        if self.playing:
+            self.playing = False
+            self._notify()
+
+    def _notify(self):
+        for cb in self._listeners:
+            cb(self.playing)
+
+    def _play_current(self):
+        story = self._story()
+        if not self.speak:
+            self.prefetch()
+            self._schedule(self.interval * 1000)
+            return
+        key = self._audio_key(story, self.window.current_step)
+        if key in self._audio:
+            self.prefetch()
+            self._speak(self._audio[key])
+        else:
+            self._waiting = key
+            self.prefetch()
+
+    def _schedule(self, delay_ms):
+        gen = self._generation
+        self._timer = GLib.timeout_add(delay_ms, self._on_timer, gen)
+
+    def _on_timer(self, gen):
+        self._timer = None
+        if gen == self._generation:
+            self._advance()
+        return False
+
+    def _speak(self, clip):
+        if clip is None:
+            self._schedule(self.interval * 1000)
+            return
+        self._speaking = True
+        self.window.log_activity("speak")
+        gen = self._generation
+        audio.engine().play(clip, lambda: self._on_spoken(gen))
+
+    def _on_spoken(self, gen):
+        if gen == self._generation:
+            self._speaking = False
+            self._schedule(SPEECH_GAP_MS)
+
+    def _advance(self):
+        story = self._story()
+        if self.window.current_step >= len(story) - 1:
+            self.pause()
+            return
+        self.window.current_step += 1
+        self.window._show_step()
+        self.window.log_activity("step")
+        self._play_current()
+
+    def _story(self):
+        return self.window.store[self.window.current_story]
+
+    # ── Prefetching ──────────────────────────────────────────
+
+    def prefetch(self):
+        """Prepare the current step and the next ``PREFETCH_STEPS`` ones."""
+        story = self._story()
+        first = self.window.current_step
+        steps = range(first, min(first + PREFETCH_STEPS + 1, len(story)))
+        with span("autoplay.prefetch"):
+            for i in steps:
+                if i > first:
+                    self._layout(templates.display_step(story, i))
+                image = step_image(story, i)
+                if image:
+                    self.texture(image)
+                if self.speak:
+                    self._request_audio(self._audio_key(story, i))
+        keep = {self._audio_key(story, i) for i in steps}
+        for key in [k for k in self._audio if k not in keep]:
+            del self._audio[key]
+        keep = {step_image(story, i) for i in steps}
+        for path in [p for p in self._textures if p not in keep]:
+            del self._textures[path]
+
+    def texture(self, path):
+        """Return the decoded texture for an image file, loading it if needed.
+
+        At most ``MAX_TEXTURES`` are kept, least recently used dropped first.
+        """
+        texture = self._textures.pop(path, None)
+        if texture is None:
+            try:
+                texture = Gdk.Texture.new_from_filename(path)
+            except GLib.Error:
+                return None
+        self._textures[path] = texture
+        while len(self._textures) > MAX_TEXTURES:
+            del self._textures[next(iter(self._textures))]
+        return texture
+
+    def _layout(self, text):
+        # Shaping the text once warms Pango's font and glyph caches.
+        label = self.window.step_label
+        layout = label.create_pango_layout(text)
+        width = label.get_width()
+        if width > 0:
+            layout.set_width(width * Pango.SCALE)
+            layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.get_pixel_size()
+
+    def _audio_key(self, story, idx):
+        return (templates.display_step(story, idx), i18n.effective_language())
+
+    def _request_audio(self, key):
+        if key in self._audio:
+            return
+        lane = INTERACTIVE if key == self._waiting else PREFETCH
+        token = self._pending.get(key)
+        if token is not None:
+            if lane == PREFETCH:
+                return
+            # Waited for now: move it ahead of the prefetch queue.
+            token.cancel()
+        text, lang = key
+        self._pending[key] = executor().submit(
+            phonetics.synthesize, text, lang, lane=lane, name="autoplay.synthesize",
+            on_done=lambda clip: self._on_audio_ready(key, clip),
+            on_error=lambda error: self._on_audio_failed(key, error))
+
+    def _on_audio_ready(self, key, clip):
+        self._pending.pop(key, None)
+        self._audio[key] = clip
+        if self.playing and key == self._waiting:
+            self._waiting = None
+            self._speak(clip)
+
+    def _on_audio_failed(self, key, error):
+        # Forget the request so it can be retried; a step waited for
+        # falls back to the timer instead of stalling playback.
+        self._pending.pop(key, None)
+        print(f"Speech synthesis failed: {error}")
+        if self.playing and key == self._waiting:
+            self._waiting = None
+            self._speak(None)
+
+    def close(self):
+        """Pause and cancel pending synthesis; the window is going away."""
+        self.pause()
+        for token in self._pending.values():
+            token.cancel()
+        self._pending.clear()
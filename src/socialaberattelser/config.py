@@ -0,0 +1,114 @@
+"""Application configuration: typed keys, change notifications, one file.
+
+Settings, window session state and the current profile used to live in
+settings.json, session.json and profiles/.current, each with its own
+reads and writes. They are now sections of a single config.json that is
+read once at startup and written back atomically; several changes in a
+row are coalesced into one write when a ``schedule`` function (such as
+GLib.timeout_add) is given.
+"""
+import json
+import os
+
+from socialaberattelser.persist import CoalescedSaver, atomic_write
+
+FILENAME = "config.json"
+
+# key -> (type, default)
+KEYS = {
+    "settings.welcome_shown": (bool, False),
+    "settings.language": (str, ""),
+    "settings.autoplay_interval": (int, 6),
+    "settings.autoplay_speak": (bool, True),
+    "settings.export_incremental": (bool, True),
+    "settings.history_keep": (int, 50),
+    "settings.history_max_days": (int, 365),
+    "settings.reminder_lead_minutes": (int, 15),
+    "session.width": (int, 550),
+    "session.height": (int, 700),
+    "session.maximized": (bool, False),
+    "profiles.current": (str, "default"),
+    "sync.folder": (str, ""),
+    "sync.device": (str, ""),
+    "history.pruned": (int, 0),
+}
+
+
+def _legacy_sources(config_dir):
+    """Old files to migrate on first start, as (path, section, reader)."""
+    home = os.path.join(os.path.expanduser("~"), ".config", "socialaberattelser")
+    return [
+        (os.path.join(config_dir, "settings.json"), "settings", json.load),
+        (os.path.join(home, "session.json"), "session", json.load),
+        (os.path.join(home, "profiles", ".current"), "profiles",
+         lambda f: {"current": f.read().strip()}),
+    ]
+
+
+class Config:
+    """In-memory configuration backed by ``<config_dir>/config.json``."""
+
+    def __init__(self, config_dir, schedule=None, delay_ms=500):
+        self.path = os.path.join(config_dir, FILENAME)
+        self._dir = config_dir
+        self._saver = CoalescedSaver(self.save, schedule, delay_ms)
+        self._values = {}
+        self._listeners = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = self._migrate()
+        for section, values in data.items():
+            if isinstance(values, dict):
+                for name, value in values.items():
+                    self._values[f"{section}.{name}"] = value
+
+    def _migrate(self):
+        data = {}
+        for path, section, reader in _legacy_sources(self._dir):
+            try:
+                with open(path) as f:
+                    data.setdefault(section, {}).update(reader(f))
+                self._dirty = True
+            except (OSError, ValueError):
+                pass
+        return data
+
+    def get(self, key):
+        kind, default = KEYS[key]
+        value = self._values.get(key, default)
+        return value if isinstance(value, kind) else default
+
+    def set(self, key, value):
+        kind, _default = KEYS[key]
+        if not isinstance(value, kind):
+            raise TypeError(f"{key} expects {kind.__name__}, got {type(value).__name__}")
+        if self._values.get(key) == value:
+            return
+        self._values[key] = value
+        self._dirty = True
+        for cb in self._listeners.get(key, []) + self._listeners.get(key.split(".")[0], []):
+            cb(key, value)
+        self._saver.request()
+
+    def connect(self, key, callback):
+        """Call ``callback(key, value)`` when ``key`` (or any key in a section) changes."""
+        self._listeners.setdefault(key, []).append(callback)
+
+    def save(self):
+        """Write all sections if anything changed, atomically."""
+        if not self._dirty:
+            return
+        data = {}
+        for key, value in sorted(self._values.items()):
+            section, _, name = key.partition(".")
+            data.setdefault(section, {})[name] = value
+        os.makedirs(self._dir, exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        self._dirty = False
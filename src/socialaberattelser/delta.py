@@ -0,0 +1,193 @@
+"""Incremental exports: a snapshot followed by a chain of deltas.
+
+An export directory holds
+
+    manifest.json           head/base sequence numbers and the content
+                            hash of every story as of the last export
+    snapshot-<seq>.json     every story at export ``seq``
+    delta-<seq>.json        stories added, changed or deleted since ``seq - 1``
+
+Each export compares the library against the manifest and writes only
+what changed. Replaying the base snapshot and the deltas after it in
+order gives the library as of the head export; ``compact()`` folds the
+chain into a new snapshot and removes the files it replaces. The
+manifest is written last, so an interrupted export leaves the previous
+chain intact.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from socialaberattelser import __version__
+from socialaberattelser.export import APP_LABEL, WEBSITE
+from socialaberattelser.i18n import gettext as _
+from socialaberattelser.model import story_key
+from socialaberattelser.persist import atomic_write
+
+FORMAT = "socialaberattelser-export"
+VERSION = 1
+MANIFEST = "manifest.json"
+COMPACT_AFTER = 30
+
+_FILE = re.compile(r"(snapshot|delta)-(\d+)\.json$")
+
+
+def entry_hash(entry):
+    key = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def story_entries(stories, row):
+    """Map a stable key per story to its export entry.
+
+    ``row(story)`` gives the date/details/result columns; the full story
+    is included so a delta chain can rebuild the library. Each story
+    is keyed by ``story_key``, numbered when keys repeat.
+    """
+    entries = {}
+    for story in stories:
+        key = base = story_key(story)
+        n = 1
+        while key in entries:
+            n += 1
+            key = f"{base}#{n}"
+        entry = dict(row(story))
+        entry["story"] = story.to_dict()
+        entries[key] = entry
+    return entries
+
+
+class Delta:
+    __slots__ = ("added", "changed", "deleted")
+
+    def __init__(self, added=None, changed=None, deleted=None):
+        self.added = added or {}
+        self.changed = changed or {}
+        self.deleted = deleted or []
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.deleted)
+
+    def apply(self, entries):
+        for key in self.deleted:
+            entries.pop(key, None)
+        entries.update(self.added)
+        entries.update(self.changed)
+        return entries
+
+
+class ExportChain:
+    """The snapshot and delta files in one export directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.head = 0
+        self.base = 0
+        self.hashes = {}
+        try:
+            with open(self._path(MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if manifest.get("format") != FORMAT or manifest.get("version", 0) > VERSION:
+            raise ValueError("unsupported export manifest")
+        self.head = manifest["head"]
+        self.base = manifest["base"]
+        self.hashes = manifest["stories"]
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, data):
+        with atomic_write(self._path(name)) as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def _read(self, name):
+        with open(self._path(name), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _header(self, kind, seq):
+        return {"format": FORMAT, "version": VERSION, "kind": kind, "seq": seq,
+                "app": _(APP_LABEL), "app_version": __version__, "_website": WEBSITE,
+                "exported": datetime.now().isoformat()}
+
+    def _save_manifest(self):
+        self._write(MANIFEST, {"format": FORMAT, "version": VERSION, "head": self.head,
+                               "base": self.base, "stories": self.hashes})
+
+    def diff(self, entries):
+        """Compare ``entries`` with the last export."""
+        delta = Delta()
+        for key, entry in entries.items():
+            old = self.hashes.get(key)
+            if old is None:
+                delta.added[key] = entry
+            elif old != entry_hash(entry):
+                delta.changed[key] = entry
+        delta.deleted = sorted(k for k in self.hashes if k not in entries)
+        return delta
+
+    def export(self, entries):
+        """Write a delta (or the first snapshot); returns its path, or None if unchanged."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self.head == 0:
+            return self._snapshot(entries, 1)
+        delta = self.diff(entries)
+        if not delta:
+            return None
+        seq = self.head + 1
+        name = f"delta-{seq}.json"
+        data = self._header("delta", seq)
+        data.update(parent=self.head, added=delta.added, changed=delta.changed,
+                    deleted=delta.deleted)
+        self._write(name, data)
+        self.head = seq
+        self.hashes = {key: entry_hash(entry) for key, entry in entries.items()}
+        self._save_manifest()
+        if self.head - self.base >= COMPACT_AFTER:
+            self.compact()
+        return self._path(name)
+
+    def _snapshot(self, entries, seq):
+        name = f"snapshot-{seq}.json"
+        data = self._header("snapshot", seq)
+        data["stories"] = entries
+        self._write(name, data)
+        self.head = self.base = seq
+        self.hashes = {key: entry_hash(entry) for key, entry in entries.items()}
+        self._save_manifest()
+        return self._path(name)
+
+    def files(self):
+        """Return ``(kind, seq, name)`` for every chain file, oldest first."""
+        found = []
+        for name in os.listdir(self.directory) if os.path.isdir(self.directory) else ():
+            m = _FILE.match(name)
+            if m:
+                found.append((m.group(1), int(m.group(2)), name))
+        return sorted(found, key=lambda f: (f[1], f[0] == "snapshot"))
+
+    def replay(self, upto=None):
+        """Rebuild the exported entries as of export ``upto`` (default: head)."""
+        upto = self.head if upto is None else upto
+        if not self.base <= upto <= self.head:
+            raise ValueError(f"export {upto} is not in the chain ({self.base}-{self.head})")
+        entries = dict(self._read(f"snapshot-{self.base}.json")["stories"])
+        for seq in range(self.base + 1, upto + 1):
+            data = self._read(f"delta-{seq}.json")
+            if data.get("parent") != seq - 1:
+                raise ValueError(f"delta-{seq}.json does not follow export {seq - 1}")
+            Delta(data["added"], data["changed"], data["deleted"]).apply(entries)
+        return entries
+
+    def compact(self):
+        """Fold the chain into a snapshot at head and drop the files it replaces."""
+        if self.head == 0 or self.head == self.base:
+            return None
+        path = self._snapshot(self.replay(), self.head)
+        for kind, seq, name in self.files():
+            if seq < self.head or kind == "delta":
+                os.remove(self._path(name))
+        return path
@@ -0,0 +1,145 @@
+"""In-process espeak-ng through ctypes.
+
+libespeak-ng is loaded once and initialized in synchronous retrieval
+mode: ``espeak_Synth`` hands the samples to a callback, which collects
+them into a buffer, so speech never goes through a process or a file.
+IPA comes from ``espeak_TextToPhonemes``.
+
+The library keeps global state and is not thread-safe, so every call
+runs on one worker thread that owns it; callers on other threads queue
+their request and wait for the result. ``load()`` returns None when the
+library is missing (or ``SOCIALABERATTELSER_ESPEAK=subprocess`` is set)
+and callers fall back to the ``espeak-ng`` executable.
+"""
+import ctypes
+import ctypes.util
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from socialaberattelser.audio import Clip
+
+AUDIO_OUTPUT_SYNCHRONOUS = 2
+POS_CHARACTER = 1
+CHARS_UTF8 = 1
+PHONEMES_IPA = 0x02
+EE_OK = 0
+
+_SYNTH_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short),
+                                   ctypes.c_int, ctypes.c_void_p)
+
+
+class Espeak:
+    """A loaded libespeak-ng with a serialized request queue."""
+
+    def __init__(self, path):
+        self._lib = lib = ctypes.CDLL(path)
+        lib.espeak_Initialize.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_char_p, ctypes.c_int]
+        lib.espeak_Initialize.restype = ctypes.c_int
+        lib.espeak_SetSynthCallback.argtypes = [_SYNTH_CALLBACK]
+        lib.espeak_SetSynthCallback.restype = None
+        lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        lib.espeak_SetVoiceByName.restype = ctypes.c_int
+        lib.espeak_Synth.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int,
+                                     ctypes.c_uint, ctypes.c_uint,
+                                     ctypes.POINTER(ctypes.c_uint), ctypes.c_void_p]
+        lib.espeak_Synth.restype = ctypes.c_int
+        lib.espeak_TextToPhonemes.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.c_int,
+                                              ctypes.c_int]
+        lib.espeak_TextToPhonemes.restype = ctypes.c_char_p
+        self._voice = None
+        self._chunks = None
+        # Keep a reference: the library holds on to the function pointer.
+        self._callback = _SYNTH_CALLBACK(self._on_samples)
+        self._requests = queue.SimpleQueue()
+        ready = Future()
+        threading.Thread(target=self._run, args=(ready,), name="espeak", daemon=True).start()
+        self.rate = ready.result()
+
+    def _run(self, ready):
+        rate = self._lib.espeak_Initialize(AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0)
+        if rate <= 0:
+            ready.set_exception(OSError("espeak_Initialize failed"))
+            return
+        self._lib.espeak_SetSynthCallback(self._callback)
+        ready.set_result(rate)
+        while True:
+            fn, args, future = self._requests.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _call(self, fn, *args):
+        future = Future()
+        self._requests.put((fn, args, future))
+        return future.result()
+
+    def _on_samples(self, wav, count, _events):
+        if wav and count > 0:
+            self._chunks.append(ctypes.string_at(wav, count * 2))
+        return 0
+
+    def _set_voice(self, lang):
+        if lang != self._voice:
+            if self._lib.espeak_SetVoiceByName(lang.encode()) != EE_OK:
+                raise ValueError(f"no espeak-ng voice for {lang!r}")
+            self._voice = lang
+
+    def _synthesize(self, text, lang):
+        self._set_voice(lang)
+        data = text.encode("utf-8") + b"\0"
+        self._chunks = []
+        try:
+            err = self._lib.espeak_Synth(data, len(data), 0, POS_CHARACTER, 0, CHARS_UTF8,
+                                         None, None)
+            if err != EE_OK:
+                raise OSError(f"espeak_Synth failed ({err})")
+            return b"".join(self._chunks)
+        finally:
+            self._chunks = None
+
+    def _phonemes(self, text, lang):
+        self._set_voice(lang)
+        buf = ctypes.create_string_buffer(text.encode("utf-8"))
+        ptr = ctypes.c_void_p(ctypes.addressof(buf))
+        clauses = []
+        # Each call converts one clause and advances ptr; NULL at the end.
+        while ptr.value:
+            out = self._lib.espeak_TextToPhonemes(ctypes.byref(ptr), CHARS_UTF8, PHONEMES_IPA)
+            if out:
+                clauses.append(out.decode("utf-8").strip())
+        return " ".join(c for c in clauses if c)
+
+    def synthesize(self, text, lang="sv"):
+        """Return speech for ``text`` as a 16-bit mono ``Clip``."""
+        return Clip(self._call(self._synthesize, text, lang), self.rate, 1, 2)
+
+    def phonemes(self, text, lang="sv"):
+        """Return the IPA transcription of ``text``."""
+        return self._call(self._phonemes, text, lang)
+
+
+_instance = None
+_lock = threading.Lock()
+
+
+def load():
+    """Return the shared ``Espeak``, or None if the library cannot be used."""
+    global _instance
+    if os.environ.get("SOCIALABERATTELSER_ESPEAK") == "subprocess":
+        return None
+    with _lock:
+        if _instance is None:
+            path = ctypes.util.find_library("espeak-ng")
+            if path is None:
+                _instance = False
+            else:
+                try:
+                    _instance = Espeak(path)
+                except (OSError, AttributeError):
+                    _instance = False
+    return _instance or None
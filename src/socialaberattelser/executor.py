@@ -0,0 +1,251 @@
+"""Shared background work for everything slow.
+
+Work is submitted to one of three lanes, highest priority first:
+
+    interactive     speech the user is waiting to hear
+    prefetch        speech, sounds and data prepared ahead of time
+    export          exports, packages, imports, sync and site builds
+
+Queued tasks run by lane, oldest first within a lane, on a bounded pool
+of worker threads started on demand. One worker is always kept out of
+the lower lanes, so an interactive task never waits behind a long
+export.
+
+``on_done(result)`` and ``on_error(exception)`` run on the GLib main
+loop (through GLib.idle_add), or in the worker when PyGObject is not
+available. A cancelled ``CancelToken`` skips a task that has not
+started and drops the result of one that has; long tasks can call
+``token.check()`` to stop early. ``stats()`` reports queue depth and
+wait and run time histograms per lane.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+import traceback
+
+from socialaberattelser.tracing import Histogram, span
+
+try:
+    from gi.repository import GLib
+except ImportError:  # usable without PyGObject, e.g. in benchmarks
+    GLib = None
+
+LANES = ("interactive", "prefetch", "export")
+INTERACTIVE, PREFETCH, EXPORT = LANES
+IDLE_EXIT = 60.0
+
+
+class Cancelled(Exception):
+    """Raised by ``CancelToken.check()`` in a task that was cancelled."""
+
+
+class CancelToken:
+    __slots__ = ("cancelled",)
+
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled()
+
+
+class _Task:
+    __slots__ = ("fn", "args", "lane", "token", "on_done", "on_error", "name", "queued")
+
+    def __init__(self, fn, args, lane, token, on_done, on_error, name):
+        self.fn = fn
+        self.args = args
+        self.lane = lane
+        self.token = token
+        self.on_done = on_done
+        self.on_error = on_error
+        self.name = name
+        self.queued = time.perf_counter()
+
+
+class _LaneStats:
+    __slots__ = ("queued", "peak", "running", "submitted", "completed", "failed",
+                 "cancelled", "wait", "run")
+
+    def __init__(self):
+        self.queued = self.peak = self.running = 0
+        self.submitted = self.completed = self.failed = self.cancelled = 0
+        self.wait = Histogram()
+        self.run = Histogram()
+
+    def as_dict(self):
+        return {"queued": self.queued, "peak": self.peak, "running": self.running,
+                "submitted": self.submitted, "completed": self.completed,
+                "failed": self.failed, "cancelled": self.cancelled,
+                "wait": self.wait.as_dict(), "run": self.run.as_dict()}
+
+
+def _deliver_inline(fn, *args):
+    fn(*args)
+
+
+class Executor:
+    """Priority lanes over a bounded thread pool."""
+
+    def __init__(self, threads=None, deliver=None):
+        # At least two workers: one of them is reserved for interactive work.
+        self.threads = max(2, threads or min(4, os.cpu_count() or 1))
+        if deliver is None:
+            deliver = GLib.idle_add if GLib is not None else _deliver_inline
+        self._deliver = deliver
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._workers = 0
+        self._idle = 0
+        self._background = 0        # workers running prefetch or export tasks
+        self._lanes = {lane: _LaneStats() for lane in LANES}
+        self._closed = False
+
+    def submit(self, fn, *args, lane=EXPORT, token=None, on_done=None, on_error=None,
+               name=None):
+        """Run ``fn(*args)`` on a worker; returns the task's ``CancelToken``."""
+        if lane not in LANES:
+            raise ValueError(f"unknown lane {lane!r}")
+        token = token or CancelToken()
+        task = _Task(fn, args, lane, token, on_done, on_error,
+                     name or getattr(fn, "__name__", "task"))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("executor is shut down")
+            heapq.heappush(self._heap, (LANES.index(lane), next(self._seq), task))
+            stats = self._lanes[lane]
+            stats.submitted += 1
+            stats.queued += 1
+            stats.peak = max(stats.peak, stats.queued)
+            if self._idle == 0 and self._workers < self.threads:
+                self._workers += 1
+                threading.Thread(target=self._work, name=f"executor-{self._workers}",
+                                 daemon=True).start()
+            else:
+                self._cond.notify_all()
+        return token
+
+    # ── Workers ──────────────────────────────────────────────
+
+    def _next(self):
+        """Take the next task this worker may run, waiting for one; None to exit."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    break
+                if self._heap:
+                    lane_index, _seq, task = self._heap[0]
+                    if lane_index == 0 or self._background < self.threads - 1:
+                        heapq.heappop(self._heap)
+                        stats = self._lanes[task.lane]
+                        stats.queued -= 1
+                        stats.wait.add(time.perf_counter() - task.queued)
+                        if task.token.cancelled:
+                            stats.cancelled += 1
+                            continue
+                        stats.running += 1
+                        if lane_index:
+                            self._background += 1
+                        return task
+                self._idle += 1
+                woken = self._cond.wait(IDLE_EXIT)
+                self._idle -= 1
+                if not woken and not self._heap:
+                    break
+            self._workers -= 1
+            return None
+
+    def _work(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            start = time.perf_counter()
+            error = result = None
+            try:
+                with span(f"executor.{task.lane}.{task.name}"):
+                    result = task.fn(*task.args)
+            except Exception as e:
+                error = e
+            with self._cond:
+                stats = self._lanes[task.lane]
+                stats.running -= 1
+                stats.run.add(time.perf_counter() - start)
+                if task.lane != INTERACTIVE:
+                    self._background -= 1
+                if task.token.cancelled or isinstance(error, Cancelled):
+                    stats.cancelled += 1
+                elif error is not None:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+                self._cond.notify_all()
+            if task.token.cancelled or isinstance(error, Cancelled):
+                continue
+            if error is not None:
+                if task.on_error is not None:
+                    self._deliver(self._call, task.token, task.on_error, error)
+                else:
+                    traceback.print_exception(type(error), error, error.__traceback__)
+            elif task.on_done is not None:
+                self._deliver(self._call, task.token, task.on_done, result)
+
+    @staticmethod
+    def _call(token, callback, value):
+        if not token.cancelled:
+            callback(value)
+        return False
+
+    # ── Metrics ──────────────────────────────────────────────
+
+    def depth(self, lane=None):
+        """Tasks waiting in ``lane``, or in all lanes."""
+        with self._cond:
+            if lane is not None:
+                return self._lanes[lane].queued
+            return len(self._heap)
+
+    def stats(self):
+        with self._cond:
+            return {"threads": self._workers, "idle": self._idle,
+                    "lanes": {lane: s.as_dict() for lane, s in self._lanes.items()}}
+
+    def summary(self):
+        lines = []
+        for lane, s in self.stats()["lanes"].items():
+            wait = s["wait"]
+            lines.append(f"{lane:12} {s['queued']} queued (peak {s['peak']}), "
+                         f"{s['completed']} done, {s['failed']} failed, {s['cancelled']} cancelled, "
+                         f"wait p50 {wait.get('p50_ms', 0):.1f} ms p99 {wait.get('p99_ms', 0):.1f} ms")
+        return "\n".join(lines)
+
+    def shutdown(self):
+        """Stop the workers; queued tasks are dropped."""
+        with self._cond:
+            self._closed = True
+            for _lane, _seq, task in self._heap:
+                task.token.cancel()
+            self._heap.clear()
+            for s in self._lanes.values():
+                s.queued = 0
+            self._cond.notify_all()
+
+
+_executor = None
+_lock = threading.Lock()
+
+
+def executor():
+    """The process-wide executor."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = Executor()
+        return _executor
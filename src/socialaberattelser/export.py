@@ -1,21 +1,21 @@
 """Export functionality for socialaberattelser."""
 import csv
 import json
-import gettext
 import os
 from datetime import datetime
 from socialaberattelser import __version__
+from socialaberattelser.i18n import N_, gettext as _
+from socialaberattelser.tracing import traced
 
-_ = gettext.gettext
-
-APP_LABEL = _("Social Stories")
+APP_LABEL = N_("Social Stories")
 WEBSITE = "www.autismappar.se"
 
 
 def _footer():
-    return f"{APP_LABEL} v{__version__} — {WEBSITE}"
+    return f"{_(APP_LABEL)} v{__version__} — {WEBSITE}"
 
 
+@traced("export.csv")
 def export_csv(data, filepath):
     """Export data to CSV with branding footer."""
     with open(filepath, "w", newline="", encoding="utf-8") as f:
@@ -27,10 +27,11 @@ def export_csv(data, filepath):
         writer.writerow([_footer()])
 
 
+@traced("export.json")
 def export_json(data, filepath):
     """Export data to JSON with branding."""
     out = {
-        "app": APP_LABEL,
+        "app": _(APP_LABEL),
         "version": __version__,
         "_website": WEBSITE,
         "exported": datetime.now().isoformat(),
@@ -40,9 +41,10 @@ def export_json(data, filepath):
         json.dump(out, f, ensure_ascii=False, indent=2)
 
 
+@traced("export.pdf")
 def export_pdf(data, filepath):
     """Export data to simple text-PDF with branding footer."""
-    lines = [f"{APP_LABEL} — {_('Export')}", ""]
+    lines = [f"{_(APP_LABEL)} — {_('Export')}", ""]
     for entry in data:
         lines.append(f"{entry.get('date', '')} | {entry.get('details', '')} | {entry.get('result', '')}")
     lines.extend(["", _footer()])
@@ -0,0 +1,194 @@
+"""Durable per-story version history.
+
+Steps are stored once as content-addressed blobs and versions refer to
+them by hash, so a version of a long story that changed one step adds
+one blob plus a list of hashes:
+
+    objects/<2 hex>/<62 hex>    one step in its stories.json shape
+    stories/<id>.jsonl          one version per line, oldest first:
+                                {"v": 3, "time": ..., "title": ..., "steps": [hash, ...]}
+
+Diffs compare the hash lists and only read the blobs of steps that
+differ. Pruning rewrites the version files and then deletes blobs no
+remaining version refers to.
+"""
+import difflib
+import hashlib
+import json
+import os
+import time
+from urllib.parse import quote, unquote
+
+from socialaberattelser.model import Story
+from socialaberattelser.persist import atomic_write
+
+
+def _blob_hash(step):
+    data = json.dumps(step, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest(), data
+
+
+class Version:
+    __slots__ = ("number", "time", "title", "steps", "extra")
+
+    def __init__(self, number, time, title, steps, extra=None):
+        self.number = number
+        self.time = time
+        self.title = title
+        self.steps = steps
+        self.extra = extra
+
+    def __repr__(self):
+        return f"<Version {self.number} {self.title!r} ({len(self.steps)} steps)>"
+
+    def to_json(self):
+        data = {"v": self.number, "time": self.time, "title": self.title, "steps": self.steps}
+        if self.extra:
+            data["extra"] = self.extra
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data["v"], data["time"], data["title"], data["steps"], data.get("extra"))
+
+
+class History:
+    """Version store in ``directory``; story ids name the version files."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._objects = os.path.join(directory, "objects")
+        self._stories = os.path.join(directory, "stories")
+        self._versions = {}
+
+    def _story_path(self, story_id):
+        return os.path.join(self._stories, quote(story_id, safe="") + ".jsonl")
+
+    def _blob_path(self, digest):
+        return os.path.join(self._objects, digest[:2], digest[2:])
+
+    def _put_blob(self, digest, data):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path) as f:
+            f.write(data)
+
+    def _get_blob(self, digest):
+        with open(self._blob_path(digest), encoding="utf-8") as f:
+            return json.load(f)
+
+    def versions(self, story_id):
+        """Return the versions of a story, oldest first."""
+        versions = self._versions.get(story_id)
+        if versions is None:
+            versions = []
+            try:
+                with open(self._story_path(story_id), encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            versions.append(Version.from_json(json.loads(line)))
+            except FileNotFoundError:
+                pass
+            self._versions[story_id] = versions
+        return versions
+
+    def story_ids(self):
+        try:
+            names = os.listdir(self._stories)
+        except FileNotFoundError:
+            return []
+        return [unquote(n[:-6]) for n in sorted(names) if n.endswith(".jsonl")]
+
+    def record(self, story, now=None):
+        """Add a version of ``story`` unless it equals the latest; returns it or None."""
+        if story.id is None:
+            raise ValueError("only stories with an id have a history")
+        versions = self.versions(story.id)
+        latest = versions[-1] if versions else None
+        known = set(latest.steps) if latest else set()
+        steps = []
+        for i in range(len(story)):
+            digest, data = _blob_hash(story.step_json(i))
+            steps.append(digest)
+            if digest not in known:
+                self._put_blob(digest, data)
+        data = story.to_dict()
+        extra = {k: v for k, v in data.items() if k not in ("id", "title", "steps")} or None
+        if latest and (latest.title, latest.steps, latest.extra) == (story.title, steps, extra):
+            return None
+        version = Version(latest.number + 1 if latest else 1,
+                          time.time() if now is None else now, story.title, steps, extra)
+        os.makedirs(self._stories, exist_ok=True)
+        with open(self._story_path(story.id), "a", encoding="utf-8") as f:
+            f.write(json.dumps(version.to_json(), ensure_ascii=False) + "\n")
+        versions.append(version)
+        return version
+
+    def get(self, story_id, number):
+        for version in self.versions(story_id):
+            if version.number == number:
+                return version
+        raise KeyError(f"{story_id} has no version {number}")
+
+    def load(self, story_id, number):
+        """Rebuild version ``number`` of a story as a ``Story``."""
+        version = self.get(story_id, number)
+        data = {"id": story_id, "title": version.title,
+                "steps": [self._get_blob(h) for h in version.steps]}
+        data.update(version.extra or {})
+        return Story.from_dict(data)
+
+    def restore(self, story_id, number, now=None):
+        """Return version ``number`` as a ``Story`` and record it as the newest version."""
+        story = self.load(story_id, number)
+        self.record(story, now)
+        return story
+
+    def diff(self, story_id, a, b):
+        """Compare two versions step by step.
+
+        Returns ``(tag, old_steps, new_steps)`` tuples with the tags of
+        ``difflib.SequenceMatcher``; "equal" runs carry step counts only.
+        """
+        old, new = self.get(story_id, a).steps, self.get(story_id, b).steps
+        out = []
+        matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                out.append((tag, i2 - i1, j2 - j1))
+            else:
+                out.append((tag, [self._get_blob(h) for h in old[i1:i2]],
+                            [self._get_blob(h) for h in new[j1:j2]]))
+        return out
+
+    def prune(self, keep=None, max_age=None, now=None):
+        """Drop versions beyond the newest ``keep`` or older than ``max_age`` seconds.
+
+        The latest version of every story is always kept. Returns the
+        number of versions removed; unreferenced blobs are deleted.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        referenced = set()
+        for story_id in self.story_ids():
+            versions = self.versions(story_id)
+            kept = versions[-keep:] if keep else list(versions)
+            if max_age is not None:
+                kept = [v for v in kept[:-1] if now - v.time <= max_age] + kept[-1:]
+            if len(kept) != len(versions):
+                removed += len(versions) - len(kept)
+                path = self._story_path(story_id)
+                with atomic_write(path) as f:
+                    for v in kept:
+                        f.write(json.dumps(v.to_json(), ensure_ascii=False) + "\n")
+                self._versions[story_id] = kept
+            for v in kept:
+                referenced.update(v.steps)
+        if removed:
+            for root, _dirs, files in os.walk(self._objects):
+                for name in files:
+                    if os.path.basename(root) + name not in referenced:
+                        os.remove(os.path.join(root, name))
+        return removed
@@ -0,0 +1,132 @@
+"""Translation helpers with lazy lookups and runtime language switching."""
+import gettext as _gettext
+import locale
+import os
+
+TEXTDOMAIN = "socialaberattelser"
+LOCALE_DIRS = [os.path.join(os.path.dirname(__file__), "locale"), "/usr/share/locale"]
+
+_localedir = None
+_language = None
+_effective = None
+_translations = {}
+_cache = {}
+_listeners = []
+
+
+def N_(msgid):
+    """Mark a string for extraction without translating it (xgettext -kN_)."""
+    return msgid
+
+
+def init():
+    """Bind the text domain; translations are loaded on first lookup."""
+    global _localedir
+    for p in LOCALE_DIRS:
+        if os.path.isdir(p):
+            _gettext.bindtextdomain(TEXTDOMAIN, p)
+            try:
+                locale.bindtextdomain(TEXTDOMAIN, p)
+            except AttributeError:
+                pass
+            _localedir = p
+            break
+    _gettext.textdomain(TEXTDOMAIN)
+
+
+def _catalog(lang):
+    t = _translations.get(lang)
+    if t is None:
+        languages = [lang] if lang else None
+        t = _gettext.translation(TEXTDOMAIN, _localedir, languages=languages, fallback=True)
+        _translations[lang] = t
+    return t
+
+
+def gettext(msgid):
+    """Translate ``msgid`` for the current language, caching the result."""
+    cache = _cache.get(_language)
+    if cache is None:
+        cache = _cache[_language] = {}
+    try:
+        return cache[msgid]
+    except KeyError:
+        text = cache[msgid] = _catalog(_language).gettext(msgid)
+        return text
+
+
+def translator(lang):
+    """Return a gettext function for ``lang`` that leaves the active language alone."""
+    return _catalog(lang).gettext
+
+
+def language():
+    """Return the active language code, or None for the system locale."""
+    return _language
+
+
+def effective_language():
+    """Return the code of the language text is shown in, resolving the system locale.
+
+    Follows gettext: the chosen language, else the first of $LANGUAGE,
+    $LC_ALL, $LC_MESSAGES and $LANG that has a catalog; "en" (the
+    untranslated msgids) when none has.
+    """
+    global _effective
+    if _effective is None:
+        if _language:
+            wanted = [_language]
+        else:
+            wanted = []
+            for var in ("LANGUAGE", "LC_ALL", "LC_MESSAGES", "LANG"):
+                value = os.environ.get(var)
+                if value:
+                    wanted = value.split(":")
+                    break
+        installed = available_languages()
+        _effective = "en"
+        for name in wanted:
+            name = name.split(".")[0].split("@")[0]
+            match = next((code for code in (name, name.split("_")[0]) if code in installed), None)
+            if match:
+                _effective = match
+                break
+    return _effective
+
+
+def available_languages():
+    """Return the language codes that have a compiled catalog installed."""
+    langs = {"en"}
+    for p in LOCALE_DIRS:
+        if not os.path.isdir(p):
+            continue
+        for lang in os.listdir(p):
+            if os.path.exists(os.path.join(p, lang, "LC_MESSAGES", TEXTDOMAIN + ".mo")):
+                langs.add(lang)
+    return sorted(langs)
+
+
+def set_language(lang):
+    """Switch the catalog at runtime and notify listeners.
+
+    ``lang`` is a code such as "sv", or None to follow the system locale.
+    Already cached translations for other languages are kept, so switching
+    back and forth does not reload catalogs.
+    """
+    global _language, _effective
+    if lang == _language:
+        return
+    _language = lang
+    _effective = None
+    for cb in list(_listeners):
+        cb(lang)
+
+
+def connect(callback):
+    """Call ``callback(lang)`` whenever the language changes."""
+    _listeners.append(callback)
+
+
+def disconnect(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
@@ -0,0 +1,259 @@
+"""Bulk import of stories from JSON/CSV files, folders, ZIP archives and packages."""
+import csv
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+from socialaberattelser.model import Story
+from socialaberattelser.package import StoryPackage, is_package
+
+EXTENSIONS = (".json", ".csv")
+BATCH_SIZE = 256
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class ImportResult:
+    __slots__ = ("stories", "duplicates", "errors")
+
+    def __init__(self):
+        self.stories = []
+        self.duplicates = 0
+        self.errors = []
+
+
+def iter_json(fp):
+    """Yield story dicts from a JSON file without loading it all at once.
+
+    Accepts a top-level array of stories (streamed element by element), a
+    single story object, or an object with a "stories" array.
+    """
+    buf = ""
+    pos = 0
+    eof = False
+    in_array = None
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = fp.read(CHUNK_SIZE)
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if in_array is None:
+            in_array = buf[pos] == "["
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == "]":
+            return
+        try:
+            obj, end = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        pos = end
+        if not in_array and isinstance(obj, dict) and isinstance(obj.get("stories"), list):
+            yield from obj["stories"]
+        else:
+            yield obj
+        if not in_array:
+            return
+
+
+def iter_csv(fp):
+    """Yield story dicts from CSV rows of ``title,text[,emoji]``.
+
+    Consecutive rows with the same title form one story.
+    """
+    story = None
+    for row in csv.DictReader(fp):
+        title = (row.get("title") or "").strip()
+        text = row.get("text") or row.get("step") or ""
+        if story is None or title != story["title"]:
+            if story is not None:
+                yield story
+            story = {"title": title, "steps": []}
+        emoji = (row.get("emoji") or "").strip()
+        story["steps"].append({"text": text, "emoji": emoji} if emoji else text)
+    if story is not None:
+        yield story
+
+
+def _drop_images(story):
+    """Remove step images: a path in a plain story file may point anywhere."""
+    steps = story.get("steps") if isinstance(story, dict) else None
+    for step in steps if isinstance(steps, list) else ():
+        if isinstance(step, dict):
+            step.pop("image", None)
+    return story
+
+
+def _parse(name, fp):
+    """Yield ``(name, raw_story)``; a broken file yields one error marker."""
+    parser = iter_csv if name.lower().endswith(".csv") else iter_json
+    try:
+        for story in parser(fp):
+            yield name, _drop_images(story)
+    except (ValueError, csv.Error) as e:
+        yield name, {"_error": str(e)}
+
+
+def iter_sources(paths, images_dir=None):
+    """Yield ``(name, raw_story)`` from files, folders, ZIP archives and packages.
+
+    Images in packages are extracted to ``images_dir``.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                yield from iter_sources((os.path.join(root, f) for f in sorted(files)
+                                         if f.lower().endswith(EXTENSIONS + (".zip", ".sbpkg"))),
+                                        images_dir)
+        elif is_package(path):
+            with StoryPackage(path) as pkg:
+                for entry in pkg.index:
+                    data = pkg.extract_images(pkg.story_dict(entry["id"]), images_dir)
+                    yield f"{path}:{entry['path']}", data
+        elif path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(EXTENSIONS):
+                        continue
+                    with zf.open(info) as raw:
+                        fp = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                        yield from _parse(f"{path}:{info.filename}", fp)
+        elif path.lower().endswith(EXTENSIONS):
+            with open(path, encoding="utf-8-sig", newline="") as fp:
+                yield from _parse(path, fp)
+
+
+def content_hash(data):
+    """Hash the title and steps of a story dict, ignoring ids and whitespace."""
+    key = json.dumps([data["title"].strip(), data["steps"]], ensure_ascii=False,
+                     separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _own_image(image, images_dir):
+    """True if ``image`` is a file directly inside ``images_dir``."""
+    if not isinstance(image, str) or not image or images_dir is None:
+        return False
+    path = os.path.realpath(image)
+    return os.path.dirname(path) == os.path.realpath(images_dir) and os.path.isfile(path)
+
+
+def normalize(raw, images_dir=None):
+    """Validate one raw story and return ``(story_dict, hash)``; raises ValueError.
+
+    Step images are kept only if they are files in ``images_dir``, where
+    package import extracts them.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("not a story object")
+    if "_error" in raw:
+        raise ValueError(raw["_error"])
+    title = raw.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("missing title")
+    steps = raw.get("steps")
+    if not isinstance(steps, list):
+        raise ValueError("missing steps")
+    clean = []
+    for step in steps:
+        if isinstance(step, str):
+            text, emoji, image = step, None, None
+        elif isinstance(step, dict) and isinstance(step.get("text"), str):
+            text, emoji, image = step["text"], step.get("emoji") or None, step.get("image")
+        else:
+            raise ValueError("invalid step")
+        text = " ".join(text.split())
+        if not text:
+            continue
+        image = image if _own_image(image, images_dir) else None
+        if emoji or image:
+            step = {"text": text}
+            if emoji:
+                step["emoji"] = emoji
+            if image:
+                step["image"] = image
+            clean.append(step)
+        else:
+            clean.append(text)
+    if not clean:
+        raise ValueError("no steps")
+    data = {"title": " ".join(title.split()), "steps": clean}
+    return data, content_hash(data)
+
+
+def _normalize_batch(batch, images_dir=None):
+    out = []
+    for name, raw in batch:
+        try:
+            out.append((name, normalize(raw, images_dir), None))
+        except ValueError as e:
+            out.append((name, None, str(e)))
+    return out
+
+
+def _batches(sources, size):
+    batch = []
+    for item in sources:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_paths(paths, existing=(), progress=None, images_dir=None):
+    """Parse, validate and de-duplicate stories from ``paths``.
+
+    Files are streamed and normalized batch by batch in the calling thread
+    (a background worker in the app). Stories whose content hash
+    matches ``existing`` or an earlier import are counted as duplicates.
+    ``progress(done)`` is called after each batch. Images in packages are
+    extracted to ``images_dir``; otherwise nothing is saved: the caller
+    commits ``result.stories`` in one write.
+    """
+    seen = {content_hash(s.to_dict()) for s in existing}
+    result = ImportResult()
+    done = 0
+
+    def collect(batch_result):
+        nonlocal done
+        for name, normalized, error in batch_result:
+            done += 1
+            if error:
+                result.errors.append((name, error))
+                continue
+            data, digest = normalized
+            if digest in seen:
+                result.duplicates += 1
+                continue
+            seen.add(digest)
+            result.stories.append(Story.from_dict(data))
+        if progress:
+            progress(done)
+
+    try:
+        for batch in _batches(iter_sources(paths, images_dir), BATCH_SIZE):
+            collect(_normalize_batch(batch, images_dir))
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        result.errors.append((", ".join(paths), str(e)))
+    return result
@@ -0,0 +1,104 @@
+"""Input-to-frame latency monitor built on the window's Gdk.FrameClock."""
+from collections import deque
+
+from gi.repository import Gdk, GLib, Gtk
+
+from socialaberattelser import tracing
+
+KINDS = ("navigate", "scroll", "dialog")
+MAX_SAMPLES = 500
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+class LatencyMonitor:
+    """Measure time from an input event until the frame showing its result.
+
+    Call ``mark(kind)`` from the input handler. The next frame clock
+    "after-paint" whose frame started after the mark closes the
+    measurement. Samples (in ms) are kept per kind and also fed to the
+    tracing histograms as ``latency.<kind>``.
+    """
+
+    def __init__(self, window):
+        self._window = window
+        self._pending = []
+        self._samples = {kind: deque(maxlen=MAX_SAMPLES) for kind in KINDS}
+        self._clock = None
+        self._handler = None
+        self._label = Gtk.Label(halign=Gtk.Align.END, valign=Gtk.Align.START, xalign=0)
+        self._label.add_css_class("osd")
+        self._label.add_css_class("monospace")
+        self._label.set_margin_top(52)
+        self._label.set_margin_end(8)
+        self._label.set_can_target(False)
+        self._label.set_visible(False)
+
+    @property
+    def overlay(self):
+        """The on-screen label; add it to a Gtk.Overlay."""
+        return self._label
+
+    def mark(self, kind):
+        self._pending.append((kind, GLib.get_monotonic_time()))
+        clock = self._frame_clock()
+        if clock is not None:
+            clock.request_phase(Gdk.FrameClockPhase.PAINT)
+
+    def _frame_clock(self):
+        if self._clock is None:
+            self._clock = self._window.get_frame_clock()
+            if self._clock is not None:
+                self._handler = self._clock.connect("after-paint", self._on_after_paint)
+        return self._clock
+
+    def _on_after_paint(self, clock):
+        if not self._pending:
+            return
+        frame_start = clock.get_frame_time()
+        now = GLib.get_monotonic_time()
+        still_waiting = []
+        for kind, t in self._pending:
+            # Input that arrived after this frame began is painted next frame.
+            if t > frame_start:
+                still_waiting.append((kind, t))
+                continue
+            ms = (now - t) / 1000
+            self._samples[kind].append(ms)
+            if tracing.ENABLED:
+                tracing.observe(f"latency.{kind}", ms / 1000)
+        recorded = len(still_waiting) < len(self._pending)
+        self._pending = still_waiting
+        if still_waiting:
+            clock.request_phase(Gdk.FrameClockPhase.PAINT)
+        if recorded and self._label.get_visible():
+            self._update_label()
+
+    def stats(self):
+        """Return p50/p90/p99 in ms per kind over the last ``MAX_SAMPLES``."""
+        return {kind: {"count": len(s), "p50": percentile(s, 50),
+                       "p90": percentile(s, 90), "p99": percentile(s, 99)}
+                for kind, s in self._samples.items()}
+
+    def _update_label(self):
+        lines = []
+        for kind, st in self.stats().items():
+            lines.append(f"{kind:<9} p50 {st['p50']:6.1f}  p90 {st['p90']:6.1f}  "
+                         f"p99 {st['p99']:6.1f} ms  n={st['count']}")
+        self._label.set_label("\n".join(lines))
+
+    def toggle_overlay(self):
+        visible = not self._label.get_visible()
+        self._label.set_visible(visible)
+        if visible:
+            self._update_label()
+
+    def disconnect(self):
+        if self._clock is not None and self._handler is not None:
+            self._clock.disconnect(self._handler)
+        self._clock = self._handler = None
@@ -0,0 +1,93 @@
+"""Binary snapshot of the parsed library for fast warm starts.
+
+Parsing stories.json and resolving template references is the bulk of
+startup time for large libraries. The cache stores the resulting
+``Story`` objects and the derived search index as one pickle behind a
+small header:
+
+    magic, format version, header length
+    header (JSON): app version, source size, mtime and sha256
+    payload (pickle)
+
+It is read with a single ``read()``. The header is checked against the
+current stories.json: size and mtime first, then the content hash, so a
+touched or edited file, a different app version or a damaged cache all
+fall back to a full parse.
+"""
+import hashlib
+import json
+import os
+import pickle
+import struct
+
+from socialaberattelser import __version__
+from socialaberattelser.persist import atomic_write
+from socialaberattelser.tracing import traced
+
+MAGIC = b"SBLIB\0"
+VERSION = 2
+_PREFIX = struct.Struct("<6sHI")
+
+
+def signature(path):
+    """Return size, mtime and sha256 of ``path`` (None if it does not exist)."""
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": hashlib.sha256(data).hexdigest()}
+
+
+class LibraryCache:
+    """Snapshot at ``path`` of the library parsed from ``source``."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+
+    @traced("story.load_cache")
+    def read(self):
+        """Return the cached payload, or None if it is missing or stale."""
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+            magic, version, size = _PREFIX.unpack_from(blob)
+            if magic != MAGIC or version != VERSION:
+                return None
+            start = _PREFIX.size + size
+            header = json.loads(blob[_PREFIX.size:start])
+            if header.get("app") != __version__:
+                return None
+            st = os.stat(self.source)
+            src = header["source"]
+            if (st.st_size, st.st_mtime_ns) != (src["size"], src["mtime_ns"]):
+                return None
+            if signature(self.source)["sha256"] != src["sha256"]:
+                return None
+            return pickle.loads(memoryview(blob)[start:])
+        except (OSError, ValueError, KeyError, TypeError, struct.error,
+                pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    @traced("story.save_cache")
+    def write(self, payload):
+        """Snapshot ``payload`` against the current source file."""
+        src = signature(self.source)
+        if src is None:
+            self.clear()
+            return
+        header = json.dumps({"app": __version__, "source": src}).encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with atomic_write(self.path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+            f.write(header)
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
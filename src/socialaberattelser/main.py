@@ -1,80 +1,152 @@
 import os
 """Sociala berättelser - Create and read social stories."""
-import sys, os, json, gettext, locale
+import sys, os, json, threading, time, uuid
+from datetime import datetime
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, Gio, GLib, Gdk
 from socialaberattelser import __version__
-from socialaberattelser.accessibility import apply_large_text
 from socialaberattelser.accessibility import AccessibilityManager
+from socialaberattelser.store import StoryStore
+from socialaberattelser.libcache import LibraryCache
+from socialaberattelser.sync import SyncFolder
+from socialaberattelser.activity import ActivityLog, day
+from socialaberattelser.reminders import ReminderScheduler
+from socialaberattelser.profiles import ProfileManager
+from socialaberattelser.site import SiteBuilder
+from socialaberattelser import tracing
+from socialaberattelser import memprof
+from socialaberattelser.tracing import traced
+from socialaberattelser.latency import LatencyMonitor
+from socialaberattelser.autoplay import AutoPlayer, step_image
+from socialaberattelser.model import Story, story_key
+from socialaberattelser.history import History
+from socialaberattelser import templates
+from socialaberattelser import importer
+from socialaberattelser import audio
+from socialaberattelser.executor import executor
+from socialaberattelser.config import Config
+from socialaberattelser.persist import atomic_write
+from socialaberattelser.package import EXTENSION as PACKAGE_EXTENSION, write_package
+from socialaberattelser import i18n
+from socialaberattelser.i18n import N_
 
-TEXTDOMAIN = "socialaberattelser"
-for p in [os.path.join(os.path.dirname(__file__), "locale"), "/usr/share/locale"]:
-    if os.path.isdir(p):
-        gettext.bindtextdomain(TEXTDOMAIN, p)
-        locale.bindtextdomain(TEXTDOMAIN, p)
-        break
-gettext.textdomain(TEXTDOMAIN)
-_ = gettext.gettext
+i18n.init()
+_ = i18n.gettext
 
 CONFIG_DIR = os.path.join(GLib.get_user_config_dir(), "socialaberattelser")
 STORIES_FILE = os.path.join(CONFIG_DIR, "stories.json")
+EXPORTS_DIR = os.path.join(CONFIG_DIR, "exports")
+HISTORY_DIR = os.path.join(CONFIG_DIR, "history")
+ACTIVITY_DIR = os.path.join(CONFIG_DIR, "activity")
+IMAGES_DIR = os.path.join(CONFIG_DIR, "images")
+REMINDERS_FILE = os.path.join(CONFIG_DIR, "reminders.json")
+LIBRARY_CACHE = os.path.join(GLib.get_user_cache_dir(), "socialaberattelser", "library.cache")
 
-TEMPLATE_STORIES = [
-    {"title": _("Going to School"), "steps": [
-        _("I wake up in the morning."),
-        _("I get dressed and eat breakfast."),
-        _("I take my bag and go to school."),
-        _("At school, I say hello to my teacher."),
-        _("I sit at my desk and listen."),
-        _("After school, I go home."),
-    ]},
-    {"title": _("Visiting the Doctor"), "steps": [
-        _("Today I am going to the doctor."),
-        _("The doctor is a nice person who helps me stay healthy."),
-        _("The doctor might look in my ears and mouth."),
-        _("It might feel a little strange but it is okay."),
-        _("When we are done, I can go home."),
-    ]},
-    {"title": _("Making a Friend"), "steps": [
-        _("I see someone playing alone."),
-        _("I walk over and say hello."),
-        _("I ask: Can I play with you?"),
-        _("We play together and have fun."),
-        _("Now I have a new friend!"),
-    ]},
-]
+LANGUAGE_NAMES = {"en": "English", "sv": "Svenska"}
+PRUNE_INTERVAL = 24 * 3600
 
+
+_story_title = templates.display_title
+_step_text = templates.display_step
+
+
+def _story_texts(story):
+    yield _story_title(story)
+    for i in range(len(story)):
+        yield _step_text(story, i)
+
+
+_export_lock = threading.Lock()
+_export_chain = None
+
+
+def _export_incremental(entries):
+    """Write the next delta to EXPORTS_DIR; runs one export at a time."""
+    global _export_chain
+    from socialaberattelser.delta import ExportChain
+    with _export_lock:
+        if _export_chain is None:
+            _export_chain = ExportChain(EXPORTS_DIR)
+        return _export_chain.export(entries)
+
+
+def _export_row(story, activity=None, profile="default"):
+    stats = activity.story(story_key(story), profile) if activity is not None else None
+    if stats is None:
+        return {"date": "", "details": _story_title(story), "result": f'{len(story)} steps'}
+    return {"date": day(stats["last"]), "details": _story_title(story),
+            "result": _("%d steps, opened %d times, completed %d times")
+            % (len(story), stats.get("open", 0), stats.get("complete", 0))}
+
+
+def _progress_rows(activity, stories, profile):
+    titles = {story_key(s): _story_title(s) for s in stories}
+    return [{"date": d, "details": titles.get(key, key),
+             "result": _("opened %d, %d steps, read aloud %d, completed %d")
+             % (counts.get("open", 0), counts.get("step", 0), counts.get("speak", 0),
+                counts.get("complete", 0))}
+            for d, key, counts in activity.report(profile)]
+
+
+# An unreadable stories.json is moved aside to stories.json.corrupt before
+# the default library is loaded (and later saved) in its place. As long as
+# that file is there sync must not delete what is missing from the library.
+CORRUPT_FILE = STORIES_FILE + ".corrupt"
+
+
+def _library_fallback():
+    return os.path.exists(CORRUPT_FILE)
+
+
+def _set_aside(path):
+    """Move ``path`` aside to CORRUPT_FILE without replacing an earlier one."""
+    target = CORRUPT_FILE
+    if os.path.exists(target):
+        target += datetime.now().strftime("-%Y%m%d-%H%M%S")
+    try:
+        os.replace(path, target)
+    except OSError:
+        pass
+
+
+@traced("story.load")
 def _load_stories():
     try:
-        with open(STORIES_FILE) as f: return json.load(f)
-    except: return [dict(s) for s in TEMPLATE_STORIES]
+        with open(STORIES_FILE, encoding="utf-8") as f: return templates.load_entries(json.load(f))
+    except:
+        if os.path.exists(STORIES_FILE):
+            _set_aside(STORIES_FILE)
+        return templates.default_library()
 
+@traced("story.save")
 def _save_stories(stories):
     os.makedirs(CONFIG_DIR, exist_ok=True)
-    with open(STORIES_FILE, "w") as f: json.dump(stories, f, ensure_ascii=False, indent=2)
+    with atomic_write(STORIES_FILE) as f: json.dump(templates.dump_entries(stories), f, ensure_ascii=False, indent=2)
+
 
 
+def _new_store(schedule=None):
+    return StoryStore(_load_stories, _save_stories, render=_story_texts,
+                      history=History(HISTORY_DIR), schedule=schedule,
+                      background=lambda fn: executor().submit(fn, name="history"),
+                      cache=LibraryCache(LIBRARY_CACHE, STORIES_FILE), language=i18n.language())
 
-def _settings_path():
-    xdg = os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config"))
-    d = os.path.join(xdg, "socialaberattelser")
-    os.makedirs(d, exist_ok=True)
-    return os.path.join(d, "settings.json")
 
-def _load_settings():
-    p = _settings_path()
-    if os.path.exists(p):
-        import json
-        with open(p) as f:
-            return json.load(f)
-    return {}
+_fallback_store = None
+
+
+def _shared_store(app):
+    """The application's store; windows created without one share a module-level store."""
+    global _fallback_store
+    store = getattr(app, "store", None)
+    if store is None:
+        if _fallback_store is None:
+            _fallback_store = _new_store()
+        store = _fallback_store
+    return store
 
-def _save_settings(s):
-    import json
-    with open(_settings_path(), "w") as f:
-        json.dump(s, f, indent=2)
 
 class StoryApp(Adw.Application):
     def __init__(self):
@@ -82,25 +154,83 @@ class StoryApp(Adw.Application):
                          flags=Gio.ApplicationFlags.DEFAULT_FLAGS)
 
     def do_activate(self):
-        apply_large_text()
-        win = self.props.active_window or StoryWindow(application=self)
+        win = self.props.active_window
+        if win is None:
+            win = StoryWindow(application=self)
+            win.accessibility = AccessibilityManager(win, self)
+            _restore_session(win, self.config)
+            win.connect("close-request", _save_session, self.config)
         win.present()
-        if not self.settings.get("welcome_shown"):
+        if not self.config.get("settings.welcome_shown"):
             self._show_welcome(win)
 
-
     def do_startup(self):
         Adw.Application.do_startup(self)
+        self.config = Config(CONFIG_DIR, schedule=GLib.timeout_add)
+        self.profiles = ProfileManager("socialaberattelser", self.config)
+        audio.engine().preload()
+        lang = self.config.get("settings.language")
+        i18n.set_language(lang or None)
+        self.store = _new_store(schedule=GLib.timeout_add)
+        self.activity = ActivityLog(ACTIVITY_DIR, schedule=GLib.timeout_add)
+        self.reminders = ReminderScheduler(REMINDERS_FILE, GLib.timeout_add, GLib.source_remove)
+        self.reminders.connect(self._on_reminder)
+        self._prune_history()
+        memprof.register("store.stories", lambda: len(self.store))
+        memprof.register("search.tokens", lambda: len(self.store.search))
+        memprof.register("history.loaded", lambda: len(self.store.history._versions))
+        memprof.register("i18n.cached", lambda: sum(len(c) for c in i18n._cache.values()))
+        memprof.register("executor.queued", lambda: executor().depth())
+        action = Gio.SimpleAction.new_stateful("language", GLib.VariantType.new("s"),
+                                               GLib.Variant("s", lang))
+        action.connect("activate", self._on_language)
+        self.add_action(action)
+        action = Gio.SimpleAction.new_stateful("profile", GLib.VariantType.new("s"),
+                                               GLib.Variant("s", self.profiles.current))
+        action.connect("activate", self._on_profile)
+        self.add_action(action)
+        action = Gio.SimpleAction.new("open-story", GLib.VariantType.new("s"))
+        action.connect("activate", self._on_open_story)
+        self.add_action(action)
         for name, cb, accel in [
             ("quit", lambda *_: self.quit(), "<Control>q"),
             ("about", self._on_about, None),
             ("export", self._on_export, "<Control>e"),
+            ("import", self._on_import, "<Control>i"),
+            ("import-folder", self._on_import_folder, None),
+            ("sync", self._on_sync, None),
+            ("sync-folder", self._on_sync_folder, None),
+            ("export-package", self._on_export_package, None),
+            ("export-progress", self._on_export_progress, None),
+            ("export-site", self._on_export_site, None),
+            ("dump-trace", self._on_dump_trace, "<Control><Shift>t"),
+            ("toggle-latency", self._on_toggle_latency, "<Control><Shift>l"),
+            ("toggle-autoplay", self._on_toggle_autoplay, "F5"),
+            ("memory-checkpoint", self._on_memory_checkpoint, "<Control><Shift>m"),
         ]:
             a = Gio.SimpleAction.new(name, None)
             a.connect("activate", cb)
             self.add_action(a)
             if accel: self.set_accels_for_action(f"app.{name}", [accel])
 
+    def _prune_history(self):
+        # Pruning reads every version file, so it runs on a worker at most once a day.
+        if time.time() - self.config.get("history.pruned") < PRUNE_INTERVAL:
+            return
+        executor().submit(self.store.prune_history, self.config.get("settings.history_keep"),
+                          self.config.get("settings.history_max_days") * 86400 or None,
+                          name="history.prune",
+                          on_done=lambda _removed: self.config.set("history.pruned", int(time.time())))
+
+    def do_shutdown(self):
+        self.config.save()
+        self.store.save_cache()
+        self.store.flush_history()
+        self.activity.close()
+        self.reminders.save()
+        executor().shutdown()
+        Adw.Application.do_shutdown(self)
+
     def _on_about(self, *_args):
         d = Adw.AboutDialog(application_name=_("Social Stories"), application_icon="socialaberattelser",
             version=__version__, developer_name="Daniel Nylander", website="https://www.autismappar.se",
@@ -112,14 +242,158 @@ class StoryApp(Adw.Application):
         w = self.props.active_window
         if w: w.do_export()
 
+    def _on_reminder(self, reminder, occurrence):
+        title = next((_story_title(s) for s in self.store if story_key(s) == reminder.story), None)
+        if title is None:
+            return
+        n = Gio.Notification.new(_("Time for a story"))
+        when = GLib.DateTime.new_from_unix_local(int(occurrence)).format("%H:%M")
+        n.set_body(_("%s at %s") % (title, when))
+        n.set_default_action_and_target("app.open-story", GLib.Variant("s", reminder.story))
+        self.send_notification(reminder.id, n)
+
+    def _on_open_story(self, action, param):
+        self.activate()
+        self.props.active_window.open_story(param.get_string())
+
+    def _on_import(self, *_args):
+        w = self.props.active_window
+        if w: w.do_import()
+
+    def _on_import_folder(self, *_args):
+        w = self.props.active_window
+        if w: w.do_import(folder=True)
+
+    def _on_sync(self, *_args):
+        w = self.props.active_window
+        if w: w.do_sync()
+
+    def _on_sync_folder(self, *_args):
+        w = self.props.active_window
+        if w: w.do_sync(choose=True)
+
+    def _on_export_progress(self, *_args):
+        w = self.props.active_window
+        if w: w.do_export_progress()
+
+    def _on_export_site(self, *_args):
+        w = self.props.active_window
+        if w: w.do_export_site()
+
+    def _on_export_package(self, *_args):
+        w = self.props.active_window
+        if w: w.do_export_package()
+
+    def _on_dump_trace(self, *_args):
+        print(executor().summary())
+        if tracing.ENABLED:
+            print(f"Trace written to {tracing.dump()}")
+
+    def _on_toggle_latency(self, *_args):
+        w = self.props.active_window
+        if w: w.latency.toggle_overlay()
+
+    def _on_memory_checkpoint(self, *_args):
+        w = self.props.active_window
+        report = memprof.checkpoint(w.stack.get_visible_child_name() if w else "")
+        print(memprof.summary(report))
+        print(f"Memory report written to {memprof.dump()}")
+
+    def _on_toggle_autoplay(self, *_args):
+        w = self.props.active_window
+        if w and w.current_story is not None and w.stack.get_visible_child_name() == "read":
+            w.autoplay.toggle()
+
+    def _on_language(self, action, param):
+        action.set_state(param)
+        self.config.set("settings.language", param.get_string())
+        i18n.set_language(param.get_string() or None)
+
+    def _on_profile(self, action, param):
+        action.set_state(param)
+        self.profiles.switch(param.get_string())
+
+    # ── Welcome Dialog ───────────────────────────────────────
+
+    def _show_welcome(self, win):
+        dialog = Adw.Dialog()
+        dialog.set_title(_("Welcome"))
+        dialog.set_content_width(420)
+        dialog.set_content_height(480)
+
+        page = Adw.StatusPage()
+        page.set_icon_name("socialaberattelser")
+        page.set_title(_("Welcome to Social Stories"))
+        page.set_description(_(
+            "Step-by-step social stories for everyday situations.\n\n✓ Visual step-by-step guides\n✓ Common social scenarios\n✓ Create custom stories\n✓ Helps with social understanding"
+        ))
+
+        btn = Gtk.Button(label=_("Get Started"))
+        btn.add_css_class("suggested-action")
+        btn.add_css_class("pill")
+        btn.set_halign(Gtk.Align.CENTER)
+        btn.set_margin_top(12)
+        btn.connect("clicked", self._on_welcome_close, dialog)
+        page.set_child(btn)
+
+        box = Adw.ToolbarView()
+        hb = Adw.HeaderBar()
+        hb.set_show_title(False)
+        box.add_top_bar(hb)
+        box.set_content(page)
+        dialog.set_child(box)
+        dialog.present(win)
+
+    def _on_welcome_close(self, btn, dialog):
+        self.config.set("settings.welcome_shown", True)
+        dialog.close()
+
 
 class StoryWindow(Adw.ApplicationWindow):
     def __init__(self, **kwargs):
         super().__init__(**kwargs, default_width=550, default_height=700, title=_("Social Stories"))
-        self.stories = _load_stories()
+        self.store = _shared_store(kwargs.get("application"))
         self.current_story = None
         self.current_step = 0
+        self._matches = None
+        self._refilter_pending = False
+        self._translatable = {"list": [], "read": []}
+        self._stale_pages = set()
+        self.latency = LatencyMonitor(self)
+        self.config = getattr(kwargs.get("application"), "config", None)
+        self.activity = getattr(kwargs.get("application"), "activity", None)
+        self._completed = False
+        self.autoplay = AutoPlayer(self, self.config)
         self._build_ui()
+        self.autoplay.connect(self._on_autoplay_changed)
+        self.store.connect(self._on_store_changed)
+        tag = f"{id(self):x}"
+        self._memprof_names = [f"autoplay.audio[{tag}]", f"autoplay.textures[{tag}]",
+                               f"list.rows[{tag}]"]
+        memprof.register(self._memprof_names[0], lambda: len(self.autoplay._audio))
+        memprof.register(self._memprof_names[1], lambda: len(self.autoplay._textures))
+        memprof.register(self._memprof_names[2],
+                         lambda: self.story_list.observe_children().get_n_items())
+        i18n.connect(self._on_language_changed)
+        self.connect("notify::is-active", self._on_active_changed)
+        self.connect("destroy", self._on_destroy)
+
+    def _on_destroy(self, *_args):
+        self.autoplay.close()
+        self.store.disconnect(self._on_store_changed)
+        for name in self._memprof_names:
+            memprof.unregister(name)
+        i18n.disconnect(self._on_language_changed)
+        self.latency.disconnect()
+
+    def _on_active_changed(self, *_args):
+        if not self.is_active():
+            self.autoplay.pause()
+
+    def _tr(self, page, setter, msgid):
+        """Set a translated string now and again whenever the language changes."""
+        setter(_(msgid))
+        self._translatable[page].append((setter, msgid))
 
     def _build_ui(self):
         self.stack = Gtk.Stack()
@@ -127,30 +401,46 @@ class StoryWindow(Adw.ApplicationWindow):
 
         # List view
         list_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        list_header = Adw.HeaderBar(title_widget=Gtk.Label(label=_("Social Stories")))
+        list_title = Gtk.Label()
+        self._tr("list", list_title.set_label, N_("Social Stories"))
+        list_header = Adw.HeaderBar(title_widget=list_title)
         list_box.append(list_header)
 
-        menu = Gio.Menu()
-        menu.append(_("Export"), "app.export")
-        menu.append(_("About Social Stories"), "app.about")
-        menu.append(_("Quit"), "app.quit")
-        list_header.pack_end(Gtk.MenuButton(icon_name="open-menu-symbolic", menu_model=menu))
+        self.menu_btn = Gtk.MenuButton(icon_name="open-menu-symbolic", menu_model=self._build_menu())
+        list_header.pack_end(self.menu_btn)
 
-        theme_btn = Gtk.Button(icon_name="weather-clear-night-symbolic",
-                               tooltip_text=_("Toggle dark/light theme"))
+        theme_btn = Gtk.Button(icon_name="weather-clear-night-symbolic")
+        self._tr("list", theme_btn.set_tooltip_text, N_("Toggle dark/light theme"))
         theme_btn.connect("clicked", self._toggle_theme)
         list_header.pack_end(theme_btn)
 
+        self.search_entry = Gtk.SearchEntry()
+        self._tr("list", self.search_entry.set_placeholder_text, N_("Search stories"))
+        self.search_entry.set_margin_start(16)
+        self.search_entry.set_margin_end(16)
+        self.search_entry.set_margin_top(12)
+        self.search_entry.connect("search-changed", self._on_search_changed)
+        list_box.append(self.search_entry)
+
         scroll = Gtk.ScrolledWindow(vexpand=True)
         self.story_list = Gtk.ListBox()
         self.story_list.add_css_class("boxed-list")
+        self.story_list.set_filter_func(self._filter_row)
         self.story_list.set_margin_start(16)
         self.story_list.set_margin_end(16)
         self.story_list.set_margin_top(12)
         scroll.set_child(self.story_list)
+        scroll.get_vadjustment().connect("value-changed", lambda *_: self.latency.mark("scroll"))
         list_box.append(scroll)
 
-        add_btn = Gtk.Button(label=_("New Story"))
+        self.import_progress = Gtk.ProgressBar(show_text=True, visible=False)
+        self.import_progress.set_margin_start(16)
+        self.import_progress.set_margin_end(16)
+        self.import_progress.set_margin_top(8)
+        list_box.append(self.import_progress)
+
+        add_btn = Gtk.Button()
+        self._tr("list", add_btn.set_label, N_("New Story"))
         add_btn.add_css_class("suggested-action")
         add_btn.add_css_class("pill")
         add_btn.set_halign(Gtk.Align.CENTER)
@@ -167,13 +457,40 @@ class StoryWindow(Adw.ApplicationWindow):
         back_btn = Gtk.Button(icon_name="go-previous-symbolic")
         back_btn.connect("clicked", lambda *_: self.stack.set_visible_child_name("list"))
         read_header.pack_start(back_btn)
+        self.play_btn = Gtk.Button(icon_name="media-playback-start-symbolic")
+        self.play_btn.set_action_name("app.toggle-autoplay")
+        self._on_autoplay_changed(False)
+        read_header.pack_end(self.play_btn)
+        remind_btn = Gtk.Button(icon_name="alarm-symbolic")
+        self._tr("read", remind_btn.set_tooltip_text, N_("Remind Me"))
+        remind_btn.connect("clicked", self._on_schedule_story)
+        read_header.pack_end(remind_btn)
         read_box.append(read_header)
 
+        # Any key or click in the reader takes over from auto-play.
+        keys = Gtk.EventControllerKey(propagation_phase=Gtk.PropagationPhase.CAPTURE)
+        keys.connect("key-pressed", self._on_reader_input)
+        read_box.add_controller(keys)
+        click = Gtk.GestureClick(propagation_phase=Gtk.PropagationPhase.CAPTURE)
+        click.connect("pressed", self._on_reader_input)
+        read_box.add_controller(click)
+
         self.step_title = Gtk.Label(label="")
         self.step_title.add_css_class("title-2")
         self.step_title.set_margin_top(24)
         read_box.append(self.step_title)
 
+        self.step_emoji = Gtk.Label(label="")
+        self.step_emoji.add_css_class("title-1")
+        self.step_emoji.set_margin_top(24)
+        read_box.append(self.step_emoji)
+
+        self.step_image = Gtk.Picture(can_shrink=True, visible=False)
+        self.step_image.set_content_fit(Gtk.ContentFit.CONTAIN)
+        self.step_image.set_margin_top(16)
+        self.step_image.set_size_request(-1, 200)
+        read_box.append(self.step_image)
+
         self.step_label = Gtk.Label(label="", wrap=True)
         self.step_label.add_css_class("title-3")
         self.step_label.set_margin_top(32)
@@ -190,11 +507,13 @@ class StoryWindow(Adw.ApplicationWindow):
         nav_box = Gtk.Box(spacing=12, halign=Gtk.Align.CENTER)
         nav_box.set_margin_top(8)
         nav_box.set_margin_bottom(16)
-        self.prev_btn = Gtk.Button(label=_("Previous"))
+        self.prev_btn = Gtk.Button()
+        self._tr("read", self.prev_btn.set_label, N_("Previous"))
         self.prev_btn.add_css_class("pill")
         self.prev_btn.connect("clicked", self._prev_step)
         nav_box.append(self.prev_btn)
-        self.next_btn = Gtk.Button(label=_("Next"))
+        self.next_btn = Gtk.Button()
+        self._tr("read", self.next_btn.set_label, N_("Next"))
         self.next_btn.add_css_class("suggested-action")
         self.next_btn.add_css_class("pill")
         self.next_btn.connect("clicked", self._next_step)
@@ -202,46 +521,191 @@ class StoryWindow(Adw.ApplicationWindow):
         read_box.append(nav_box)
 
         self.stack.add_named(read_box, "read")
-        self.set_content(self.stack)
+        self.stack.connect("notify::visible-child-name", self._on_page_changed)
+        overlay = Gtk.Overlay(child=self.stack)
+        overlay.add_overlay(self.latency.overlay)
+        self.set_content(overlay)
         self._refresh_list()
 
+    def _build_menu(self):
+        languages = Gio.Menu()
+        languages.append(_("System Default"), "app.language::")
+        for code in i18n.available_languages():
+            languages.append(LANGUAGE_NAMES.get(code, code), f"app.language::{code}")
+        profiles = Gio.Menu()
+        app = self.get_application()
+        for name in (app.profiles.list_profiles() if hasattr(app, "profiles") else ["default"]):
+            profiles.append(_("Default") if name == "default" else name, f"app.profile::{name}")
+        menu = Gio.Menu()
+        menu.append(_("Import Stories…"), "app.import")
+        menu.append(_("Import Folder…"), "app.import-folder")
+        menu.append(_("Sync Now"), "app.sync")
+        menu.append(_("Choose Sync Folder…"), "app.sync-folder")
+        menu.append(_("Export"), "app.export")
+        menu.append(_("Export Package…"), "app.export-package")
+        menu.append(_("Export Progress Report"), "app.export-progress")
+        menu.append(_("Export Web Site…"), "app.export-site")
+        menu.append_submenu(_("Language"), languages)
+        menu.append_submenu(_("Profile"), profiles)
+        menu.append(_("About Social Stories"), "app.about")
+        menu.append(_("Quit"), "app.quit")
+        return menu
+
+    def _on_language_changed(self, lang):
+        self.set_title(_("Social Stories"))
+        self.store.reindex(i18n.language())
+        self._on_search_changed(self.search_entry)
+        self._stale_pages = set(self._translatable)
+        self._retranslate(self.stack.get_visible_child_name())
+
+    def _on_page_changed(self, stack, _pspec):
+        if memprof.ENABLED:
+            # Diff between actions: every page switch ends one.
+            print(memprof.summary(memprof.checkpoint(stack.get_visible_child_name())))
+        if stack.get_visible_child_name() != "read":
+            self.autoplay.pause()
+        if stack.get_visible_child_name() in self._stale_pages:
+            self._retranslate(stack.get_visible_child_name())
+
+    def _retranslate(self, page):
+        """Refresh one page; hidden pages are refreshed when they are shown."""
+        self._stale_pages.discard(page)
+        for setter, msgid in self._translatable[page]:
+            setter(_(msgid))
+        if page == "list":
+            self.menu_btn.set_menu_model(self._build_menu())
+            self._refresh_list()
+        elif self.current_story is not None:
+            self._show_step()
+
+    @traced("list.refresh")
     def _refresh_list(self):
         while (child := self.story_list.get_first_child()):
             self.story_list.remove(child)
-        for i, story in enumerate(self.stories):
-            row = Adw.ActionRow(title=story["title"],
-                                 subtitle=_("%d steps") % len(story["steps"]))
-            row.set_activatable(True)
-            row.connect("activated", self._on_read_story, i)
-            row.add_suffix(Gtk.Image(icon_name="go-next-symbolic"))
-            self.story_list.append(row)
+        for story in self.store:
+            self.story_list.append(self._make_row(story))
+
+    def _make_row(self, story):
+        row = Adw.ActionRow(title=_story_title(story), subtitle=_("%d steps") % len(story))
+        row.set_activatable(True)
+        row.connect("activated", lambda r: self._on_read_story(r, r.get_index()))
+        row.add_suffix(Gtk.Image(icon_name="go-next-symbolic"))
+        return row
+
+    def _on_store_changed(self, kind, index, story):
+        """Apply one store change to the list instead of rebuilding it."""
+        if kind == "added":
+            self.story_list.insert(self._make_row(story), index)
+        elif kind == "changed":
+            row = self.story_list.get_row_at_index(index)
+            row.set_title(_story_title(story))
+            row.set_subtitle(_("%d steps") % len(story))
+            if index == self.current_story:
+                self.current_step = min(self.current_step, max(0, len(story) - 1))
+                self._show_step()
+        elif kind == "removed":
+            self.story_list.remove(self.story_list.get_row_at_index(index))
+            if self.current_story == index:
+                self.current_story = None
+                self.stack.set_visible_child_name("list")
+            elif self.current_story is not None and self.current_story > index:
+                self.current_story -= 1
+        if not self._refilter_pending:
+            # Bulk imports emit one change per story; refilter once afterwards.
+            self._refilter_pending = True
+            GLib.idle_add(self._refilter)
+
+    def _refilter(self):
+        self._refilter_pending = False
+        self._on_search_changed(self.search_entry)
+        return False
+
+    def _on_search_changed(self, entry):
+        self._matches = self.store.search.query(entry.get_text())
+        self.story_list.invalidate_filter()
+
+    def _filter_row(self, row):
+        return self._matches is None or self.store[row.get_index()].id in self._matches
 
     def _on_read_story(self, row, idx):
         self.current_story = idx
         self.current_step = 0
+        self._completed = False
         self._show_step()
+        self.log_activity("open")
+        self.log_activity("step")
         self.stack.set_visible_child_name("read")
 
+    @traced("step.show")
     def _show_step(self):
-        story = self.stories[self.current_story]
-        self.step_title.set_label(story["title"])
-        self.step_label.set_label(story["steps"][self.current_step])
-        self.step_counter.set_label(_("Step %d of %d") % (self.current_step + 1, len(story["steps"])))
+        story = self.store[self.current_story]
+        self.step_title.set_label(_story_title(story))
+        emoji = story.emoji(self.current_step)
+        self.step_emoji.set_label(emoji or "")
+        self.step_emoji.set_visible(emoji is not None)
+        self.step_label.set_label(_step_text(story, self.current_step))
+        image = step_image(story, self.current_step)
+        self.step_image.set_paintable(self.autoplay.texture(image) if image else None)
+        self.step_image.set_visible(image is not None)
+        self.step_counter.set_label(_("Step %d of %d") % (self.current_step + 1, len(story)))
         self.prev_btn.set_sensitive(self.current_step > 0)
-        self.next_btn.set_sensitive(self.current_step < len(story["steps"]) - 1)
+        self.next_btn.set_sensitive(self.current_step < len(story) - 1)
+
+    def _profile(self):
+        profiles = getattr(self.get_application(), "profiles", None)
+        return profiles.current if profiles is not None else "default"
+
+    def log_activity(self, kind):
+        """Record a reading event for the current story and step."""
+        if self.activity is None or self.current_story is None:
+            return
+        story = self.store[self.current_story]
+        key = story_key(story)
+        self.activity.record(kind, key, self.current_step, self._profile())
+        if kind == "step" and self.current_step == len(story) - 1 and not self._completed:
+            self._completed = True
+            self.activity.record("complete", key, self.current_step, self._profile())
+
+    def _on_autoplay_changed(self, playing):
+        self.play_btn.set_icon_name("media-playback-pause-symbolic" if playing
+                                    else "media-playback-start-symbolic")
+        self.play_btn.set_tooltip_text(_("Pause") if playing else _("Play automatically"))
 
+    def _on_reader_input(self, controller, *args):
+        if self.autoplay.playing:
+            if isinstance(controller, Gtk.EventControllerKey):
+                state = args[-1]
+                if state & (Gdk.ModifierType.CONTROL_MASK | Gdk.ModifierType.ALT_MASK):
+                    return False
+                if args[0] == Gdk.KEY_F5:
+                    return False
+            else:
+                _n, x, y = args
+                picked = controller.get_widget().pick(x, y, Gtk.PickFlags.DEFAULT)
+                if picked is not None and (picked == self.play_btn or picked.is_ancestor(self.play_btn)):
+                    return False
+            self.autoplay.pause()
+        return False
+
+    @traced("step.navigate")
     def _prev_step(self, *_args):
+        self.latency.mark("navigate")
         if self.current_step > 0:
             self.current_step -= 1
             self._show_step()
+            self.log_activity("step")
 
+    @traced("step.navigate")
     def _next_step(self, *_args):
-        story = self.stories[self.current_story]
-        if self.current_step < len(story["steps"]) - 1:
+        self.latency.mark("navigate")
+        story = self.store[self.current_story]
+        if self.current_step < len(story) - 1:
             self.current_step += 1
             self._show_step()
+            self.log_activity("step")
 
     def _on_new_story(self, *_args):
+        self.latency.mark("dialog")
         d = Adw.MessageDialog(transient_for=self, heading=_("New Story"), body=_("Enter story title:"))
         entry = Gtk.Entry(placeholder_text=_("e.g. Going to the Store"))
         d.set_extra_child(entry)
@@ -250,20 +714,313 @@ class StoryWindow(Adw.ApplicationWindow):
         d.set_response_appearance("add", Adw.ResponseAppearance.SUGGESTED)
         def on_resp(dlg, resp):
             if resp == "add" and entry.get_text().strip():
-                self.stories.append({"title": entry.get_text().strip(),
-                                      "steps": [_("First step...")]})
-                _save_stories(self.stories)
-                self._refresh_list()
+                self.store.append(Story(entry.get_text().strip(), [_("First step...")],
+                                        id=uuid.uuid4().hex))
         d.connect("response", on_resp)
         d.present()
 
+    def open_story(self, key):
+        for i, story in enumerate(self.store):
+            if story_key(story) == key:
+                self._on_read_story(None, i)
+                return
+
+    def _on_schedule_story(self, *_args):
+        reminders = getattr(self.get_application(), "reminders", None)
+        if reminders is None or self.current_story is None:
+            return
+        self.autoplay.pause()
+        key = story_key(self.store[self.current_story])
+        scheduled = reminders.for_story(key)
+        if scheduled:
+            nxt = GLib.DateTime.new_from_unix_local(int(scheduled[0].next))
+            body = _("Next reminder: %s") % nxt.format("%Y-%m-%d %H:%M")
+        else:
+            body = _("When is it happening?")
+        d = Adw.MessageDialog(transient_for=self, heading=_("Remind Me"), body=body)
+        box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        start = GLib.DateTime.new_now_local().add_hours(1)
+        entry = Gtk.Entry(text=start.format("%Y-%m-%d %H:00"), placeholder_text="YYYY-MM-DD HH:MM")
+        box.append(entry)
+        repeats = [(_("Once"), None), (_("Every day"), {"freq": "daily"}),
+                   (_("Weekdays"), {"freq": "weekly", "weekdays": [0, 1, 2, 3, 4]}),
+                   (_("Every week"), {"freq": "weekly"}), (_("Every month"), {"freq": "monthly"})]
+        repeat = Gtk.DropDown.new_from_strings([label for label, _rule in repeats])
+        box.append(repeat)
+        message = Gtk.Label(wrap=True, visible=False)
+        message.add_css_class("error")
+        box.append(message)
+        d.set_extra_child(box)
+        d.add_response("cancel", _("Cancel"))
+        if scheduled:
+            d.add_response("clear", _("Remove Reminders"))
+            d.set_response_appearance("clear", Adw.ResponseAppearance.DESTRUCTIVE)
+        d.add_response("add", _("Add"))
+        d.set_response_appearance("add", Adw.ResponseAppearance.SUGGESTED)
+
+        lead = self.config.get("settings.reminder_lead_minutes") * 60 if self.config else 0
+
+        def parse():
+            try:
+                return datetime.strptime(entry.get_text().strip(), "%Y-%m-%d %H:%M").timestamp()
+            except ValueError:
+                return None
+
+        def validate(*_args):
+            # The dialog closes on any response, so problems are shown before "Add".
+            start = parse()
+            error = None
+            if start is None:
+                error = _("Enter the date and time as YYYY-MM-DD HH:MM.")
+            else:
+                try:
+                    reminders.first(start, repeats[repeat.get_selected()][1], lead)
+                except ValueError:
+                    error = _("That time has already passed.")
+            message.set_text(error or "")
+            message.set_visible(error is not None)
+            d.set_response_enabled("add", error is None)
+        entry.connect("changed", validate)
+        repeat.connect("notify::selected", validate)
+        validate()
+
+        def on_resp(dlg, resp):
+            if resp == "clear":
+                for r in scheduled:
+                    reminders.remove(r.id)
+            elif resp == "add" and parse() is not None:
+                reminders.add(key, parse(), repeats[repeat.get_selected()][1], lead)
+        d.connect("response", on_resp)
+        d.present()
+
+    def do_import(self, folder=False):
+        fd = Gtk.FileDialog(title=_("Import Stories"), modal=True)
+        if folder:
+            fd.select_folder(self, None, self._on_import_chosen, folder)
+            return
+        flt = Gtk.FileFilter(name=_("Stories (JSON, CSV, ZIP, package)"))
+        for pattern in ("*.json", "*.csv", "*.zip", "*" + PACKAGE_EXTENSION):
+            flt.add_pattern(pattern)
+        filters = Gio.ListStore.new(Gtk.FileFilter)
+        filters.append(flt)
+        fd.set_filters(filters)
+        fd.open_multiple(self, None, self._on_import_chosen, folder)
+
+    def _on_import_chosen(self, fd, result, folder):
+        try:
+            if folder:
+                paths = [fd.select_folder_finish(result).get_path()]
+            else:
+                files = fd.open_multiple_finish(result)
+                paths = [files.get_item(i).get_path() for i in range(files.get_n_items())]
+        except GLib.Error:
+            return
+        self.import_progress.set_fraction(0)
+        self.import_progress.set_text(_("Importing…"))
+        self.import_progress.set_visible(True)
+        existing = list(self.store)
+        progress = lambda done: GLib.idle_add(self._on_import_progress, done)
+        executor().submit(
+            lambda: importer.import_paths(paths, existing, progress, images_dir=IMAGES_DIR),
+            name="import", on_done=self._on_import_done, on_error=self._on_import_done)
+
+    def do_export_package(self):
+        fd = Gtk.FileDialog(title=_("Export Package"), modal=True,
+                            initial_name="socialaberattelser" + PACKAGE_EXTENSION)
+        fd.save(self, None, self._on_export_package_chosen)
+
+    def _on_export_package_chosen(self, fd, result):
+        try:
+            path = fd.save_finish(result).get_path()
+        except GLib.Error:
+            return
+        self.import_progress.set_text(_("Writing package…"))
+        self.import_progress.pulse()
+        self.import_progress.set_visible(True)
+        count = len(self.store)
+        executor().submit(write_package, path, list(self.store), name="export.package",
+                          on_done=lambda _result: self._on_export_package_done(count),
+                          on_error=self._on_export_package_done)
+
+    def _on_export_package_done(self, result):
+        if isinstance(result, Exception):
+            self.import_progress.set_text(_("Export failed: %s") % result)
+        else:
+            self.import_progress.set_fraction(1)
+            self.import_progress.set_text(_("Package: %d stories written") % result)
+        GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+        return False
+
+    def do_export_site(self):
+        fd = Gtk.FileDialog(title=_("Export Web Site"), modal=True)
+        fd.select_folder(self, None, self._on_export_site_chosen)
+
+    def _on_export_site_chosen(self, fd, result):
+        try:
+            path = fd.select_folder_finish(result).get_path()
+        except GLib.Error:
+            return
+        self.import_progress.set_text(_("Building web site…"))
+        self.import_progress.pulse()
+        self.import_progress.set_visible(True)
+        executor().submit(SiteBuilder(path).build, list(self.store), name="export.site",
+                          on_done=self._on_export_site_done, on_error=self._on_export_site_done)
+
+    def _on_export_site_done(self, result):
+        if isinstance(result, Exception):
+            self.import_progress.set_text(_("Export failed: %s") % result)
+        else:
+            self.import_progress.set_fraction(1)
+            self.import_progress.set_text(_("Web site: %d files written, %d unchanged")
+                                          % (len(result.written), result.unchanged))
+        GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+        return False
+
+    def do_sync(self, choose=False):
+        folder = self.config.get("sync.folder") if self.config is not None else ""
+        if choose or not folder:
+            fd = Gtk.FileDialog(title=_("Choose Sync Folder"), modal=True)
+            fd.select_folder(self, None, self._on_sync_folder_chosen)
+            return
+        if not self.config.get("sync.device"):
+            self.config.set("sync.device", uuid.uuid4().hex)
+        self.import_progress.set_text(_("Syncing…"))
+        self.import_progress.pulse()
+        self.import_progress.set_visible(True)
+        target = SyncFolder(folder, self.config.get("sync.device"))
+        executor().submit(target.sync, list(self.store), not _library_fallback(), name="sync",
+                          on_done=lambda result: self._on_sync_done(result, target),
+                          on_error=self._on_sync_done)
+
+    def _on_sync_folder_chosen(self, fd, result):
+        try:
+            path = fd.select_folder_finish(result).get_path()
+        except GLib.Error:
+            return
+        if self.config is not None:
+            self.config.set("sync.folder", path)
+            self.do_sync()
+
+    def _on_sync_done(self, result, target=None):
+        if isinstance(result, ValueError) and _library_fallback():
+            self.import_progress.set_visible(False)
+            self._confirm_fallback_sync(result)
+        elif isinstance(result, Exception):
+            self.import_progress.set_text(_("Sync failed: %s") % result)
+        else:
+            positions = {story.id: i for i, story in enumerate(self.store)}
+            removed = sorted((positions[k] for k, d in result.updates.items()
+                              if d is None and k in positions), reverse=True)
+            for key, data in result.updates.items():
+                if data is not None:
+                    if key in positions:
+                        self.store.replace(positions[key], Story.from_dict(data))
+                    else:
+                        self.store.append(Story.from_dict(data))
+            for i in removed:
+                self.store.remove(i)
+            # Only once the applied library is on disk may the manifest announce it.
+            self.store.save()
+            executor().submit(target.publish, result, name="sync.publish",
+                              on_error=self._on_sync_done)
+            self.import_progress.set_fraction(1)
+            self.import_progress.set_text(
+                _("Synced: %d stories updated, %d conflicts")
+                % (len(result.updates), len(result.conflicts)))
+        GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+        return False
+
+    def _confirm_fallback_sync(self, error):
+        d = Adw.MessageDialog(transient_for=self, heading=_("Library Could Not Be Read"),
+                              body=_("The default stories were loaded instead and the old library "
+                                     "was kept as %s. Syncing now would remove stories from every "
+                                     "device (%s).") % (CORRUPT_FILE, error))
+        d.add_response("cancel", _("Cancel"))
+        d.add_response("sync", _("Sync Anyway"))
+        d.set_response_appearance("sync", Adw.ResponseAppearance.DESTRUCTIVE)
+        def on_resp(dlg, resp):
+            if resp == "sync":
+                # Keep the unreadable file, but stop treating the library as a fallback.
+                _set_aside(CORRUPT_FILE)
+                self.do_sync()
+        d.connect("response", on_resp)
+        d.present()
+
+    def _on_import_progress(self, done):
+        self.import_progress.pulse()
+        self.import_progress.set_text(_("Importing… %d stories read") % done)
+        return False
+
+    def _on_import_done(self, result):
+        if isinstance(result, Exception):
+            self.import_progress.set_text(_("Import failed: %s") % result)
+            GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+            return False
+        for story in result.stories:
+            story.id = uuid.uuid4().hex
+        self.store.extend(result.stories)
+        self.import_progress.set_fraction(1)
+        self.import_progress.set_text(
+            _("Imported %d stories, skipped %d duplicates and %d invalid")
+            % (len(result.stories), result.duplicates, len(result.errors)))
+        for name, error in result.errors:
+            print(f"Import {name}: {error}")
+        GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+        return False
+
+    @traced("export")
     def do_export(self):
         from socialaberattelser.export import export_csv, export_json
-        os.makedirs(CONFIG_DIR, exist_ok=True)
+        if self.config is None or self.config.get("settings.export_incremental"):
+            from socialaberattelser.delta import story_entries
+            # Rows are rendered here, in the UI language; files are written in the background.
+            entries = story_entries(
+                self.store, lambda s: _export_row(s, self.activity, self._profile()))
+            executor().submit(_export_incremental, entries, name="export.chain",
+                              on_done=self._on_export_done, on_error=self._on_export_done)
+            return
+        ts = GLib.DateTime.new_now_local().format("%Y%m%d_%H%M%S")
+        data = [_export_row(s, self.activity, self._profile()) for s in self.store]
+
+        def write():
+            os.makedirs(CONFIG_DIR, exist_ok=True)
+            export_csv(data, os.path.join(CONFIG_DIR, f"export_{ts}.csv"))
+            path = os.path.join(CONFIG_DIR, f"export_{ts}.json")
+            export_json(data, path)
+            return path
+        executor().submit(write, name="export.files",
+                          on_done=self._on_export_done, on_error=self._on_export_done)
+
+    def _on_export_done(self, result):
+        if isinstance(result, Exception):
+            self.import_progress.set_text(_("Export failed: %s") % result)
+        elif result is None:
+            self.import_progress.set_text(_("Nothing changed since the last export"))
+        else:
+            self.import_progress.set_fraction(1)
+            self.import_progress.set_text(_("Exported to %s") % os.path.dirname(result))
+        self.import_progress.set_visible(True)
+        GLib.timeout_add_seconds(5, lambda: self.import_progress.set_visible(False))
+        return False
+
+    @traced("export.progress")
+    def do_export_progress(self):
+        """Export the current profile's reading per day and story."""
+        if self.activity is None:
+            return
+        from socialaberattelser.export import export_csv, export_json
+        profile = self._profile()
         ts = GLib.DateTime.new_now_local().format("%Y%m%d_%H%M%S")
-        data = [{"date": "", "details": s["title"], "result": f'{len(s["steps"])} steps'} for s in self.stories]
-        export_csv(data, os.path.join(CONFIG_DIR, f"export_{ts}.csv"))
-        export_json(data, os.path.join(CONFIG_DIR, f"export_{ts}.json"))
+        data = _progress_rows(self.activity, self.store, profile)
+
+        def write():
+            os.makedirs(EXPORTS_DIR, exist_ok=True)
+            export_csv(data, os.path.join(EXPORTS_DIR, f"progress_{profile}_{ts}.csv"))
+            path = os.path.join(EXPORTS_DIR, f"progress_{profile}_{ts}.json")
+            export_json(data, path)
+            return path
+        executor().submit(write, name="export.progress",
+                          on_done=self._on_export_done, on_error=self._on_export_done)
 
     def _toggle_theme(self, *_args):
         mgr = Adw.StyleManager.get_default()
@@ -274,71 +1031,19 @@ def main():
     app = StoryApp()
     app.run(sys.argv)
 
-if __name__ == "__main__":
-    main()
-
-    # ── Welcome Dialog ───────────────────────────────────────
-
-    def _show_welcome(self, win):
-        dialog = Adw.Dialog()
-        dialog.set_title(_("Welcome"))
-        dialog.set_content_width(420)
-        dialog.set_content_height(480)
-
-        page = Adw.StatusPage()
-        page.set_icon_name("socialaberattelser")
-        page.set_title(_("Welcome to Social Stories"))
-        page.set_description(_(
-            "Step-by-step social stories for everyday situations.\n\n✓ Visual step-by-step guides\n✓ Common social scenarios\n✓ Create custom stories\n✓ Helps with social understanding"
-        ))
-
-        btn = Gtk.Button(label=_("Get Started"))
-        btn.add_css_class("suggested-action")
-        btn.add_css_class("pill")
-        btn.set_halign(Gtk.Align.CENTER)
-        btn.set_margin_top(12)
-        btn.connect("clicked", self._on_welcome_close, dialog)
-        page.set_child(btn)
-
-        box = Adw.ToolbarView()
-        hb = Adw.HeaderBar()
-        hb.set_show_title(False)
-        box.add_top_bar(hb)
-        box.set_content(page)
-        dialog.present(win)
-
-    def _on_welcome_close(self, btn, dialog):
-        self.settings["welcome_shown"] = True
-        _save_settings(self.settings)
-        dialog.close()
-
-
 
 # --- Session restore ---
-import json as _json
-import os as _os
-
-def _save_session(window, app_name):
-    config_dir = _os.path.join(_os.path.expanduser('~'), '.config', app_name)
-    _os.makedirs(config_dir, exist_ok=True)
-    state = {'width': window.get_width(), 'height': window.get_height(),
-             'maximized': window.is_maximized()}
-    try:
-        with open(_os.path.join(config_dir, 'session.json'), 'w') as f:
-            _json.dump(state, f)
-    except OSError:
-        pass
+def _save_session(window, config):
+    config.set("session.maximized", window.is_maximized())
+    if not window.is_maximized():
+        config.set("session.width", window.get_width())
+        config.set("session.height", window.get_height())
+    return False
 
-def _restore_session(window, app_name):
-    path = _os.path.join(_os.path.expanduser('~'), '.config', app_name, 'session.json')
-    try:
-        with open(path) as f:
-            state = _json.load(f)
-        window.set_default_size(state.get('width', 800), state.get('height', 600))
-        if state.get('maximized'):
-            window.maximize()
-    except (FileNotFoundError, _json.JSONDecodeError, OSError):
-        pass
+def _restore_session(window, config):
+    window.set_default_size(config.get("session.width"), config.get("session.height"))
+    if config.get("session.maximized"):
+        window.maximize()
 
 
 # --- Fullscreen toggle (F11) ---
@@ -358,6 +1063,7 @@ def _setup_fullscreen(window, app):
 import importlib.util
 import os as _pos
 
+@traced("plugins.load")
 def _load_plugins(app_name):
     """Load plugins from ~/.config/<app>/plugins/."""
     plugin_dir = _pos.path.join(_pos.path.expanduser('~'), '.config', app_name, 'plugins')
@@ -380,17 +1086,7 @@ def _load_plugins(app_name):
 # --- Sound notifications ---
 def _play_sound(sound_name='complete'):
     """Play a system notification sound."""
-    try:
-        import subprocess
-        # Try canberra-gtk-play first, then paplay
-        for cmd in [
-            ['canberra-gtk-play', '-i', sound_name],
-            ['paplay', f'/usr/share/sounds/freedesktop/stereo/{sound_name}.oga'],
-        ]:
-            try:
-                subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                return
-            except FileNotFoundError:
-                continue
-    except Exception:
-        pass
+    audio.engine().play_sample(sound_name)
+
+if __name__ == "__main__":
+    main()
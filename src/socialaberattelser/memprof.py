@@ -0,0 +1,140 @@
+"""Memory diagnostics for long sessions.
+
+Each ``checkpoint(label)`` takes a tracemalloc snapshot, diffs it against
+the previous one and records the live GObject wrappers by type plus the
+sizes of registered caches. Reports are appended to
+SOCIALABERATTELSER_MEMPROF_FILE or ~/.cache/socialaberattelser/memory-<pid>.json.
+
+tracemalloc slows allocation down, so it only starts when
+SOCIALABERATTELSER_MEMPROF is set (its value is the number of frames
+kept per allocation, default 1) or when the first checkpoint is taken.
+GObject counts and cache sizes are available either way.
+"""
+import gc
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+
+ENV = "SOCIALABERATTELSER_MEMPROF"
+ENABLED = bool(os.environ.get(ENV))
+TOP = 15
+
+_snapshots = []
+_reports = []
+_sizes = {}
+_pid = os.getpid()
+
+try:
+    from gi.repository import GObject
+except ImportError:
+    GObject = None
+
+
+def start(frames=None):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames or int(os.environ.get(ENV) or 1))
+
+
+def register(name, size):
+    """Report ``size()`` (an item count) under ``name`` in every checkpoint."""
+    _sizes[name] = size
+
+
+def unregister(name):
+    _sizes.pop(name, None)
+
+
+def sizes():
+    out = {}
+    for name, size in sorted(_sizes.items()):
+        try:
+            out[name] = size()
+        except Exception as e:  # a provider whose owner is gone
+            out[name] = repr(e)
+    return out
+
+
+def gobject_counts():
+    """Count live Python-wrapped GObject instances by type name."""
+    if GObject is None:
+        return {}
+    counts = Counter(type(o).__name__ for o in gc.get_objects()
+                     if isinstance(o, GObject.Object))
+    return dict(counts.most_common())
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+def checkpoint(label=""):
+    """Snapshot memory now and return a report diffed against the last checkpoint."""
+    start()
+    gc.collect()
+    snapshot = _filtered(tracemalloc.take_snapshot())
+    current, peak = tracemalloc.get_traced_memory()
+    report = {"label": label, "time": time.time(), "traced": current, "peak": peak,
+              "gobjects": gobject_counts(), "sizes": sizes()}
+    if _snapshots:
+        prev_label, prev = _snapshots[-1]
+        report["since"] = prev_label
+        report["growth"] = [
+            {"where": str(stat.traceback[0]), "size_diff": stat.size_diff,
+             "count_diff": stat.count_diff}
+            for stat in snapshot.compare_to(prev, "lineno")[:TOP] if stat.size_diff
+        ]
+        prev_counts = _reports[-1]["gobjects"]
+        report["gobject_growth"] = {
+            name: n - prev_counts.get(name, 0) for name, n in report["gobjects"].items()
+            if n != prev_counts.get(name, 0)}
+    # Keep only the latest snapshot; reports hold everything worth keeping.
+    _snapshots[:] = [(label, snapshot)]
+    _reports.append(report)
+    return report
+
+
+def summary(report):
+    """Format a checkpoint report for the terminal."""
+    lines = [f"Memory at {report['label'] or 'checkpoint'}: "
+             f"{report['traced'] / 1024:.0f} KiB traced (peak {report['peak'] / 1024:.0f} KiB)"]
+    for item in report.get("growth", ())[:5]:
+        lines.append(f"  {item['size_diff'] / 1024:+.1f} KiB {item['count_diff']:+d} "
+                     f"blocks  {item['where']}")
+    growth = report.get("gobject_growth", {})
+    if growth:
+        lines.append("  GObjects: " + ", ".join(f"{n} {d:+d}" for n, d in sorted(growth.items())))
+    if report["sizes"]:
+        lines.append("  Sizes: " + ", ".join(f"{n}={v}" for n, v in report["sizes"].items()))
+    return "\n".join(lines)
+
+
+def default_path():
+    path = os.environ.get(ENV + "_FILE")
+    if path:
+        return path
+    cache = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache, "socialaberattelser", f"memory-{_pid}.json")
+
+
+def dump(path=None):
+    """Write all checkpoint reports and return the path written."""
+    path = path or default_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"pid": _pid, "checkpoints": _reports}, f, indent=1)
+    return path
+
+
+def reset():
+    _snapshots.clear()
+    _reports.clear()
+
+
+if ENABLED:
+    start()
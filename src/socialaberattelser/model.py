@@ -0,0 +1,150 @@
+"""Compact in-memory story model."""
+import sys
+
+_intern = sys.intern
+
+
+class Step:
+    """A single step as handed out by ``Story.step()``."""
+
+    __slots__ = ("text", "emoji")
+
+    def __init__(self, text, emoji=None):
+        self.text = text
+        self.emoji = emoji
+
+    def __eq__(self, other):
+        return isinstance(other, Step) and (self.text, self.emoji) == (other.text, other.emoji)
+
+    def __repr__(self):
+        return f"Step({self.text!r}, {self.emoji!r})"
+
+
+class Story:
+    """A story with its steps stored column-wise.
+
+    Instead of one dict per step, texts and emoji live in two parallel
+    lists of interned strings, so repeated sentences and the few emoji in
+    use are stored once. Both the legacy plain-string steps and the
+    ``{"text": ..., "emoji": ...}`` steps load into this representation,
+    and the shape of every step (plus any unknown keys) is remembered so
+    that ``to_dict()`` writes back exactly what ``from_dict()`` read.
+    """
+
+    __slots__ = ("id", "title", "texts", "emojis", "_dict_steps", "_extra", "_step_extra")
+
+    def __init__(self, title, steps=(), id=None):
+        self.id = id
+        self.title = _intern(title)
+        self.texts = []
+        self.emojis = None
+        self._dict_steps = None
+        self._extra = None
+        self._step_extra = None
+        for step in steps:
+            self.add(step)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __repr__(self):
+        return f"<Story {self.title!r} ({len(self)} steps)>"
+
+    def add(self, step):
+        """Append a step given as stored JSON (string or dict) or as a ``Step``."""
+        if isinstance(step, str):
+            self.append_step(step, as_dict=False)
+            return
+        if isinstance(step, Step):
+            self.append_step(step.text, step.emoji)
+            return
+        step = dict(step)
+        text = step.pop("text", "")
+        emoji = step.pop("emoji", None)
+        self.append_step(text, emoji, as_dict=True)
+        if step:
+            if self._step_extra is None:
+                self._step_extra = {}
+            self._step_extra[len(self.texts) - 1] = step
+
+    def append_step(self, text, emoji=None, as_dict=None):
+        """Add a step; it is saved as a dict if it has an emoji or ``as_dict``."""
+        idx = len(self.texts)
+        self.texts.append(_intern(text))
+        if emoji is not None or self.emojis is not None:
+            if self.emojis is None:
+                self.emojis = [None] * idx
+            self.emojis.append(_intern(emoji) if emoji is not None else None)
+        if as_dict is None:
+            as_dict = emoji is not None or self._dict_steps is not None
+        if as_dict or self._dict_steps is not None:
+            if self._dict_steps is None:
+                self._dict_steps = bytearray(idx)
+            self._dict_steps.append(1 if as_dict else 0)
+
+    def set_text(self, idx, text):
+        self.texts[idx] = _intern(text)
+
+    def emoji(self, idx):
+        return self.emojis[idx] if self.emojis is not None else None
+
+    def step(self, idx):
+        return Step(self.texts[idx], self.emoji(idx))
+
+    def steps(self):
+        """Iterate over the steps as ``Step`` objects."""
+        for i in range(len(self.texts)):
+            yield self.step(i)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        story = cls(data.pop("title", ""), data.pop("steps", ()), data.pop("id", None))
+        if data:
+            story._extra = data
+        return story
+
+    def step_json(self, idx):
+        """Return step ``idx`` in the shape it is stored in stories.json."""
+        text = self.texts[idx]
+        if self._dict_steps is None or not self._dict_steps[idx]:
+            return text
+        step = {"text": text}
+        emoji = self.emoji(idx)
+        if emoji is not None:
+            step["emoji"] = emoji
+        if self._step_extra and idx in self._step_extra:
+            step.update(self._step_extra[idx])
+        return step
+
+    def to_dict(self):
+        data = {}
+        if self.id is not None:
+            data["id"] = self.id
+        data["title"] = self.title
+        data["steps"] = [self.step_json(i) for i in range(len(self.texts))]
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    def __getstate__(self):
+        return (self.id, self.title, self.texts, self.emojis, self._dict_steps,
+                self._extra, self._step_extra)
+
+    def __setstate__(self, state):
+        (self.id, self.title, self.texts, self.emojis, self._dict_steps,
+         self._extra, self._step_extra) = state
+
+
+def story_key(story):
+    """The key a story's activity, reminders and site pages are filed under."""
+    return story.id or "title:" + story.title
+
+
+def load_library(data):
+    """Build ``Story`` objects from the parsed stories.json list."""
+    return [Story.from_dict(d) for d in data]
+
+
+def dump_library(stories):
+    return [s.to_dict() for s in stories]
@@ -0,0 +1,195 @@
+"""Single-file story packages for sharing libraries between classrooms.
+
+A package is an uncompressed ZIP archive (so any unzip tool can inspect
+it) with this layout:
+
+    socialstories.json          manifest: format version and story index
+    stories/<id>.json           one story each
+    images/<sha1>.<ext>         step images, named by content
+
+``StoryPackage`` maps the file with mmap and parses only the ZIP central
+directory and the manifest when opened. Stories and assets are read on
+demand as slices of the mapping, so opening a large package is instant
+and assets are handed out without copying.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import zipfile
+import zlib
+
+from socialaberattelser.model import Story
+from socialaberattelser.persist import atomic_write
+
+FORMAT = "socialaberattelser-package"
+VERSION = 1
+MANIFEST = "socialstories.json"
+EXTENSION = ".sbpkg"
+
+_EOCD = struct.Struct("<4sHHHHIIH")
+_CDIR = struct.Struct("<4sHHHHHHIIIHHHHHII")
+_LOCAL = struct.Struct("<4sHHHHHIIIHH")
+
+
+def write_package(path, stories, assets=None):
+    """Write ``stories`` to a package at ``path``.
+
+    ``assets`` maps archive names under images/ to file paths or bytes;
+    a step whose ``image`` key names an existing file is packed
+    automatically.
+    """
+    assets = dict(assets or {})
+    index = []
+    with atomic_write(path, "wb") as f, \
+            zipfile.ZipFile(f, "w", compression=zipfile.ZIP_STORED) as zf:
+        for n, story in enumerate(stories):
+            sid = story.id or f"story-{n}"
+            data = story.to_dict()
+            data["id"] = sid
+            for step in data["steps"]:
+                image = step.get("image") if isinstance(step, dict) else None
+                if image and not image.startswith("images/") and os.path.isfile(image):
+                    with open(image, "rb") as src:
+                        blob = src.read()
+                    name = "images/" + hashlib.sha1(blob).hexdigest() + os.path.splitext(image)[1]
+                    assets[name] = blob
+                    step["image"] = name
+            member = f"stories/{sid}.json"
+            zf.writestr(member, json.dumps(data, ensure_ascii=False))
+            index.append({"id": sid, "title": story.title, "steps": len(story),
+                          "path": member})
+        for name, blob in assets.items():
+            if isinstance(blob, (bytes, bytearray, memoryview)):
+                zf.writestr(name, bytes(blob))
+            else:
+                zf.write(blob, name)
+        zf.writestr(MANIFEST, json.dumps({"format": FORMAT, "version": VERSION,
+                                          "stories": index}, ensure_ascii=False))
+
+
+class StoryPackage:
+    """Read-only, memory-mapped view of a story package.
+
+    Memoryviews returned by ``asset()`` point into the mapping; release
+    them before calling ``close()``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = None
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._entries = self._read_directory()
+            manifest = json.loads(bytes(self._member(MANIFEST)))
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            self.close()
+            raise ValueError(f"not a story package: {e}") from e
+        if manifest.get("format") != FORMAT:
+            self.close()
+            raise ValueError("not a story package")
+        if manifest.get("version", 0) > VERSION:
+            self.close()
+            raise ValueError("package was written by a newer version")
+        self.index = manifest["stories"]
+        self._by_id = {entry["id"]: entry for entry in self.index}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _read_directory(self):
+        mm = self._mm
+        pos = mm.rfind(b"PK\x05\x06", max(0, len(mm) - 65536 - _EOCD.size))
+        if pos < 0:
+            raise ValueError("end of central directory not found")
+        _sig, _disk, _cd_disk, _n_disk, count, size, offset, _clen = _EOCD.unpack_from(mm, pos)
+        if count == 0xFFFF or offset == 0xFFFFFFFF:
+            raise ValueError("ZIP64 packages are not supported")
+        entries = {}
+        pos = offset
+        for _ in range(count):
+            fields = _CDIR.unpack_from(mm, pos)
+            method, csize, usize = fields[4], fields[8], fields[9]
+            name_len, extra_len, comment_len, local = fields[10], fields[11], fields[12], fields[16]
+            name = mm[pos + _CDIR.size:pos + _CDIR.size + name_len].decode("utf-8")
+            entries[name] = (local, csize, usize, method)
+            pos += _CDIR.size + name_len + extra_len + comment_len
+        return entries
+
+    def _member(self, name):
+        local, csize, usize, method = self._entries[name]
+        fields = _LOCAL.unpack_from(self._mm, local)
+        start = local + _LOCAL.size + fields[9] + fields[10]
+        view = memoryview(self._mm)[start:start + csize]
+        if method == zipfile.ZIP_STORED:
+            return view
+        # Packages written by other tools may be deflated; that needs a copy.
+        data = zlib.decompress(view, -15)
+        view.release()
+        return memoryview(data)
+
+    def story_dict(self, story_id):
+        view = self._member(self._by_id[story_id]["path"])
+        try:
+            return json.loads(bytes(view))
+        finally:
+            view.release()
+
+    def story(self, story_id):
+        return Story.from_dict(self.story_dict(story_id))
+
+    def stories(self):
+        for entry in self.index:
+            yield self.story(entry["id"])
+
+    def asset(self, name):
+        """Return an image (or any member) as a zero-copy memoryview."""
+        return self._member(name)
+
+    def extract_images(self, data, directory):
+        """Copy the images a story dict uses to ``directory`` and point its steps there.
+
+        Images are content-named, so one shared by several stories or
+        imported twice is written once. A step whose image is missing
+        from the package, or any image when ``directory`` is None, loses
+        its ``image`` key.
+        """
+        for step in data.get("steps") or ():
+            image = step.get("image") if isinstance(step, dict) else None
+            if not isinstance(image, str) or not image.startswith("images/"):
+                continue
+            if directory is None or image not in self._entries:
+                del step["image"]
+                continue
+            target = os.path.join(directory, os.path.basename(image))
+            if not os.path.exists(target):
+                os.makedirs(directory, exist_ok=True)
+                view = self._member(image)
+                try:
+                    with atomic_write(target, "wb") as f:
+                        f.write(view)
+                finally:
+                    view.release()
+            step["image"] = target
+        return data
+
+
+def is_package(path):
+    return path.lower().endswith(EXTENSION)
@@ -0,0 +1,50 @@
+"""Saving files safely and not too often.
+
+``atomic_write(path)`` writes through a temporary file next to ``path``
+that replaces it only once it is complete, so a crash or a full disk
+never leaves a half-written file behind.
+
+``CoalescedSaver`` turns a burst of changes into one save: ``request()``
+after each change arms a single timer through ``schedule(ms, fn)``
+(GLib.timeout_add in the app), and the save runs when it fires. Without
+``schedule`` every request saves at once.
+"""
+import contextlib
+import os
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="w", encoding="utf-8"):
+    """Open ``path`` for writing; it is replaced when the block exits normally."""
+    tmp = path + ".tmp"
+    f = open(tmp, mode, encoding=None if "b" in mode else encoding)
+    try:
+        with f:
+            yield f
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+
+
+class CoalescedSaver:
+    """Calls ``save()`` once per burst of ``request()`` calls."""
+
+    def __init__(self, save, schedule=None, delay_ms=500):
+        self._save = save
+        self._schedule = schedule
+        self._delay_ms = delay_ms
+        self.pending = False
+
+    def request(self):
+        if self._schedule is None:
+            self._save()
+        elif not self.pending:
+            self.pending = True
+            self._schedule(self._delay_ms, self._flush)
+
+    def _flush(self):
+        self.pending = False
+        self._save()
+        return False
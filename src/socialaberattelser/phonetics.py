@@ -1,87 +1,129 @@
 """Phonetics/TTS support using Piper (preferred) or espeak-ng."""
+import functools
+import json
 import subprocess
 import shutil
 import os
-import tempfile
+import wave
+from socialaberattelser import audio, espeak
+from socialaberattelser.executor import INTERACTIVE, executor
+from socialaberattelser.tracing import span, traced
 
+PIPER_RATE = 22050
 
+
+@functools.lru_cache(maxsize=None)
 def has_piper():
-    """Check if Piper TTS is available."""
+    """Check if Piper TTS is available (looked up once)."""
     return shutil.which('piper') is not None
 
 
+@functools.lru_cache(maxsize=None)
 def has_espeak():
-    """Check if espeak-ng is available."""
-    return shutil.which('espeak-ng') is not None
+    """Check if espeak-ng is available (library or executable; looked up once)."""
+    return espeak.load() is not None or shutil.which('espeak-ng') is not None
 
 
-def speak(text, lang='sv', engine=None):
+def speak(text, lang='sv', engine=None, on_done=None):
     """Speak text using Piper (first) or espeak-ng (fallback).
-    
+
+    Synthesis runs in the executor's interactive lane and playback starts
+    on the main loop; returns the task's CancelToken.
+
     Args:
         text: Text to speak
         lang: Language code (default: sv for Swedish)
         engine: Force 'piper' or 'espeak'. None = auto-detect.
+        on_done: Called on the main loop when playback has finished.
     """
-    if not text:
-        return
+    return executor().submit(synthesize, text, lang, engine, lane=INTERACTIVE,
+                             on_done=lambda clip: audio.engine().play(clip, on_done))
 
-    if engine is None:
-        engine = 'piper' if has_piper() else 'espeak' if has_espeak() else None
 
-    if engine == 'piper':
-        _speak_piper(text, lang)
-    elif engine == 'espeak':
-        _speak_espeak(text, lang)
+def _piper_model(lang):
+    """Return the first installed Piper voice for ``lang``, if any."""
+    model_dir = os.path.expanduser('~/.local/share/piper/voices')
+    if os.path.isdir(model_dir):
+        for f in os.listdir(model_dir):
+            if f.startswith(lang) and f.endswith('.onnx'):
+                return os.path.join(model_dir, f)
+    return None
 
 
-def _speak_piper(text, lang):
-    """Speak using Piper TTS."""
+def _piper_rate(model):
+    """Sample rate of a Piper voice, from the JSON config next to it."""
     try:
-        # Find Piper model
-        model_dir = os.path.expanduser('~/.local/share/piper/voices')
-        model = None
-        if os.path.isdir(model_dir):
-            for f in os.listdir(model_dir):
-                if f.startswith(lang) and f.endswith('.onnx'):
-                    model = os.path.join(model_dir, f)
-                    break
-
-        cmd = ['piper', '--output-raw']
-        if model:
-            cmd.extend(['--model', model])
-
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-            tmp_path = tmp.name
-
-        proc = subprocess.Popen(
-            ['piper', '--output_file', tmp_path] + (['--model', model] if model else []),
-            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-        proc.communicate(input=text.encode('utf-8'))
+        with open(model + '.json') as f:
+            return json.load(f)['audio']['sample_rate']
+    except (TypeError, OSError, ValueError, KeyError):
+        return PIPER_RATE
 
-        if os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 0:
-            subprocess.Popen(
-                ['paplay', tmp_path],
-                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+
+def _synthesize_piper(text, lang):
+    """Render text with Piper as raw 16-bit mono PCM (None on failure)."""
+    model = _piper_model(lang)
+    with span('tts.synthesis'):
+        result = subprocess.run(
+            ['piper', '--output-raw'] + (['--model', model] if model else []),
+            input=text.encode('utf-8'), capture_output=True
+        )
+    if not result.stdout:
+        return None
+    return audio.Clip(result.stdout, _piper_rate(model), 1, 2)
+
+
+@traced('tts.espeak')
+def _synthesize_espeak(text, lang):
+    """Render text with espeak-ng (None on failure)."""
+    lib = espeak.load()
+    if lib is not None:
+        try:
+            with span('tts.synthesis'):
+                return lib.synthesize(text, lang) or None
+        except (OSError, ValueError):
+            pass
+    try:
+        with span('tts.synthesis'):
+            result = subprocess.run(
+                ['espeak-ng', '-v', lang, '--stdout', text],
+                capture_output=True, timeout=30
             )
-    except (FileNotFoundError, OSError):
-        _speak_espeak(text, lang)
+        return audio.Clip.from_wav(result.stdout) if result.stdout else None
+    except (FileNotFoundError, OSError, subprocess.TimeoutExpired, EOFError, wave.Error):
+        return None
 
 
-def _speak_espeak(text, lang):
-    """Speak using espeak-ng (fallback)."""
-    try:
-        subprocess.Popen(
-            ['espeak-ng', '-v', lang, text],
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-    except (FileNotFoundError, OSError):
-        pass
+def synthesize(text, lang='sv', engine=None):
+    """Render text to an ``audio.Clip`` without playing it.
+
+    Used to prepare speech ahead of time (e.g. by the auto-play
+    prefetcher). Returns None if no engine is available.
+    """
+    if not text:
+        return None
+    if engine is None:
+        engine = 'piper' if has_piper() else 'espeak' if has_espeak() else None
+    clip = None
+    if engine == 'piper':
+        try:
+            clip = _synthesize_piper(text, lang)
+        except (FileNotFoundError, OSError):
+            clip = None
+        engine = 'espeak' if clip is None else engine
+    if engine == 'espeak':
+        clip = _synthesize_espeak(text, lang)
+    return clip
 
 
+@traced('tts.phonetics')
 def get_phonetics(word, lang='sv'):
     """Get IPA phonetic transcription of a word."""
+    lib = espeak.load()
+    if lib is not None:
+        try:
+            return lib.phonemes(word, lang)
+        except (OSError, ValueError):
+            pass
     try:
         result = subprocess.run(
             ['espeak-ng', '-v', lang, '--ipa', '-q', word],
@@ -6,13 +6,16 @@ import os as _pos2
 class ProfileManager:
     """Simple user profile management for barn-appar."""
 
-    def __init__(self, app_name):
+    def __init__(self, app_name, config=None):
         self._app_name = app_name
+        self._config = config
         self._dir = _pos2.path.join(_pos2.path.expanduser('~'), '.config', app_name, 'profiles')
         _pos2.makedirs(self._dir, exist_ok=True)
         self._current = self._load_current()
 
     def _load_current(self):
+        if self._config is not None:
+            return self._config.get('profiles.current')
         try:
             with open(_pos2.path.join(self._dir, '.current')) as f:
                 return f.read().strip()
@@ -21,10 +24,15 @@ class ProfileManager:
 
     @property
     def current(self):
+        if self._config is not None:
+            return self._config.get('profiles.current')
         return self._current
 
     def switch(self, name):
         self._current = name
+        if self._config is not None:
+            self._config.set('profiles.current', name)
+            return
         with open(_pos2.path.join(self._dir, '.current'), 'w') as f:
             f.write(name)
 
@@ -33,7 +41,7 @@ class ProfileManager:
         for f in sorted(_pos2.listdir(self._dir)):
             if f.endswith('.json') and f != '.current':
                 profiles.append(f[:-5])
-        return list(set(profiles))
+        return sorted(set(profiles))
 
     def save_data(self, data):
         with open(_pos2.path.join(self._dir, f'{self._current}.json'), 'w') as f:
@@ -0,0 +1,285 @@
+"""Story reminders: read "Going to the Dentist" just before the visit.
+
+A reminder belongs to a story and has a start time, an optional
+recurrence rule and a lead time; it fires ``lead`` seconds before each
+occurrence. Rules are small dicts stored as they are:
+
+    {"freq": "daily" | "weekly" | "monthly", "interval": 1,
+     "weekdays": [0, 2, 4],     # weekly only, Monday is 0
+     "until": <epoch seconds>}  # optional
+
+Occurrences keep their wall-clock time across daylight saving changes;
+monthly occurrences on a day the month lacks are skipped.
+
+``ReminderScheduler`` keeps the next occurrence of every reminder in a
+min-heap and arms one timeout for the earliest, so a large schedule
+costs nothing while idle. Reminders are saved to a JSON file on every
+change (coalesced when a timer is available) together with their next
+occurrence, and the heap is rebuilt from it on load; occurrences missed
+by less than ``MISSED_GRACE`` while the app was closed fire at once,
+older ones are skipped.
+"""
+import calendar
+import heapq
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from socialaberattelser.persist import CoalescedSaver, atomic_write
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+MISSED_GRACE = 15 * 60
+# Timers run on the monotonic clock, which stops during suspend; waking
+# up at least this often keeps reminders on time after a resume.
+MAX_SLEEP_MS = 15 * 60 * 1000
+
+
+def _at(day, clock):
+    return datetime.combine(day, clock).timestamp()
+
+
+def next_occurrence(start, rule, after):
+    """First occurrence later than ``after`` (epoch seconds), or None when there is none.
+
+    ``start`` itself is an occurrence only if it matches the rule, e.g.
+    "weekdays" starting on a Saturday first occurs on Monday.
+    """
+    if not rule:
+        return start if after < start else None
+    # Nothing before start can occur: search from just before it.
+    after = max(after, start - 1)
+    until = rule.get("until")
+    interval = max(1, int(rule.get("interval", 1)))
+    first = datetime.fromtimestamp(start)
+    clock = first.time()
+    day = datetime.fromtimestamp(after).date()
+    freq = rule["freq"]
+    found = None
+    if freq == "daily":
+        n = (day - first.date()).days // interval
+        while found is None:
+            t = _at(first.date() + timedelta(days=n * interval), clock)
+            if t > after:
+                found = t
+            n += 1
+    elif freq == "weekly":
+        weekdays = set(rule.get("weekdays") or [first.weekday()])
+        monday = first.date() - timedelta(days=first.weekday())
+        for _ in range(7 * (interval + 1) + 1):
+            if ((day - monday).days // 7) % interval == 0 and day.weekday() in weekdays:
+                t = _at(day, clock)
+                if t > after:
+                    found = t
+                    break
+            day += timedelta(days=1)
+    elif freq == "monthly":
+        months = (day.year - first.year) * 12 + day.month - first.month
+        n = max(0, months // interval)
+        # Day 31 appears in 7 of every 12 months, so this always finds one.
+        for _ in range(24):
+            m = first.month - 1 + n * interval
+            year, month = first.year + m // 12, m % 12 + 1
+            if first.day <= calendar.monthrange(year, month)[1]:
+                t = _at(first.date().replace(year=year, month=month), clock)
+                if t > after:
+                    found = t
+                    break
+            n += 1
+    else:
+        raise ValueError(f"unknown frequency {freq!r}")
+    if found is None or (until is not None and found > until):
+        return None
+    return found
+
+
+class Reminder:
+    __slots__ = ("id", "story", "start", "rule", "lead", "next")
+
+    def __init__(self, id, story, start, rule=None, lead=0):
+        self.id = id
+        self.story = story
+        self.start = start
+        self.rule = rule
+        self.lead = lead
+        self.next = None        # the upcoming occurrence, None when finished
+
+    def __repr__(self):
+        return f"<Reminder {self.story!r} next={self.next} rule={self.rule}>"
+
+    def to_json(self):
+        data = {"id": self.id, "story": self.story, "start": self.start, "lead": self.lead,
+                "next": self.next}
+        if self.rule:
+            data["rule"] = self.rule
+        return data
+
+    @classmethod
+    def from_json(cls, data):
+        reminder = cls(data["id"], data["story"], data["start"], data.get("rule"),
+                       data.get("lead", 0))
+        reminder.next = data.get("next")
+        return reminder
+
+
+class ReminderScheduler:
+    """Reminders saved in ``path``; fires listeners from a single timer.
+
+    ``timeout_add(ms, fn)`` and ``source_remove(id)`` arm and cancel the
+    timer (GLib.timeout_add and GLib.source_remove in the app). Without
+    them, call ``run_due()`` to fire what is due.
+    """
+
+    def __init__(self, path, timeout_add=None, source_remove=None, clock=time.time,
+                 delay_ms=500):
+        self.path = path
+        self._saver = CoalescedSaver(self.save, timeout_add, delay_ms)
+        self._timeout_add = timeout_add
+        self._source_remove = source_remove
+        self._clock = clock
+        self._reminders = {}
+        self._heap = []         # (fire time, occurrence, reminder id)
+        self._listeners = []
+        self._source = None
+        self._armed_for = None
+        self._load()
+
+    # ── Persistence ──────────────────────────────────────────
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = self._clock()
+        for item in data.get("reminders", []):
+            try:
+                reminder = Reminder.from_json(item)
+            except (KeyError, TypeError):
+                continue
+            after = now - MISSED_GRACE + reminder.lead
+            if reminder.next is not None:
+                # Resume from the saved occurrence so one that already fired is not repeated.
+                after = max(after, reminder.next - 1)
+            self._advance(reminder, after, push=False)
+            if reminder.next is not None:
+                self._reminders[reminder.id] = reminder
+        self._heap = [(r.next - r.lead, r.next, r.id) for r in self._reminders.values()
+                      if r.next is not None]
+        heapq.heapify(self._heap)
+        self._arm()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with atomic_write(self.path) as f:
+            json.dump({"version": 1,
+                       "reminders": [r.to_json() for r in self._reminders.values()]},
+                      f, ensure_ascii=False, indent=1)
+
+    # ── Editing ──────────────────────────────────────────────
+
+    def connect(self, callback):
+        """Call ``callback(reminder, occurrence)`` when a reminder fires."""
+        self._listeners.append(callback)
+
+    def disconnect(self, callback):
+        self._listeners.remove(callback)
+
+    def __len__(self):
+        return len(self._reminders)
+
+    def first(self, start, rule=None, lead=0):
+        """The first occurrence a new reminder would fire for; raises ValueError if none."""
+        if rule and rule.get("freq") not in FREQUENCIES:
+            raise ValueError(f"unknown frequency {rule.get('freq')!r}")
+        occurrence = next_occurrence(start, rule, self._clock() - MISSED_GRACE + lead)
+        if occurrence is None:
+            raise ValueError("the reminder has no occurrence in the future")
+        return occurrence
+
+    def add(self, story, start, rule=None, lead=0):
+        """Schedule ``story`` (a story key) at ``start``; returns the ``Reminder``."""
+        reminder = Reminder(uuid.uuid4().hex, story, start, rule, lead)
+        reminder.next = self.first(start, rule, lead)
+        heapq.heappush(self._heap, (reminder.next - lead, reminder.next, reminder.id))
+        self._reminders[reminder.id] = reminder
+        self._saver.request()
+        self._arm()
+        return reminder
+
+    def remove(self, reminder_id):
+        # Its heap entry is dropped when it reaches the top.
+        if self._reminders.pop(reminder_id, None) is not None:
+            self._saver.request()
+            self._arm()
+
+    def for_story(self, story):
+        return sorted((r for r in self._reminders.values() if r.story == story),
+                      key=lambda r: (r.next is None, r.next or 0))
+
+    def upcoming(self, limit=10):
+        """The next ``limit`` reminders as ``(occurrence, reminder)``, soonest first."""
+        live = (entry for entry in self._heap if self._valid(entry))
+        return [(occ, self._reminders[rid]) for _t, occ, rid in heapq.nsmallest(limit, live)]
+
+    # ── Firing ───────────────────────────────────────────────
+
+    def _valid(self, entry):
+        reminder = self._reminders.get(entry[2])
+        return reminder is not None and reminder.next == entry[1]
+
+    def _advance(self, reminder, after, push=True):
+        reminder.next = next_occurrence(reminder.start, reminder.rule, after)
+        if reminder.next is not None and push:
+            heapq.heappush(self._heap, (reminder.next - reminder.lead, reminder.next, reminder.id))
+
+    def _peek(self):
+        heap = self._heap
+        while heap and not self._valid(heap[0]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def run_due(self, now=None):
+        """Fire every reminder that is due; returns how many fired."""
+        now = self._clock() if now is None else now
+        fired = []
+        while True:
+            top = self._peek()
+            if top is None or top[0] > now:
+                break
+            heapq.heappop(self._heap)
+            reminder = self._reminders[top[2]]
+            fired.append((reminder, top[1]))
+            self._advance(reminder, top[1])
+            if reminder.next is None:
+                del self._reminders[reminder.id]
+        if fired:
+            self._saver.request()
+            for reminder, occurrence in fired:
+                for cb in list(self._listeners):
+                    cb(reminder, occurrence)
+        self._arm()
+        return len(fired)
+
+    def _arm(self):
+        if self._timeout_add is None:
+            return
+        top = self._peek()
+        due = top[0] if top else None
+        if due == self._armed_for and self._source is not None:
+            return
+        if self._source is not None:
+            self._source_remove(self._source)
+            self._source = None
+        self._armed_for = due
+        if due is not None:
+            delay = max(0, min(int((due - self._clock()) * 1000) + 1, MAX_SLEEP_MS))
+            self._source = self._timeout_add(delay, self._on_timeout)
+
+    def _on_timeout(self):
+        self._source = None
+        self._armed_for = None
+        self.run_due()
+        return False
@@ -0,0 +1,110 @@
+"""In-memory inverted index for searching stories as you type."""
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(text):
+    """Lowercase text and strip diacritics, so "Tandläkaren" matches "tandlakaren"."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _WORD.findall(fold(text))
+
+
+def _story_text(story):
+    yield story.title
+    yield from story.texts
+
+
+class SearchIndex:
+    """Token -> story key postings with prefix lookup over a sorted vocabulary.
+
+    Keys are story ids. ``sync()`` only re-tokenizes stories whose content
+    changed since the last call, so it is cheap to run after every save.
+    ``render`` yields the searchable texts of a story, e.g. translated.
+    """
+
+    def __init__(self, render=_story_text):
+        self._render = render
+        self._postings = {}
+        self._vocab = []
+        self._tokens = {}
+        self._content = {}
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def update(self, key, story):
+        """Index (or re-index) a single story."""
+        content = tuple(self._render(story))
+        if self._content.get(key) == content:
+            return
+        self.remove(key)
+        tokens = set()
+        for text in content:
+            tokens.update(tokenize(text))
+        for tok in tokens:
+            keys = self._postings.get(tok)
+            if keys is None:
+                keys = self._postings[tok] = set()
+                insort(self._vocab, tok)
+            keys.add(key)
+        self._tokens[key] = tokens
+        self._content[key] = content
+
+    def remove(self, key):
+        self._content.pop(key, None)
+        for tok in self._tokens.pop(key, ()):
+            keys = self._postings[tok]
+            keys.discard(key)
+            if not keys:
+                del self._postings[tok]
+                del self._vocab[bisect_left(self._vocab, tok)]
+
+    def state(self):
+        """Return the index contents for caching (without ``render``)."""
+        return (self._postings, self._vocab, self._tokens, self._content)
+
+    def load_state(self, state):
+        self._postings, self._vocab, self._tokens, self._content = state
+
+    def sync(self, stories):
+        """Bring the index in line with ``stories``, which must have unique ids."""
+        keys = set()
+        for story in stories:
+            self.update(story.id, story)
+            keys.add(story.id)
+        for key in [k for k in self._tokens if k not in keys]:
+            self.remove(key)
+
+    def _prefix(self, term):
+        found = set()
+        total = len(self._tokens)
+        i = bisect_left(self._vocab, term)
+        while i < len(self._vocab) and self._vocab[i].startswith(term):
+            found |= self._postings[self._vocab[i]]
+            if len(found) == total:
+                break
+            i += 1
+        return found
+
+    def query(self, text):
+        """Return the keys matching every word of ``text`` as a prefix.
+
+        An empty query returns None, meaning "no filter".
+        """
+        terms = sorted(set(tokenize(text)), key=len, reverse=True)
+        if not terms:
+            return None
+        result = None
+        for term in terms:
+            hits = self._prefix(term)
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return result
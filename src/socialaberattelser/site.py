@@ -0,0 +1,322 @@
+"""Static web version of the library for the Autismappar PWA and offline use.
+
+``SiteBuilder(directory).build(stories)`` renders the library into a
+folder that can be served as is or opened from disk:
+
+    index.html                  language chooser
+    <lang>/index.html           the library in one language
+    <lang>/<story>.html         a story, one step at a time with JS, all steps without
+    assets/<name>.<hash>.js     script and style, named by content hash
+    assets/img/<hash><ext>      step images, named by content hash
+    sw.js                       service worker precaching everything for offline use
+    .build.json                 the dependency graph of the last build
+
+Every output is recorded with a key hashed from everything it is made
+of: the story's displayed texts in that language (so changed
+translations count), the names of its images and of the script and
+style. A rebuild computes the keys and writes only the outputs whose key
+changed; images are only re-read when their size or mtime changed.
+Outputs that are no longer produced are deleted.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+
+from socialaberattelser import i18n, templates
+from socialaberattelser.i18n import N_
+from socialaberattelser.model import story_key
+from socialaberattelser.persist import atomic_write
+
+FORMAT = "socialaberattelser-site"
+VERSION = 1
+STATE = ".build.json"
+
+SCRIPT = """\
+(function () {
+  var root = document.body.getAttribute("data-root");
+  if ("serviceWorker" in navigator && location.protocol !== "file:") {
+    navigator.serviceWorker.register(root + "sw.js");
+  }
+  var steps = document.querySelectorAll(".step");
+  if (!steps.length) return;
+  var i = 0;
+  var prev = document.getElementById("prev"), next = document.getElementById("next");
+  var counter = document.getElementById("counter");
+  document.body.classList.add("js");
+  function show(n) {
+    i = Math.max(0, Math.min(steps.length - 1, n));
+    for (var k = 0; k < steps.length; k++) steps[k].hidden = k !== i;
+    prev.disabled = i === 0;
+    next.disabled = i === steps.length - 1;
+    counter.textContent = counter.getAttribute("data-format")
+      .replace("%1", i + 1).replace("%2", steps.length);
+  }
+  prev.onclick = function () { show(i - 1); };
+  next.onclick = function () { show(i + 1); };
+  document.getElementById("speak").onclick = function () {
+    if (!window.speechSynthesis) return;
+    var u = new SpeechSynthesisUtterance(steps[i].querySelector(".text").textContent);
+    u.lang = document.documentElement.lang;
+    speechSynthesis.cancel();
+    speechSynthesis.speak(u);
+  };
+  document.addEventListener("keydown", function (e) {
+    if (e.key === "ArrowLeft") show(i - 1);
+    if (e.key === "ArrowRight") show(i + 1);
+  });
+  show(0);
+})();
+"""
+
+STYLE = """\
+body { font-family: Cantarell, system-ui, sans-serif; margin: 0 auto; max-width: 40em;
+       padding: 1em; background: #fafafa; color: #222; }
+@media (prefers-color-scheme: dark) { body { background: #242424; color: #eee; } a { color: #78aeed; } }
+h1 { text-align: center; }
+ul.stories { list-style: none; padding: 0; }
+ul.stories li a { display: block; padding: .8em 1em; margin: .4em 0; border-radius: .6em;
+                  background: rgba(128, 128, 128, .12); text-decoration: none; color: inherit; }
+.step { text-align: center; margin: 2em 0; }
+.step .emoji { font-size: 4em; }
+.step .text { font-size: 1.5em; }
+.step img { max-width: 100%; max-height: 40vh; }
+.controls { display: none; text-align: center; }
+.js .controls { display: block; }
+.controls button { font-size: 1.2em; padding: .5em 1.2em; border-radius: 2em; border: 0; margin: .3em; }
+footer { text-align: center; opacity: .6; margin-top: 3em; }
+"""
+
+SERVICE_WORKER = """\
+var CACHE = "socialstories-%(version)s";
+var FILES = %(files)s;
+self.addEventListener("install", function (e) {
+  e.waitUntil(caches.open(CACHE).then(function (c) { return c.addAll(FILES); }));
+});
+self.addEventListener("activate", function (e) {
+  e.waitUntil(caches.keys().then(function (keys) {
+    return Promise.all(keys.filter(function (k) { return k !== CACHE; })
+                           .map(function (k) { return caches.delete(k); }));
+  }));
+});
+self.addEventListener("fetch", function (e) {
+  e.respondWith(caches.match(e.request).then(function (r) { return r || fetch(e.request); }));
+});
+"""
+
+LABELS = {
+    "library": N_("Social Stories"),
+    "back": N_("All stories"),
+    "prev": N_("Previous"),
+    "next": N_("Next"),
+    "speak": N_("Read aloud"),
+    "counter": N_("Step %d of %d"),
+    "steps": N_("%d steps"),
+}
+
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _key(*parts):
+    return _hash(json.dumps(parts, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def slug(key):
+    """File name stem for a story key: readable and unique."""
+    base = re.sub(r"[^a-z0-9]+", "-", key.lower()).strip("-")[:40]
+    return f"{base or 'story'}-{_hash(key.encode('utf-8'))[:8]}"
+
+
+class BuildResult:
+    __slots__ = ("written", "unchanged", "removed")
+
+    def __init__(self):
+        self.written = []
+        self.unchanged = 0
+        self.removed = []
+
+    def __repr__(self):
+        return (f"<BuildResult {len(self.written)} written, {self.unchanged} unchanged, "
+                f"{len(self.removed)} removed>")
+
+
+class SiteBuilder:
+    """Incremental static site in ``directory``."""
+
+    def __init__(self, directory, languages=None):
+        self.directory = directory
+        self.languages = languages or i18n.available_languages()
+        self._state_path = os.path.join(directory, STATE)
+
+    def _load_state(self):
+        try:
+            with open(self._state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("format") == FORMAT and state.get("version") == VERSION:
+                return state
+        except (FileNotFoundError, ValueError):
+            pass
+        return {"outputs": {}, "images": {}}
+
+    def _write(self, rel, data):
+        path = os.path.join(self.directory, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, "wb") as f:
+            f.write(data)
+
+    def build(self, stories):
+        """Bring the site in line with ``stories``; returns a ``BuildResult``."""
+        result = BuildResult()
+        old = self._load_state()
+        outputs = {}        # path -> key of the build that produced it
+        images = {}         # source path -> {"size", "mtime_ns", "name"}
+
+        def emit(rel, key, render):
+            outputs[rel] = key
+            if old["outputs"].get(rel) == key and os.path.exists(f"{self.directory}/{rel}"):
+                result.unchanged += 1
+                return
+            self._write(rel, render())
+            result.written.append(rel)
+
+        # Script and style are referenced by hashed name, so a change
+        # to them renames the file and re-keys every page using it.
+        assets = {}
+        for name, ext, text in (("app", "js", SCRIPT), ("style", "css", STYLE)):
+            data = text.encode("utf-8")
+            rel = f"assets/{name}.{_hash(data)[:12]}.{ext}"
+            assets[name] = rel
+            emit(rel, _hash(data), lambda data=data: data)
+
+        def image(src):
+            if src in images:
+                return images[src]["name"]
+            try:
+                st = os.stat(src)
+            except OSError:
+                return None
+            known = old["images"].get(src)
+            if known and (known["size"], known["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+                entry = known
+            else:
+                digest = _hash(_read(src))
+                entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                         "name": f"assets/img/{digest[:16]}{os.path.splitext(src)[1].lower()}"}
+            images[src] = entry
+            if entry["name"] not in outputs:
+                emit(entry["name"], entry["name"], lambda: _read(src))
+            return entry["name"]
+
+        slugs = {}
+        for story in stories:
+            key = story_key(story)
+            n = 1
+            while key in slugs:
+                n += 1
+                key = f"{story_key(story)}#{n}"
+            slugs[key] = (slug(key), story)
+
+        langs = []
+        for lang in self.languages:
+            gettext = i18n.translator(lang)
+            labels = {k: gettext(v) for k, v in LABELS.items()}
+            langs.append((lang, gettext, labels, _key(VERSION, lang, labels, assets), []))
+        for name, story in slugs.values():
+            pictures = []
+            for i in range(len(story)):
+                step = story.step_json(i)
+                src = step.get("image") if isinstance(step, dict) else None
+                pictures.append(image(src) if src else None)
+            # Only built-in stories are displayed differently per language.
+            builtin = templates.is_builtin(story)
+            content = None
+            for lang, gettext, labels, base, listing in langs:
+                if builtin or content is None:
+                    title = templates.display_title(story, gettext)
+                    steps = [(templates.display_step(story, i, gettext), story.emoji(i), pic)
+                             for i, pic in enumerate(pictures)]
+                    content = json.dumps([title, steps], ensure_ascii=False)
+                listing.append((name, title, len(steps)))
+                emit(f"{lang}/{name}.html", _hash((base + content).encode("utf-8")),
+                     lambda: self._story_page(lang, labels, assets, title, steps))
+        for lang, gettext, labels, base, listing in langs:
+            emit(f"{lang}/index.html", _key(base, listing),
+                 lambda: self._index_page(lang, labels, assets, listing))
+
+        emit("index.html", _key(VERSION, self.languages, assets),
+             lambda: self._root_page(assets))
+        files = sorted(outputs)
+        emit("sw.js", _key(VERSION, [(f, outputs[f]) for f in files]),
+             lambda: self._service_worker(outputs))
+
+        for rel in sorted(set(old["outputs"]) - set(outputs)):
+            try:
+                os.remove(os.path.join(self.directory, rel))
+            except FileNotFoundError:
+                pass
+            result.removed.append(rel)
+        if result.written or result.removed:
+            self._write(STATE, json.dumps({"format": FORMAT, "version": VERSION,
+                                           "outputs": outputs, "images": images},
+                                          ensure_ascii=False).encode("utf-8"))
+        return result
+
+    # ── Rendering ────────────────────────────────────────────
+
+    @staticmethod
+    def _page(lang, title, root, assets, body):
+        e = html.escape
+        return (f'<!DOCTYPE html>\n<html lang="{e(lang)}">\n<head>\n<meta charset="utf-8">\n'
+                f'<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+                f'<title>{e(title)}</title>\n'
+                f'<link rel="stylesheet" href="{root}{assets["style"]}">\n</head>\n'
+                f'<body data-root="{root}">\n{body}\n'
+                f'<footer>www.autismappar.se</footer>\n'
+                f'<script src="{root}{assets["app"]}"></script>\n</body>\n</html>\n').encode("utf-8")
+
+    def _story_page(self, lang, labels, assets, title, steps):
+        e = html.escape
+        parts = [f'<p><a href="index.html">← {e(labels["back"])}</a></p>', f"<h1>{e(title)}</h1>"]
+        for text, emoji, img in steps:
+            parts.append('<section class="step">')
+            if emoji:
+                parts.append(f'<div class="emoji">{e(emoji)}</div>')
+            if img:
+                parts.append(f'<img src="../{img}" alt="">')
+            parts.append(f'<p class="text">{e(text)}</p></section>')
+        counter = labels["counter"].replace("%d", "%1", 1).replace("%d", "%2", 1)
+        parts.append(f'<div class="controls"><p id="counter" data-format="{e(counter)}"></p>'
+                     f'<button id="prev">{e(labels["prev"])}</button>'
+                     f'<button id="speak">{e(labels["speak"])}</button>'
+                     f'<button id="next">{e(labels["next"])}</button></div>')
+        return self._page(lang, title, "../", assets, "\n".join(parts))
+
+    def _index_page(self, lang, labels, assets, listing):
+        e = html.escape
+        items = "\n".join(f'<li><a href="{name}.html">{e(title)} '
+                          f'<small>({e(labels["steps"] % count)})</small></a></li>'
+                          for name, title, count in listing)
+        body = f'<h1>{e(labels["library"])}</h1>\n<ul class="stories">\n{items}\n</ul>'
+        return self._page(lang, labels["library"], "../", assets, body)
+
+    def _root_page(self, assets):
+        e = html.escape
+        items = "\n".join(f'<li><a href="{e(lang)}/index.html" hreflang="{e(lang)}">'
+                          f'{e(i18n.translator(lang)(LABELS["library"]))} ({e(lang)})</a></li>'
+                          for lang in self.languages)
+        body = f'<ul class="stories">\n{items}\n</ul>'
+        return self._page(self.languages[0], "Social Stories", "", assets, body)
+
+    @staticmethod
+    def _service_worker(outputs):
+        files = ["./"] + sorted(outputs)
+        version = _key(sorted(outputs.items()))[:12]
+        return (SERVICE_WORKER % {"version": version, "files": json.dumps(files)}).encode("utf-8")
@@ -0,0 +1,187 @@
+"""The application's story library, shared by all windows.
+
+``StoryStore`` is loaded once per process and owned by the application.
+Windows, the list view and exporters read stories from it and subscribe
+to its changes instead of keeping their own copies:
+
+    store.connect(callback)   # callback(kind, index, story)
+
+``kind`` is "added", "changed" or "removed". Every change also
+updates the shared search index, records the story's history (when a
+``History`` is given) and schedules one coalesced save. The search
+index is keyed by story id, so the store gives every story an id that
+is unique in it. History versions are written in batches by
+``background`` (a function running its argument on a worker) when one
+is given. With a ``LibraryCache`` the parsed library and index are
+restored from a snapshot when stories.json is unchanged;
+``save_cache()`` refreshes it.
+"""
+import threading
+import uuid
+
+from socialaberattelser.model import Story
+from socialaberattelser.persist import CoalescedSaver
+from socialaberattelser.search import SearchIndex
+
+
+class StoryStore:
+    """An observable list of ``Story`` objects."""
+
+    def __init__(self, load, save, render, history=None, schedule=None, delay_ms=500,
+                 cache=None, language=None, background=None):
+        self._save_fn = save
+        self._cache = cache
+        self._saver = CoalescedSaver(self.save, schedule, delay_ms)
+        self._dirty = False
+        self._listeners = []
+        self.history = history
+        self._background = background
+        self._history_queue = {}        # story id -> copy to record
+        self._history_submitted = False
+        self._queue_lock = threading.Lock()
+        self._history_lock = threading.Lock()
+        self.search = SearchIndex(render=render)
+        self._language = language
+        cached = cache.read() if cache is not None else None
+        self._ids = set()
+        if cached is None:
+            self._stories = load()
+            for story in self._stories:
+                if self._adopt(story):
+                    self._dirty = True
+            self.search.sync(self._stories)
+            self._cache_stale = cache is not None
+        else:
+            self._stories = cached["stories"]
+            self._ids.update(story.id for story in self._stories)
+            if cached["language"] == language:
+                self.search.load_state(cached["search"])
+            else:
+                self.search.sync(self._stories)
+            self._cache_stale = False
+        if self._dirty:
+            self._request_save()
+
+    def __len__(self):
+        return len(self._stories)
+
+    def __getitem__(self, index):
+        return self._stories[index]
+
+    def __iter__(self):
+        return iter(self._stories)
+
+    def index(self, story):
+        for i, s in enumerate(self._stories):
+            if s is story:
+                return i
+        raise ValueError(f"{story!r} is not in the store")
+
+    def connect(self, callback):
+        self._listeners.append(callback)
+
+    def disconnect(self, callback):
+        self._listeners.remove(callback)
+
+    def _emit(self, kind, index, story):
+        for cb in list(self._listeners):
+            cb(kind, index, story)
+
+    def _adopt(self, story):
+        """Give ``story`` a fresh id if it has none or shares one; True if it did."""
+        assigned = story.id is None or story.id in self._ids
+        if assigned:
+            story.id = uuid.uuid4().hex
+        self._ids.add(story.id)
+        return assigned
+
+    def append(self, story):
+        self.extend([story])
+
+    def extend(self, stories):
+        for story in stories:
+            self._adopt(story)
+            self._stories.append(story)
+            index = len(self._stories) - 1
+            self.search.update(story.id, story)
+            self._record(story)
+            self._emit("added", index, story)
+        self._request_save()
+
+    def changed(self, index):
+        """Announce that the story at ``index`` was edited in place; its id must not change."""
+        story = self._stories[index]
+        self.search.update(story.id, story)
+        self._record(story)
+        self._emit("changed", index, story)
+        self._request_save()
+
+    def replace(self, index, story):
+        old = self._stories[index]
+        self._ids.discard(old.id)
+        if story.id != old.id:
+            self.search.remove(old.id)
+        self._adopt(story)
+        self._stories[index] = story
+        self.changed(index)
+
+    def remove(self, index):
+        story = self._stories.pop(index)
+        self._ids.discard(story.id)
+        self.search.remove(story.id)
+        self._emit("removed", index, story)
+        self._request_save()
+
+    def reindex(self, language):
+        """Re-render the search index for ``language``; a no-op if already done."""
+        if language != self._language:
+            self._language = language
+            self.search.sync(self._stories)
+            self._cache_stale = self._cache is not None
+
+    def _record(self, story):
+        if self.history is None:
+            return
+        if self._background is None:
+            self.history.record(story)
+            return
+        # A copy, since the story may be edited again before the batch runs;
+        # only its latest state is recorded.
+        with self._queue_lock:
+            self._history_queue[story.id] = Story.from_dict(story.to_dict())
+            if self._history_submitted:
+                return
+            self._history_submitted = True
+        self._background(self.flush_history)
+
+    def flush_history(self):
+        """Record the queued history versions; safe to call from any thread."""
+        with self._history_lock:
+            with self._queue_lock:
+                batch, self._history_queue = self._history_queue, {}
+                self._history_submitted = False
+            for story in batch.values():
+                self.history.record(story)
+
+    def prune_history(self, keep=None, max_age=None):
+        """``History.prune`` between history batches; returns the versions removed."""
+        with self._history_lock:
+            return self.history.prune(keep=keep, max_age=max_age)
+
+    def _request_save(self):
+        self._dirty = True
+        self._saver.request()
+
+    def save(self):
+        if self._dirty:
+            self._save_fn(self._stories)
+            self._dirty = False
+            self._cache_stale = self._cache is not None
+
+    def save_cache(self):
+        """Snapshot the library and search index for the next start, if changed."""
+        self.save()
+        if self._cache_stale:
+            self._cache.write({"stories": self._stories, "language": self._language,
+                               "search": self.search.state()})
+            self._cache_stale = False
@@ -0,0 +1,330 @@
+"""Library replication through a shared folder (USB stick, network share).
+
+Every device publishes its view of the library into the folder and
+reads the others'. Nothing but plain files is needed:
+
+    socialstories-sync/
+        chunks/<2 hex>/<62 hex>     story data split at content-defined boundaries
+        devices/<device>.json       that device's manifest, written only by it
+
+A manifest maps story ids to the story's content hash, its chunk list
+and a version vector (edits per device). Stories are serialized as
+canonical JSON and cut into chunks with a gear rolling hash, so an edit
+changes only the chunks around it; chunks already in the folder are not
+written again and chunks present in the local copy of a story are not
+read back.
+
+Merging is per story and deterministic, so every device reaches the
+same library whatever order they sync in:
+
+- a version whose vector dominates the other wins;
+- concurrent edits: the version with more edits in total (then the
+  higher content hash) wins, and the other is kept as a conflict copy
+  with a key and title derived from its content;
+- an edit beats a concurrent deletion.
+
+``SyncFolder(path, device).sync(stories)`` returns the changes to apply
+locally; it only reads ``stories`` so it can run on a worker thread.
+The device's manifest is written by ``publish(result)`` once those
+changes have been applied, so a sync interrupted in between is simply
+repeated and never announces stories as deleted that the device still
+has on disk.
+"""
+import hashlib
+import json
+import os
+import random
+import time
+
+from socialaberattelser.persist import atomic_write
+
+FORMAT = "socialaberattelser-sync"
+VERSION = 1
+ROOT = "socialstories-sync"
+
+MIN_CHUNK = 2 * 1024
+MAX_CHUNK = 64 * 1024
+# A boundary is where the top 13 bits of the hash are zero: ~8 KiB
+# average chunks. The top bits depend on the last 32 bytes, the low
+# bits only on the last few, which cuts poorly in repetitive text.
+_LIMIT = 1 << (32 - 13)
+
+_rng = random.Random(0x5B)
+_GEAR = [_rng.getrandbits(32) for _ in range(256)]
+del _rng
+
+
+def chunk(data):
+    """Split ``data`` at content-defined boundaries."""
+    n = len(data)
+    start = 0
+    gear = _GEAR
+    while start < n:
+        if n - start <= MIN_CHUNK:
+            yield data[start:]
+            return
+        end = min(start + MAX_CHUNK, n)
+        h = 0
+        i = start + MIN_CHUNK
+        while i < end:
+            h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+            i += 1
+            if h < _LIMIT:
+                break
+        yield data[start:i]
+        start = i
+
+
+def encode(data):
+    """Canonical bytes of a story dict."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def dominates(a, b):
+    """True if version vector ``a`` includes every edit in ``b``."""
+    return all(a.get(dev, 0) >= n for dev, n in b.items())
+
+
+def _join(a, b):
+    return {dev: max(a.get(dev, 0), b.get(dev, 0)) for dev in sorted(set(a) | set(b))}
+
+
+class SyncResult:
+    __slots__ = ("updates", "conflicts", "sent", "received", "manifest")
+
+    def __init__(self):
+        self.updates = {}      # story id -> story dict, or None to delete
+        self.conflicts = []    # ids of conflict copies created
+        self.sent = 0          # chunks written to the folder
+        self.received = 0      # chunks read from the folder
+        self.manifest = None   # entries for publish()
+
+    def __repr__(self):
+        return (f"<SyncResult {len(self.updates)} updates, {len(self.conflicts)} conflicts, "
+                f"{self.sent} sent, {self.received} received>")
+
+
+class _Version:
+    """One side of a merge: content (None if deleted) and its vector."""
+
+    __slots__ = ("data", "blob", "hash", "vv", "chunks")
+
+    def __init__(self, data, vv, blob=None, digest=None, chunks=None):
+        self.data = data
+        self.blob = blob if blob is not None or data is None else encode(data)
+        self.hash = digest or (_digest(self.blob) if self.blob is not None else None)
+        self.vv = vv
+        self.chunks = chunks
+
+    @property
+    def deleted(self):
+        return self.data is None
+
+    def rank(self):
+        return (not self.deleted, sum(self.vv.values()), self.hash or "")
+
+
+class SyncFolder:
+    """The sync area inside a shared folder, seen from one device."""
+
+    def __init__(self, path, device):
+        if not device or "/" in device:
+            raise ValueError("invalid device id")
+        self.root = os.path.join(path, ROOT)
+        self.device = device
+        self._chunks = os.path.join(self.root, "chunks")
+        self._devices = os.path.join(self.root, "devices")
+
+    # ── Files ────────────────────────────────────────────────
+
+    def _chunk_path(self, digest):
+        return os.path.join(self._chunks, digest[:2], digest[2:])
+
+    def _write_chunk(self, digest, data):
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_write(path, "wb") as f:
+            f.write(data)
+        return True
+
+    def manifests(self):
+        """Return device id -> manifest for every device in the folder."""
+        out = {}
+        try:
+            names = sorted(os.listdir(self._devices))
+        except FileNotFoundError:
+            return out
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self._devices, name), encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if manifest.get("format") == FORMAT and manifest.get("version", 0) <= VERSION:
+                out[name[:-5]] = manifest
+        return out
+
+    def _write_manifest(self, stories):
+        os.makedirs(self._devices, exist_ok=True)
+        path = os.path.join(self._devices, self.device + ".json")
+        with atomic_write(path) as f:
+            json.dump({"format": FORMAT, "version": VERSION, "device": self.device,
+                       "time": time.time(), "stories": stories}, f, ensure_ascii=False)
+
+    # ── Content ──────────────────────────────────────────────
+
+    def _store(self, version, result):
+        """Chunk a local version and write the chunks the folder lacks."""
+        if version.chunks is None:
+            version.chunks = []
+            for piece in chunk(version.blob):
+                digest = _digest(piece)
+                version.chunks.append(digest)
+                if self._write_chunk(digest, piece):
+                    result.sent += 1
+
+    def _fetch(self, entry, local, result):
+        """Assemble a remote version, reusing chunks of the local copy."""
+        have = {}
+        if local is not None and local.blob is not None:
+            for piece in chunk(local.blob):
+                have[_digest(piece)] = piece
+        parts = []
+        for digest in entry["chunks"]:
+            piece = have.get(digest)
+            if piece is None:
+                with open(self._chunk_path(digest), "rb") as f:
+                    piece = f.read()
+                result.received += 1
+            parts.append(piece)
+        blob = b"".join(parts)
+        if _digest(blob) != entry["hash"]:
+            raise ValueError("sync folder has a damaged story")
+        return _Version(json.loads(blob), entry["vv"], blob, entry["hash"], entry["chunks"])
+
+    # ── Sync ─────────────────────────────────────────────────
+
+    def sync(self, stories, allow_deletions=True):
+        """Merge ``stories`` with the other devices' changes.
+
+        Stories must have ids. Returns a ``SyncResult`` whose ``updates``
+        bring the local library in line with the merged one; pass it to
+        ``publish()`` after applying them. Without ``allow_deletions``
+        (the library is not the one last synced, e.g. defaults loaded
+        after a read error) a sync that would delete stories on every
+        device raises ValueError.
+        """
+        result = SyncResult()
+        manifests = self.manifests()
+        own = manifests.pop(self.device, {}).get("stories", {})
+        local = {}
+        for story in stories:
+            if story.id is None:
+                raise ValueError("stories need an id to sync")
+            local[story.id] = story
+        published = {}
+        keys = set(local) | set(own)
+        for manifest in manifests.values():
+            keys.update(manifest.get("stories", {}))
+        if not allow_deletions:
+            missing = sum(1 for key, entry in own.items()
+                          if key not in local and not entry.get("deleted"))
+            if missing:
+                raise ValueError(f"the library is missing {missing} synced stories")
+
+        for key in sorted(keys):
+            base = own.get(key)
+            current = self._current(key, local.get(key), base)
+            if current is None:
+                current_vv = {}
+            else:
+                current_vv = current.vv
+            # Remote versions we have not seen yet, newest first.
+            remotes = []
+            for _device, manifest in sorted(manifests.items()):
+                entry = manifest.get("stories", {}).get(key)
+                if entry is not None and not dominates(current_vv, entry["vv"]):
+                    remotes.append(entry)
+            for entry in remotes:
+                if current is not None and dominates(current.vv, entry["vv"]):
+                    continue
+                theirs = (_Version(None, entry["vv"]) if entry.get("deleted")
+                          else self._fetch(entry, current, result))
+                current = self._merge(key, current, theirs, result, published)
+            if current is None:
+                continue
+            if not current.deleted:
+                self._store(current, result)
+            published[key] = self._entry(current)
+            mine = local.get(key)
+            if current.deleted:
+                if mine is not None:
+                    result.updates[key] = None
+            elif mine is None or encode(mine.to_dict()) != current.blob:
+                result.updates[key] = current.data
+        result.manifest = published
+        return result
+
+    def publish(self, result):
+        """Write this device's manifest from a ``sync()`` whose updates were applied."""
+        self._write_manifest(result.manifest)
+
+    def _current(self, key, story, base):
+        """The local version of ``key``, bumping its vector if edited since the last sync."""
+        base_vv = base["vv"] if base else {}
+        if story is None:
+            if base is None or base.get("deleted"):
+                return _Version(None, base_vv) if base else None
+            return _Version(None, self._bump(base_vv))
+        data = story.to_dict()
+        blob = encode(data)
+        digest = _digest(blob)
+        if base is not None and base.get("hash") == digest:
+            return _Version(data, base_vv, blob, digest, base["chunks"])
+        return _Version(data, self._bump(base_vv), blob, digest)
+
+    def _bump(self, vv):
+        vv = dict(vv)
+        vv[self.device] = vv.get(self.device, 0) + 1
+        return vv
+
+    def _merge(self, key, ours, theirs, result, published):
+        if ours is None or dominates(theirs.vv, ours.vv):
+            return theirs
+        if ours.hash == theirs.hash:
+            return _Version(ours.data, _join(ours.vv, theirs.vv), ours.blob, ours.hash, ours.chunks)
+        winner, loser = sorted((ours, theirs), key=_Version.rank, reverse=True)
+        if not loser.deleted:
+            copy_key, copy = self._conflict_copy(key, loser)
+            if copy_key not in published:
+                self._store(copy, result)
+                published[copy_key] = self._entry(copy)
+                result.updates[copy_key] = copy.data
+                result.conflicts.append(copy_key)
+        return _Version(winner.data, _join(ours.vv, theirs.vv), winner.blob, winner.hash,
+                        winner.chunks)
+
+    def _conflict_copy(self, key, version):
+        copy_key = f"{key}~{version.hash[:12]}"
+        data = dict(version.data)
+        data["id"] = copy_key
+        data["title"] = f"{data.get('title', '')} ({version.hash[:6]})"
+        # The copy's vector is derived from content only, so every device
+        # that resolves this conflict creates the identical copy.
+        return copy_key, _Version(data, {"conflict": 1})
+
+    @staticmethod
+    def _entry(version):
+        if version.deleted:
+            return {"deleted": True, "vv": version.vv}
+        return {"hash": version.hash, "chunks": version.chunks, "vv": version.vv,
+                "size": len(version.blob)}
@@ -0,0 +1,146 @@
+"""Built-in story templates and the copy-on-write overlay over them.
+
+User libraries do not store copies of built-in stories. A built-in story
+is saved as a reference carrying only what the user changed:
+
+    {"template": "going-to-school",
+     "title": "...",                  # only if renamed
+     "steps": {"2": "...", ...},      # changed steps by index
+     "added": ["...", ...],           # steps after the last template step
+     "count": 4}                      # only if steps were removed at the end
+
+Unchanged text stays a msgid, so it follows the active language and picks
+up template fixes in new releases.
+"""
+from socialaberattelser.i18n import N_, gettext as _
+from socialaberattelser.model import Story
+
+# Built-in stories hold untranslated msgids; they are translated when shown.
+TEMPLATE_STORIES = [
+    {"id": "going-to-school", "title": N_("Going to School"), "steps": [
+        N_("I wake up in the morning."),
+        N_("I get dressed and eat breakfast."),
+        N_("I take my bag and go to school."),
+        N_("At school, I say hello to my teacher."),
+        N_("I sit at my desk and listen."),
+        N_("After school, I go home."),
+    ]},
+    {"id": "visiting-the-doctor", "title": N_("Visiting the Doctor"), "steps": [
+        N_("Today I am going to the doctor."),
+        N_("The doctor is a nice person who helps me stay healthy."),
+        N_("The doctor might look in my ears and mouth."),
+        N_("It might feel a little strange but it is okay."),
+        N_("When we are done, I can go home."),
+    ]},
+    {"id": "making-a-friend", "title": N_("Making a Friend"), "steps": [
+        N_("I see someone playing alone."),
+        N_("I walk over and say hello."),
+        N_("I ask: Can I play with you?"),
+        N_("We play together and have fun."),
+        N_("Now I have a new friend!"),
+    ]},
+]
+TEMPLATES = {t["id"]: t for t in TEMPLATE_STORIES}
+TEMPLATE_IDS = set(TEMPLATES)
+
+
+def instantiate(template_id):
+    """Return a fresh ``Story`` for a built-in template."""
+    return Story.from_dict(TEMPLATES[template_id])
+
+
+def default_library():
+    return [instantiate(t["id"]) for t in TEMPLATE_STORIES]
+
+
+def resolve(entry):
+    """Merge a saved template reference onto its template."""
+    tpl = TEMPLATES.get(entry["template"])
+    if tpl is None:
+        # Template was dropped in a newer release; keep what the user changed.
+        steps = [entry["steps"][k] for k in sorted(entry.get("steps", {}), key=int)]
+        return Story(entry.get("title", entry["template"]), steps + entry.get("added", []))
+    story = Story(entry.get("title", tpl["title"]), id=tpl["id"])
+    changed = entry.get("steps", {})
+    count = entry.get("count", len(tpl["steps"]))
+    for i, text in enumerate(tpl["steps"][:count]):
+        story.add(changed.get(str(i), text))
+    for step in entry.get("added", ()):
+        story.add(step)
+    return story
+
+
+def overlay(story):
+    """Return the JSON entry storing only how ``story`` differs from its template."""
+    tpl = TEMPLATES[story.id]
+    entry = {"template": story.id}
+    if story.title != tpl["title"]:
+        entry["title"] = story.title
+    tpl_steps = tpl["steps"]
+    changed = {}
+    for i in range(min(len(story), len(tpl_steps))):
+        step = story.step_json(i)
+        if step != tpl_steps[i]:
+            changed[str(i)] = step
+    if changed:
+        entry["steps"] = changed
+    if len(story) > len(tpl_steps):
+        entry["added"] = [story.step_json(i) for i in range(len(tpl_steps), len(story))]
+    elif len(story) < len(tpl_steps):
+        entry["count"] = len(story)
+    return entry
+
+
+def adopt(story):
+    """Turn a full copy of a template saved by older versions back into a reference.
+
+    Old copies have no id and hold the texts translated to whatever locale
+    was active when they were saved; match them against the msgids and
+    the current translation.
+    """
+    if story.id is not None:
+        return story
+    for tpl in TEMPLATE_STORIES:
+        if story.title not in (tpl["title"], _(tpl["title"])):
+            continue
+        if len(story) < len(tpl["steps"]):
+            continue
+        msgids = []
+        for i, msgid in enumerate(tpl["steps"]):
+            if story.texts[i] not in (msgid, _(msgid)) or story.emoji(i) is not None:
+                break
+            msgids.append(msgid)
+        else:
+            story.id = tpl["id"]
+            story.title = tpl["title"]
+            for i, msgid in enumerate(msgids):
+                story.set_text(i, msgid)
+            return story
+    return story
+
+
+def is_builtin(story):
+    return story.id in TEMPLATE_IDS
+
+
+def display_title(story, gettext=_):
+    tpl = TEMPLATES.get(story.id)
+    return gettext(story.title) if tpl is not None and story.title == tpl["title"] else story.title
+
+
+def display_step(story, idx, gettext=_):
+    """Return step text for display; unchanged template steps are translated."""
+    text = story.texts[idx]
+    tpl = TEMPLATES.get(story.id)
+    if tpl is not None and idx < len(tpl["steps"]) and text == tpl["steps"][idx]:
+        return gettext(text)
+    return text
+
+
+def load_entries(data):
+    """Build the library from stories.json, resolving template references."""
+    return [resolve(e) if "template" in e else adopt(Story.from_dict(e)) for e in data]
+
+
+def dump_entries(stories):
+    return [overlay(s) if is_builtin(s) else s.to_dict() for s in stories]
@@ -0,0 +1,191 @@
+"""Timed spans and per-operation latency histograms for hot paths.
+
+Tracing is off unless SOCIALABERATTELSER_TRACE is set:
+
+    SOCIALABERATTELSER_TRACE=json     histograms as JSON
+    SOCIALABERATTELSER_TRACE=chrome   Chrome trace events (chrome://tracing, Perfetto)
+
+Results are written on exit, or on demand with ``dump()``, to
+SOCIALABERATTELSER_TRACE_FILE or ~/.cache/socialaberattelser/trace-<pid>.json.
+When tracing is off ``traced`` returns the function unchanged and ``span``
+returns a shared no-op context manager, so instrumented code pays nothing.
+"""
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+
+ENV = "SOCIALABERATTELSER_TRACE"
+FORMAT = os.environ.get(ENV, "").lower()
+ENABLED = FORMAT not in ("", "0", "no", "off")
+MAX_EVENTS = 200000
+
+_lock = threading.Lock()
+_histograms = {}
+_events = []
+_pid = os.getpid()
+
+
+class Histogram:
+    """Log-scaled latency histogram with four buckets per power of two."""
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        b = int(math.log2(seconds * 1e6 + 1) * 4)
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+
+    def percentile(self, p):
+        """Return an upper bound in seconds for the ``p``-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                return min((2 ** ((b + 1) / 4) - 1) / 1e6, self.max)
+        return self.max
+
+    def as_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1e3,
+            "mean_ms": self.total / self.count * 1e3,
+            "min_ms": self.min * 1e3,
+            "max_ms": self.max * 1e3,
+            "p50_ms": self.percentile(50) * 1e3,
+            "p90_ms": self.percentile(90) * 1e3,
+            "p99_ms": self.percentile(99) * 1e3,
+        }
+
+
+def _histogram(name):
+    hist = _histograms.get(name)
+    if hist is None:
+        hist = _histograms[name] = Histogram()
+    return hist
+
+
+def record(name, start, end):
+    """Add a finished span; ``start``/``end`` come from time.perf_counter()."""
+    with _lock:
+        _histogram(name).add(end - start)
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, start, end, threading.get_ident()))
+
+
+def observe(name, seconds):
+    """Add a latency measured elsewhere to the histograms only."""
+    with _lock:
+        _histogram(name).add(seconds)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc):
+        record(self.name, self.start, time.perf_counter())
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing the enclosed block as ``name``."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def traced(name):
+    """Decorator timing every call of the function as ``name``."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter())
+        return wrapper
+    return decorate
+
+
+def stats():
+    """Return the histograms as a name -> summary dict."""
+    with _lock:
+        return {name: h.as_dict() for name, h in sorted(_histograms.items())}
+
+
+def _chrome_trace():
+    with _lock:
+        events = list(_events)
+    return {"traceEvents": [
+        {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": _pid, "tid": tid,
+         "ts": start * 1e6, "dur": (end - start) * 1e6}
+        for name, start, end, tid in events
+    ], "displayTimeUnit": "ms", "otherData": {"histograms": stats()}}
+
+
+def default_path():
+    path = os.environ.get(ENV + "_FILE")
+    if path:
+        return path
+    cache = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache, "socialaberattelser", f"trace-{_pid}.json")
+
+
+def dump(path=None, fmt=None):
+    """Write the collected data and return the path written."""
+    path = path or default_path()
+    fmt = fmt or FORMAT
+    data = _chrome_trace() if fmt == "chrome" else {"pid": _pid, "histograms": stats()}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+    return path
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _events.clear()
+
+
+if ENABLED:
+    atexit.register(dump)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The application lives under src/; the top-level package is the legacy app.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
@@ -0,0 +1,41 @@
+from socialaberattelser.activity import ActivityLog, day
+
+T = 1_790_000_000
+
+
+def _never(_ms, _fn):
+    """A schedule whose timer never fires, as when the app crashes first."""
+
+
+def test_events_after_the_last_save_are_replayed_past_a_torn_line(tmp_path):
+    log = ActivityLog(str(tmp_path), schedule=_never)
+    for n in range(3):
+        log.record("step", "a", n, now=T + n)
+    log.close_segment()
+    path = log._segment_path(log.segments()[-1])
+    with open(path, "ab") as f:
+        f.write(b'[1790000009,"s","torn')
+
+    reopened = ActivityLog(str(tmp_path), schedule=_never)
+    assert reopened.story("a")["step"] == 3
+    reopened.record("complete", "a", now=T + 10)
+    reopened.close_segment()
+    with open(path, "rb") as f:
+        assert b"torn" not in f.read()
+
+    final = ActivityLog(str(tmp_path))
+    assert final.story("a") == {"step": 3, "complete": 1, "first": T, "last": T + 10}
+
+
+def test_segments_rotate_and_old_ones_are_dropped_once_rolled_up(tmp_path):
+    log = ActivityLog(str(tmp_path), segment_size=100, keep=2)
+    for n in range(20):
+        log.record("open", f"story-{n % 4}", now=T + n)
+    log.close()
+    segments = log.segments()
+    assert len(segments) == 2
+    assert segments[-1] == log._position[0]
+
+    reopened = ActivityLog(str(tmp_path), segment_size=100, keep=2)
+    assert sum(reopened.story(f"story-{n}")["open"] for n in range(4)) == 20
+    assert reopened.daily() == {day(T): {"open": 20}}
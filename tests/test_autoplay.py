@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+gi = pytest.importorskip("gi")
+try:
+    gi.require_version("Gdk", "4.0")
+except ValueError:
+    pytest.skip("GTK 4 is not available", allow_module_level=True)
+
+from socialaberattelser import autoplay, phonetics
+from socialaberattelser.executor import Executor, INTERACTIVE, PREFETCH
+from socialaberattelser.model import Story
+
+
+class _Label:
+    def create_pango_layout(self, text):
+        return _Layout()
+
+    def get_width(self):
+        return 0
+
+
+class _Layout:
+    def get_pixel_size(self):
+        return (0, 0)
+
+
+class _Window:
+    def __init__(self, story):
+        self.store = [story]
+        self.current_story = 0
+        self.current_step = 0
+        self.step_label = _Label()
+
+
+def test_prefetch_submits_audio_in_prefetch_lane(monkeypatch):
+    lanes = []
+    pool = Executor(threads=2, deliver=lambda fn, *args: fn(*args))
+    submit = pool.submit
+
+    def record(fn, *args, lane, **kwargs):
+        lanes.append(lane)
+        return submit(fn, *args, lane=lane, **kwargs)
+
+    monkeypatch.setattr(pool, "submit", record)
+    monkeypatch.setattr(autoplay, "executor", lambda: pool)
+    monkeypatch.setattr(phonetics, "has_piper", lambda: True)
+    monkeypatch.setattr(phonetics, "synthesize", lambda text, lang, engine=None: text)
+
+    story = Story("Test", ["one", "two", "three", "four"], id="t")
+    player = autoplay.AutoPlayer(_Window(story))
+    player._waiting = player._audio_key(story, 0)
+    player.prefetch()
+    pool.shutdown()
+
+    assert lanes == [INTERACTIVE] + [PREFETCH] * autoplay.PREFETCH_STEPS
+
+
+
+def test_a_failed_synthesis_can_be_requested_again(monkeypatch):
+    calls = []
+    failed = threading.Semaphore(0)
+    pool = Executor(threads=2, deliver=lambda fn, *args: fn(*args))
+
+    def synthesize(text, lang, engine=None):
+        calls.append(text)
+        raise OSError("no voice")
+
+    monkeypatch.setattr(autoplay, "executor", lambda: pool)
+    monkeypatch.setattr(phonetics, "synthesize", synthesize)
+    story = Story("Test", ["one"], id="t")
+    player = autoplay.AutoPlayer(_Window(story))
+    on_failed = player._on_audio_failed
+    monkeypatch.setattr(player, "_on_audio_failed",
+                        lambda key, error: (on_failed(key, error), failed.release()))
+
+    key = player._audio_key(story, 0)
+    for _attempt in range(2):
+        player._request_audio(key)
+        assert failed.acquire(timeout=5)
+        assert key not in player._pending
+    pool.shutdown()
+
+    assert calls == ["one", "one"]
+    assert key not in player._audio
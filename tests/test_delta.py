@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+from socialaberattelser import delta
+from socialaberattelser.delta import ExportChain, story_entries
+from socialaberattelser.model import Story
+
+
+def _row(story):
+    return {"details": f"{len(story)} steps"}
+
+
+def test_entries_are_keyed_by_story_key():
+    entries = story_entries([Story("Dentist", ["I sit."], id="a"), Story("Haircut", ["I sit."]),
+                             Story("Haircut", ["I wait."])], _row)
+    assert list(entries) == ["a", "title:Haircut", "title:Haircut#2"]
+    assert entries["title:Haircut#2"]["story"]["steps"] == ["I wait."]
+
+
+def test_the_chain_replays_every_export(tmp_path):
+    chain = ExportChain(str(tmp_path))
+    first = {"a": {"n": 1}, "b": {"n": 1}}
+    second = {"a": {"n": 2}, "b": {"n": 1}, "c": {"n": 1}}
+    third = {"a": {"n": 2}, "c": {"n": 1}}
+
+    assert os.path.basename(chain.export(first)) == "snapshot-1.json"
+    assert os.path.basename(chain.export(second)) == "delta-2.json"
+    assert chain.export(second) is None
+    assert os.path.basename(chain.export(third)) == "delta-3.json"
+
+    reopened = ExportChain(str(tmp_path))
+    assert (reopened.base, reopened.head) == (1, 3)
+    assert reopened.replay(1) == first
+    assert reopened.replay(2) == second
+    assert reopened.replay() == third
+    with pytest.raises(ValueError):
+        reopened.replay(4)
+
+
+def test_compaction_folds_the_chain_into_one_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(delta, "COMPACT_AFTER", 3)
+    chain = ExportChain(str(tmp_path))
+    for n in range(1, 4):
+        chain.export({"a": {"n": n}, f"s{n}": {"n": n}})
+    assert [name for _kind, _seq, name in chain.files()] == \
+        ["snapshot-1.json", "delta-2.json", "delta-3.json"]
+
+    chain.export({"a": {"n": 4}})
+    assert [name for _kind, _seq, name in chain.files()] == ["snapshot-4.json"]
+    reopened = ExportChain(str(tmp_path))
+    assert (reopened.base, reopened.head) == (4, 4)
+    assert reopened.replay() == {"a": {"n": 4}}
+
+    reopened.export({"a": {"n": 5}})
+    assert reopened.replay() == {"a": {"n": 5}}
+    assert reopened.compact() is not None
+    assert [name for _kind, _seq, name in reopened.files()] == ["snapshot-5.json"]
+    assert reopened.compact() is None
+
+
+def test_a_broken_chain_is_refused(tmp_path):
+    chain = ExportChain(str(tmp_path))
+    chain.export({"a": {"n": 1}})
+    chain.export({"a": {"n": 2}})
+    chain.export({"a": {"n": 3}})
+    # delta-2.json replaced by a copy of its successor.
+    shutil.copy(tmp_path / "delta-3.json", tmp_path / "delta-2.json")
+    with pytest.raises(ValueError):
+        ExportChain(str(tmp_path)).replay()
@@ -0,0 +1,44 @@
+import os
+
+from socialaberattelser.history import History
+from socialaberattelser.model import Story
+
+DAY = 86400
+
+
+def _blobs(directory):
+    return sorted(name for _root, _dirs, files in os.walk(os.path.join(directory, "objects"))
+                  for name in files)
+
+
+def test_prune_keeps_the_newest_and_recent_versions(tmp_path):
+    history = History(str(tmp_path))
+    for n in range(5):
+        history.record(Story("Dentist", ["I sit in the chair.", f"Visit {n}."], id="a"),
+                       now=n * DAY)
+    history.record(Story("Haircut", ["I sit in the chair."], id="b"), now=0)
+
+    assert history.prune(keep=3, now=10 * DAY) == 2
+    assert [v.number for v in history.versions("a")] == [3, 4, 5]
+    assert history.prune(max_age=DAY, now=4.5 * DAY) == 2
+    assert [v.number for v in History(str(tmp_path)).versions("a")] == [5]
+    # The only version of a story is kept however old it is.
+    assert [v.number for v in history.versions("b")] == [1]
+
+
+def test_prune_deletes_only_unreferenced_steps(tmp_path):
+    history = History(str(tmp_path))
+    history.record(Story("Dentist", ["I sit in the chair.", "Old step."], id="a"), now=0)
+    history.record(Story("Dentist", ["I sit in the chair.", "New step."], id="a"), now=DAY)
+    history.record(Story("Haircut", ["Old step."], id="b"), now=0)
+    assert len(_blobs(str(tmp_path))) == 3
+
+    assert history.prune(keep=1, now=DAY) == 1
+    assert len(_blobs(str(tmp_path))) == 3
+    assert history.load("b", 1).step_json(0) == "Old step."
+
+    history.record(Story("Haircut", ["Short hair."], id="b"), now=DAY)
+    assert history.prune(keep=1, now=DAY) == 1
+    assert len(_blobs(str(tmp_path))) == 3
+    assert history.load("a", 2).step_json(1) == "New step."
+    assert history.prune(keep=1, now=DAY) == 0
@@ -0,0 +1,37 @@
+import pytest
+
+from socialaberattelser import i18n
+
+
+@pytest.fixture
+def installed(monkeypatch):
+    monkeypatch.setattr(i18n, "available_languages", lambda: ["en", "sv"])
+    for var in ("LANGUAGE", "LC_ALL", "LC_MESSAGES", "LANG"):
+        monkeypatch.delenv(var, raising=False)
+    yield
+    i18n.set_language(None)
+    i18n._effective = None
+
+
+@pytest.mark.parametrize("env, expected", [
+    ({"LANG": "sv_SE.UTF-8"}, "sv"),
+    ({"LANGUAGE": "de:sv", "LANG": "en_US.UTF-8"}, "sv"),
+    ({"LC_ALL": "fi_FI.UTF-8", "LANG": "sv_SE.UTF-8"}, "en"),
+    ({"LANG": "C"}, "en"),
+    ({}, "en"),
+])
+def test_the_system_locale_is_resolved_like_gettext(installed, monkeypatch, env, expected):
+    for var, value in env.items():
+        monkeypatch.setenv(var, value)
+    i18n._effective = None
+    assert i18n.effective_language() == expected
+
+
+def test_a_chosen_language_wins_over_the_locale(installed, monkeypatch):
+    monkeypatch.setenv("LANG", "en_US.UTF-8")
+    i18n._effective = None
+    assert i18n.effective_language() == "en"
+    i18n.set_language("sv")
+    assert i18n.effective_language() == "sv"
+    i18n.set_language(None)
+    assert i18n.effective_language() == "en"
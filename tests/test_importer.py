@@ -0,0 +1,72 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from socialaberattelser import importer
+from socialaberattelser.model import Story
+from socialaberattelser.package import write_package
+
+
+@pytest.mark.parametrize("image", ["/home/teacher/.ssh/id_rsa", "../../secret.png"])
+def test_plain_files_cannot_point_images_elsewhere(tmp_path, image):
+    images = tmp_path / "images"
+    images.mkdir()
+    path = tmp_path / "stories.json"
+    path.write_text(json.dumps({"title": "Dentist",
+                                "steps": [{"text": "I sit.", "image": image}]}))
+    archive = tmp_path / "stories.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.write(path, "stories.json")
+
+    for source in (path, archive):
+        result = importer.import_paths([str(source)], images_dir=str(images))
+        assert result.stories[0].step_json(0) == "I sit."
+
+
+def test_package_images_outside_the_archive_are_dropped(tmp_path):
+    story = Story.from_dict({"title": "Dentist",
+                             "steps": [{"text": "I sit.", "image": "/no/such/dir/secret.png"}]})
+    path = str(tmp_path / "library.sbpkg")
+    write_package(path, [story])
+    result = importer.import_paths([path], images_dir=str(tmp_path / "images"))
+    assert result.stories[0].step_json(0) == "I sit."
+
+
+@pytest.mark.parametrize("chunk", [7, importer.CHUNK_SIZE])
+def test_json_is_streamed_across_chunks(monkeypatch, chunk):
+    monkeypatch.setattr(importer, "CHUNK_SIZE", chunk)
+    stories = [{"title": f"Story {n} \"quoted\" ]", "steps": ["{not an object}", "Å, ä, ö."]}
+               for n in range(20)]
+    text = json.dumps(stories, ensure_ascii=False, indent=1)
+    assert list(importer.iter_json(io.StringIO(text))) == stories
+    assert list(importer.iter_json(io.StringIO(json.dumps(stories[0])))) == stories[:1]
+    assert list(importer.iter_json(io.StringIO(json.dumps({"stories": stories})))) == stories
+    assert list(importer.iter_json(io.StringIO(" [ ] "))) == []
+
+
+def test_malformed_json_keeps_the_stories_before_it(tmp_path):
+    path = tmp_path / "stories.json"
+    path.write_text('[{"title": "Dentist", "steps": ["I sit."]}, 42, {"title": "Hairc')
+    result = importer.import_paths([str(path)])
+    assert [s.title for s in result.stories] == ["Dentist"]
+    assert [error for _name, error in result.errors][0] == "not a story object"
+    assert len(result.errors) == 2
+
+
+def test_csv_rows_with_a_bom_quotes_and_gaps(tmp_path):
+    path = tmp_path / "stories.csv"
+    path.write_bytes("\ufefftitle,text,emoji\n"
+                     'Tandläkaren,"Jag sitter,\nstilla.",🦷\n'
+                     "Tandläkaren,Jag gapar.\n"
+                     "Frisören,,\n"
+                     ",Utan titel.\n"
+                     "Frisören,Jag sitter still.,✂️,extra\n".encode("utf-8"))
+    result = importer.import_paths([str(path)])
+    assert [s.to_dict() for s in result.stories] == [
+        {"title": "Tandläkaren", "steps": [{"text": "Jag sitter, stilla.", "emoji": "🦷"},
+                                           "Jag gapar."]},
+        {"title": "Frisören", "steps": [{"text": "Jag sitter still.", "emoji": "✂️"}]},
+    ]
+    assert [error for _name, error in result.errors] == ["no steps", "missing title"]
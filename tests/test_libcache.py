@@ -0,0 +1,95 @@
+import json
+import os
+import struct
+
+import pytest
+
+from socialaberattelser import libcache
+from socialaberattelser.libcache import LibraryCache
+from socialaberattelser.model import Story
+from socialaberattelser.store import StoryStore
+
+PAYLOAD = {"stories": [Story("Dentist", ["I sit in the chair."], id="a")],
+           "language": "sv", "search": None}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    source = tmp_path / "stories.json"
+    source.write_text(json.dumps([{"title": "Dentist", "steps": ["I sit in the chair."]}]))
+    cache = LibraryCache(str(tmp_path / "library.cache"), str(source))
+    cache.write(PAYLOAD)
+    return cache
+
+
+def test_an_unchanged_source_reads_the_snapshot(cache):
+    payload = cache.read()
+    assert payload["stories"][0].to_dict() == PAYLOAD["stories"][0].to_dict()
+
+
+def test_a_touched_or_edited_source_is_stale(cache):
+    st = os.stat(cache.source)
+    os.utime(cache.source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.read() is None
+
+    cache.write(PAYLOAD)
+    # Same size and mtime, different content: only the hash notices.
+    st = os.stat(cache.source)
+    with open(cache.source, "r+") as f:
+        f.write("[{\"TITLE\"")
+    os.utime(cache.source, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.read() is None
+
+    cache.write(PAYLOAD)
+    with open(cache.source, "a") as f:
+        f.write(" ")
+    assert cache.read() is None
+
+
+@pytest.mark.parametrize("damage", [
+    lambda blob: blob[:len(blob) // 2],
+    lambda blob: blob[:4],
+    lambda blob: blob[:-20] + b"\0" * 20,
+    lambda blob: b"",
+])
+def test_a_damaged_snapshot_is_ignored(cache, damage):
+    with open(cache.path, "rb") as f:
+        blob = f.read()
+    with open(cache.path, "wb") as f:
+        f.write(damage(blob))
+    assert cache.read() is None
+
+
+def test_another_format_or_app_version_is_ignored(cache, monkeypatch):
+    with open(cache.path, "rb") as f:
+        blob = f.read()
+    with open(cache.path, "wb") as f:
+        f.write(struct.pack("<6sH", libcache.MAGIC, libcache.VERSION + 1) + blob[8:])
+    assert cache.read() is None
+
+    cache.write(PAYLOAD)
+    monkeypatch.setattr(libcache, "__version__", "0.0.0-other")
+    assert cache.read() is None
+
+
+def test_a_language_change_reindexes_the_cached_library(cache):
+    def render(story):
+        yield {"sv": "Tandläkaren", "en": "Dentist"}[language]
+
+    def store(load):
+        return StoryStore(load, lambda _stories: None, render=render, cache=cache,
+                          language=language)
+
+    def unexpected():
+        raise AssertionError("the library should come from the cache")
+
+    language = "sv"
+    cache.clear()
+    first = store(lambda: list(PAYLOAD["stories"]))
+    first.save_cache()
+    assert first.search.query("tandläkaren") == {"a"}
+
+    language = "en"
+    second = store(unexpected)
+    assert second.search.query("dentist") == {"a"}
+    assert second.search.query("tandläkaren") == set()
@@ -0,0 +1,25 @@
+import os
+
+from socialaberattelser import importer
+from socialaberattelser.model import Story
+from socialaberattelser.package import write_package
+
+
+def test_images_survive_a_package_round_trip(tmp_path):
+    image = tmp_path / "dentist.png"
+    image.write_bytes(b"\x89PNG not really")
+    story = Story.from_dict({"title": "Going to the Dentist",
+                             "steps": [{"text": "I sit in the chair.", "image": str(image)},
+                                       "I open my mouth."]})
+    path = str(tmp_path / "library.sbpkg")
+    write_package(path, [story])
+
+    images = tmp_path / "images"
+    result = importer.import_paths([path], images_dir=str(images))
+
+    assert result.errors == []
+    step = result.stories[0].step_json(0)
+    assert os.path.dirname(step["image"]) == str(images)
+    with open(step["image"], "rb") as f:
+        assert f.read() == image.read_bytes()
+    assert result.stories[0].step_json(1) == "I open my mouth."
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from socialaberattelser.reminders import ReminderScheduler, next_occurrence
+
+WEEKDAYS = {"freq": "weekly", "weekdays": [0, 1, 2, 3, 4]}
+
+
+def test_first_occurrence_matches_the_rule():
+    saturday = datetime(2026, 10, 24, 9, 0).timestamp()
+    first = next_occurrence(saturday, WEEKDAYS, saturday - 86400)
+    assert datetime.fromtimestamp(first) == datetime(2026, 10, 26, 9, 0)
+    assert next_occurrence(saturday, {"freq": "daily"}, saturday - 86400) == saturday
+
+
+def test_a_time_in_the_past_is_refused(tmp_path):
+    now = datetime(2026, 10, 24, 12, 0).timestamp()
+    reminders = ReminderScheduler(str(tmp_path / "reminders.json"), clock=lambda: now)
+    with pytest.raises(ValueError):
+        reminders.first(now - 86400)
+    reminder = reminders.add("story", now - 86400, WEEKDAYS)
+    assert datetime.fromtimestamp(reminder.next) == datetime(2026, 10, 26, 12, 0)
+
+
+def test_a_restart_right_after_firing_does_not_fire_again(tmp_path):
+    path = str(tmp_path / "reminders.json")
+    now = datetime(2026, 10, 26, 9, 0).timestamp()
+    reminders = ReminderScheduler(path, clock=lambda: now)
+    reminders.add("story", now, WEEKDAYS, lead=300)
+    fired = []
+    reminders.connect(lambda reminder, occurrence: fired.append(occurrence))
+
+    now += 60
+    assert reminders.run_due() == 1
+    reminders.save()
+
+    restarted = ReminderScheduler(path, clock=lambda: now)
+    restarted.connect(lambda reminder, occurrence: fired.append(occurrence))
+    assert restarted.run_due() == 0
+    assert [datetime.fromtimestamp(t) for t in fired] == [datetime(2026, 10, 26, 9, 0)]
+    (_occurrence, reminder), = restarted.upcoming()
+    assert datetime.fromtimestamp(reminder.next) == datetime(2026, 10, 27, 9, 0)
+
+
+def test_an_occurrence_missed_while_closed_fires_once_on_start(tmp_path):
+    path = str(tmp_path / "reminders.json")
+    now = datetime(2026, 10, 26, 8, 0).timestamp()
+    ReminderScheduler(path, clock=lambda: now).add("story", now + 3600, WEEKDAYS)
+
+    now += 3600 + 5 * 60
+    restarted = ReminderScheduler(path, clock=lambda: now)
+    assert restarted.run_due() == 1
+    assert restarted.run_due() == 0
@@ -0,0 +1,49 @@
+from socialaberattelser.model import Story
+from socialaberattelser.search import SearchIndex, fold
+
+
+def _index(*stories):
+    index = SearchIndex()
+    index.sync(stories)
+    return index
+
+
+def test_diacritics_and_case_are_folded():
+    assert fold("TANDLÄKAREN Café") == "tandlakaren cafe"
+    index = _index(Story("Tandläkaren", ["Jag sätter mig i stolen."], id="a"))
+    assert index.query("tandlakaren") == {"a"}
+    assert index.query("SATTER") == {"a"}
+    assert index.query("tandläk") == {"a"}
+
+
+def test_every_term_must_match_as_a_prefix():
+    index = _index(Story("Going to the dentist", ["I sit in the chair."], id="a"),
+                   Story("Going to school", ["I sit at my desk."], id="b"),
+                   Story("Haircut", ["I sit still in the chair."], id="c"))
+    assert index.query("go") == {"a", "b"}
+    assert index.query("go ch") == {"a"}
+    assert index.query("sit chair") == {"a", "c"}
+    assert index.query("sit chair school") == set()
+    assert index.query("  ") is None
+
+
+def test_remove_drops_words_no_story_uses():
+    index = _index(Story("Dentist", ["I sit in the chair."], id="a"),
+                   Story("Haircut", ["I sit still."], id="b"))
+    index.remove("a")
+    assert index.query("dentist") == set()
+    assert index.query("sit") == {"b"}
+    _postings, vocab, tokens, _content = index.state()
+    assert vocab == sorted(tokens["b"])
+    assert len(index) == 1
+
+
+def test_sync_drops_stories_that_are_gone():
+    dentist = Story("Dentist", ["I sit in the chair."], id="a")
+    index = _index(dentist, Story("Haircut", ["I sit still."], id="b"))
+    dentist.title = "Dentist visit"
+    index.sync([dentist])
+    assert index.query("sit") == {"a"}
+    assert index.query("visit") == {"a"}
+    assert index.query("haircut") == set()
+    assert "haircut" not in index.state()[1]
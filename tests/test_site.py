@@ -0,0 +1,42 @@
+import os
+
+from socialaberattelser.model import Story
+from socialaberattelser.site import SiteBuilder, slug
+
+
+def _library():
+    return [Story("Dentist", ["I sit in the chair.", "I open my mouth."], id="a"),
+            Story("Haircut", ["I sit still."], id="b"),
+            Story("Swimming", ["I change.", "I jump in."], id="c")]
+
+
+def test_a_rebuild_writes_only_what_changed(tmp_path):
+    site = SiteBuilder(str(tmp_path), languages=["en"])
+    stories = _library()
+    first = site.build(stories)
+    assert {"en/index.html", "index.html", "sw.js", f"en/{slug('a')}.html"} <= set(first.written)
+
+    again = site.build(stories)
+    assert again.written == [] and again.removed == []
+
+    stories[1].set_text(0, "I sit very still.")
+    assert set(site.build(stories).written) == {f"en/{slug('b')}.html", "sw.js"}
+
+    stories[1].title = "Getting a Haircut"
+    assert set(site.build(stories).written) == {f"en/{slug('b')}.html", "en/index.html", "sw.js"}
+    with open(tmp_path / "en" / "index.html", encoding="utf-8") as f:
+        assert "Getting a Haircut" in f.read()
+
+
+def test_a_deleted_story_loses_its_page(tmp_path):
+    site = SiteBuilder(str(tmp_path), languages=["en"])
+    stories = _library()
+    site.build(stories)
+
+    del stories[0]
+    result = site.build(stories)
+    assert result.removed == [f"en/{slug('a')}.html"]
+    assert set(result.written) == {"en/index.html", "sw.js"}
+    assert not os.path.exists(tmp_path / "en" / f"{slug('a')}.html")
+    with open(tmp_path / "sw.js", encoding="utf-8") as f:
+        assert slug("a") not in f.read()
@@ -0,0 +1,38 @@
+from socialaberattelser.history import History
+from socialaberattelser.model import Story
+from socialaberattelser.store import StoryStore
+
+
+def _render(story):
+    yield story.title
+    yield from story.texts
+
+
+def _store(stories, **kwargs):
+    return StoryStore(lambda: stories, lambda _stories: None, render=_render, **kwargs)
+
+
+def test_search_is_keyed_by_id_and_survives_removal():
+    store = _store([Story("Dentist", ["I sit in the chair."]),
+                    Story("Haircut", ["I sit still."], id="cut"),
+                    Story("Haircut again", ["I sit still."], id="cut")])
+    assert len({story.id for story in store}) == 3
+    assert store[1].id == "cut"
+
+    store.remove(0)
+    assert store.search.query("haircut") == {story.id for story in store}
+    assert store.search.query("dentist") == set()
+
+
+def test_history_is_written_in_batches_in_the_background(tmp_path):
+    queued = []
+    history = History(str(tmp_path))
+    store = _store([], history=history, background=queued.append)
+
+    store.extend([Story(f"Story {i}", ["A step."]) for i in range(3)])
+    store.changed(0)
+    assert len(queued) == 1
+    assert history.story_ids() == []
+
+    queued[0]()
+    assert sorted(history.story_ids()) == sorted(story.id for story in store)
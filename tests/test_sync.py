@@ -0,0 +1,70 @@
+import pytest
+
+from socialaberattelser.model import Story
+from socialaberattelser.sync import SyncFolder
+
+
+def _story(id, title, *steps):
+    return Story.from_dict({"id": id, "title": title, "steps": list(steps)})
+
+
+def _apply(library, result):
+    """Apply ``result.updates`` to a dict of id -> Story, as the app does."""
+    for key, data in result.updates.items():
+        if data is None:
+            library.pop(key, None)
+        else:
+            library[key] = Story.from_dict(data)
+
+
+def _sync(folder, library, allow_deletions=True):
+    result = folder.sync(list(library.values()), allow_deletions)
+    _apply(library, result)
+    folder.publish(result)
+    return result
+
+
+def test_two_devices_exchange_edits_and_deletions(tmp_path):
+    share = str(tmp_path / "share")
+    a, b = SyncFolder(share, "a"), SyncFolder(share, "b")
+    lib_a = {"1": _story("1", "Dentist", "I sit in the chair."),
+             "2": _story("2", "Haircut", "I sit still.")}
+    lib_b = {}
+
+    _sync(a, lib_a)
+    _sync(b, lib_b)
+    assert sorted(lib_b) == ["1", "2"]
+
+    lib_b["1"] = _story("1", "Dentist", "I sit in the chair.", "I open my mouth.")
+    del lib_b["2"]
+    _sync(b, lib_b)
+    _sync(a, lib_a)
+    assert sorted(lib_a) == ["1"]
+    assert len(lib_a["1"]) == 2
+
+
+def test_manifest_is_written_only_by_publish(tmp_path):
+    share = str(tmp_path / "share")
+    a, b = SyncFolder(share, "a"), SyncFolder(share, "b")
+    lib_a = {"1": _story("1", "Dentist", "I sit in the chair.")}
+    _sync(a, lib_a)
+
+    # Device a syncs an empty library but quits before applying it.
+    a.sync([])
+    lib_b = {}
+    _sync(b, lib_b)
+    assert sorted(lib_b) == ["1"]
+
+
+def test_fallback_library_does_not_delete_everywhere(tmp_path):
+    share = str(tmp_path / "share")
+    a, b = SyncFolder(share, "a"), SyncFolder(share, "b")
+    lib_a = {"1": _story("1", "Dentist", "I sit in the chair."),
+             "2": _story("2", "Haircut", "I sit still.")}
+    _sync(a, lib_a)
+
+    with pytest.raises(ValueError):
+        a.sync([_story("d", "Default story", "Hello.")], allow_deletions=False)
+    lib_b = {}
+    _sync(b, lib_b)
+    assert sorted(lib_b) == ["1", "2"]
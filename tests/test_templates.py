@@ -0,0 +1,62 @@
+from socialaberattelser import templates
+from socialaberattelser.model import Story
+
+SCHOOL = templates.TEMPLATES["going-to-school"]
+
+
+def test_a_legacy_full_library_is_saved_as_overlays():
+    legacy = [{"title": t["title"], "steps": list(t["steps"])} for t in templates.TEMPLATE_STORIES]
+    legacy.append({"title": "Haircut", "steps": ["I sit still."]})
+
+    stories = templates.load_entries(legacy)
+    assert [s.id for s in stories[:3]] == [t["id"] for t in templates.TEMPLATE_STORIES]
+    assert stories[3].id is None
+    assert templates.dump_entries(stories) == [{"template": t["id"]} for t in templates.TEMPLATE_STORIES] \
+        + [{"title": "Haircut", "steps": ["I sit still."]}]
+
+
+def test_overlays_round_trip():
+    renamed = templates.instantiate("going-to-school")
+    renamed.title = "Going to My School"
+    renamed.set_text(2, "I take the bus.")
+    renamed.add("I wave goodbye.")
+    friend = templates.TEMPLATES["making-a-friend"]
+    shortened = Story.from_dict({**friend, "steps": friend["steps"][:3]})
+    stories = [renamed, shortened, Story("Haircut", ["I sit still."], id="cut")]
+
+    entries = templates.dump_entries(stories)
+    assert entries[0] == {"template": "going-to-school", "title": "Going to My School",
+                          "steps": {"2": "I take the bus."}, "added": ["I wave goodbye."]}
+    assert entries[1] == {"template": "making-a-friend", "count": 3}
+    loaded = templates.load_entries(entries)
+    assert [s.to_dict() for s in loaded] == [s.to_dict() for s in stories]
+
+
+def test_an_edited_legacy_copy_keeps_its_edits():
+    steps = list(SCHOOL["steps"]) + ["I do my homework."]
+    story, = templates.load_entries([{"title": SCHOOL["title"], "steps": steps}])
+    assert story.id == "going-to-school"
+    assert templates.dump_entries([story]) == [{"template": "going-to-school",
+                                                "added": ["I do my homework."]}]
+
+    # A changed template step is not the template any more.
+    steps[1] = "I get dressed."
+    story, = templates.load_entries([{"title": SCHOOL["title"], "steps": steps}])
+    assert story.id is None
+    assert templates.dump_entries([story])[0]["steps"][1] == "I get dressed."
+
+
+def test_a_deleted_built_in_stays_deleted():
+    stories = templates.default_library()
+    del stories[1]
+    loaded = templates.load_entries(templates.dump_entries(stories))
+    assert [s.id for s in loaded] == ["going-to-school", "making-a-friend"]
+    assert templates.load_entries([]) == []
+
+
+def test_a_dropped_template_keeps_the_users_changes():
+    story, = templates.load_entries([{"template": "gone", "title": "Swimming",
+                                      "steps": {"1": "I jump in.", "0": "I change."},
+                                      "added": ["I dry off."]}])
+    assert story.title == "Swimming"
+    assert story.texts == ["I change.", "I jump in.", "I dry off."]